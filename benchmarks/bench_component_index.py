@@ -0,0 +1,69 @@
+"""
+Benchmark: per-component xpath scan (pre-index _process_xml_chain) vs ComponentIndex.
+
+    python benchmarks/bench_component_index.py [sizes...]
+
+Each size is the number of components in a synthetic .item file. Parsing is
+excluded from both timings; only the UNIQUE_NAME -> node resolution is measured.
+"""
+import os
+import sys
+import time
+import tempfile
+from lxml import etree
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.synthetic import write_synthetic_job
+from src.talend_job import ComponentIndex
+
+
+def legacy_lookup(tree, comps):
+    # Verbatim lookup loop from the original _process_xml_chain
+    all_nodes = tree.xpath("//*[local-name()='node']")
+    found = 0
+    for comp_id in comps:
+        for candidate in all_nodes:
+            u_name = candidate.xpath(".//*[local-name()='elementParameter' and @name='UNIQUE_NAME']/@value")
+            if u_name and u_name[0] == comp_id:
+                found += 1
+                break
+    return found
+
+
+def indexed_lookup(tree, comps):
+    index = ComponentIndex(tree)
+    found = 0
+    for comp_id in comps:
+        entry = index.get(comp_id)
+        if entry is not None:
+            entry.comp_type, entry.params.get("FILENAME")
+            found += 1
+    return found
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main(sizes):
+    print(f"{'components':>10} | {'file MB':>7} | {'legacy s':>9} | {'indexed s':>9} | {'speedup':>8}")
+    print("-" * 56)
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            path = write_synthetic_job(os.path.join(tmp, f"bench_{size}_0.1.item"), size)
+            tree = etree.parse(path)
+            comps = ComponentIndex(tree).unique_names()
+
+            legacy_s, legacy_found = timed(legacy_lookup, tree, comps)
+            indexed_s, indexed_found = timed(indexed_lookup, tree, comps)
+            assert legacy_found == indexed_found == size
+
+            mb = os.path.getsize(path) / (1024 * 1024)
+            print(f"{size:>10} | {mb:>7.2f} | {legacy_s:>9.3f} | {indexed_s:>9.4f} | {legacy_s / indexed_s:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [50, 100, 300, 600])
@@ -0,0 +1,138 @@
+"""
+Benchmark: full MigrationEngine run on a synthetic project against a stub LLM.
+
+    python benchmarks/bench_migration.py --jobs 100 --components 12 --depth 2 \
+        --latency-ms 200 --llm-slots 4 --error-rate 0.1 --workers 2 4 8 16 [--async] [--json results.json]
+
+The project (jobs, components per job, tRunJob chain depth, XML size via
+--params/--columns) is generated once; each --workers value then runs in a
+fresh process against the same StubOllama, so peak RSS and the run report
+belong to that run alone. Conversion cache is off: every LLM component
+costs one (stubbed) call.
+"""
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import tempfile
+import contextlib
+import multiprocessing
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.synthetic import write_synthetic_project
+from benchmarks.stub_llm import StubOllama
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_scenario(scenario):
+    """Runs in a child process: one engine run, returns its measurements."""
+    from src.main_engine import MigrationEngine
+    from src.agent_llm import SouravAgent
+    from src.instrumentation import RECORDER
+
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log if not scenario["verbose"] else sys.stdout):
+        engine = MigrationEngine(
+            input_dir=scenario["input_dir"],
+            output_dir=scenario["output_dir"],
+            agent=SouravAgent(base_url=scenario["llm_url"], cache_dir=None),
+            max_workers=scenario["workers"],
+            async_llm=scenario["async"],
+        )
+        start = time.perf_counter()
+        engine.run()
+        seconds = time.perf_counter() - start
+
+    summary = RECORDER.summary()
+    stages = summary["stages"]
+    llm = [s["llm"] for s in summary["component_types"].values() if s["llm"]["count"]]
+    return {
+        "workers": scenario["workers"],
+        "async": scenario["async"],
+        "seconds": round(seconds, 3),
+        "jobs": engine.graph_builder.graph.number_of_nodes(),
+        "components": summary["totals"]["components"],
+        "llm_calls": summary["totals"]["llm_calls"],
+        "retries": summary["totals"]["retries"],
+        "tokens_in": summary["totals"]["tokens_in"],
+        "tokens_out": summary["totals"]["tokens_out"],
+        "peak_rss_mb": peak_rss_mb(),
+        "build_s": stages.get("ProjectGraph.build", {}).get("total_s"),
+        "convert_s": stages.get("MigrationEngine.convert_all", {}).get("total_s"),
+        "llm_p95_s": max((s["p95_s"] for s in llm), default=None),
+        "stages": stages,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=40)
+    parser.add_argument("--components", type=int, default=10, help="components per job (>= 2)")
+    parser.add_argument("--depth", type=int, default=2, help="tRunJob chain depth (0 = independent jobs)")
+    parser.add_argument("--params", type=int, default=40, help="padding parameters per component (XML size)")
+    parser.add_argument("--columns", type=int, default=12, help="schema columns per component (XML size)")
+    parser.add_argument("--latency-ms", type=float, default=100, help="stub LLM latency per call")
+    parser.add_argument("--jitter", type=float, default=0.1, help="+/- fraction of the latency")
+    parser.add_argument("--llm-slots", type=int, default=4, help="concurrent generations in the stub LLM")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of stub answers with invalid SQL")
+    parser.add_argument("--workers", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--async", dest="async_llm", action="store_true", help="use the async LLM pipeline")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--verbose", action="store_true", help="show the engine's output")
+    args = parser.parse_args(argv)
+
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    with tempfile.TemporaryDirectory() as tmp, \
+            StubOllama(latency_s=args.latency_ms / 1000, jitter=args.jitter, slots=args.llm_slots,
+                       error_rate=args.error_rate) as llm:
+        input_dir = os.path.join(tmp, "TALEND_PROJECT")
+        write_synthetic_project(input_dir, args.jobs, args.components, args.depth, args.params, args.columns)
+        size_mb = sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(input_dir) for f in files) / (1024 * 1024)
+        print(f"[BENCH] {args.jobs} jobs x {args.components} components, tRunJob depth {args.depth}, "
+              f"{size_mb:.1f} MB XML; stub LLM {args.latency_ms:.0f} ms, {args.llm_slots} slots")
+        print(f"{'workers':>7} | {'seconds':>8} | {'jobs/s':>7} | {'comp/s':>7} | {'llm+retry':>9} | "
+              f"{'tokens in/out':>15} | {'peak MB':>7} | {'build s':>7} | {'convert s':>9} | {'llm p95':>7}")
+        print("-" * 110)
+        for workers in args.workers:
+            scenario = {
+                "input_dir": input_dir,
+                "output_dir": os.path.join(tmp, f"output_{workers}"),
+                "llm_url": llm.url,
+                "workers": workers,
+                "async": args.async_llm,
+                "verbose": args.verbose,
+            }
+            with ctx.Pool(1) as pool:
+                r = pool.apply(run_scenario, (scenario,))
+            results.append(r)
+            rss = f"{r['peak_rss_mb']:.0f}" if r["peak_rss_mb"] is not None else "n/a"
+            p95 = f"{r['llm_p95_s']:.3f}" if r["llm_p95_s"] is not None else "n/a"
+            print(f"{workers:>7} | {r['seconds']:>8.2f} | {r['jobs'] / r['seconds']:>7.1f} | "
+                  f"{r['components'] / r['seconds']:>7.1f} | {str(r['llm_calls']) + '+' + str(r['retries']):>9} | "
+                  f"{str(r['tokens_in']) + '/' + str(r['tokens_out']):>15} | {rss:>7} | "
+                  f"{r['build_s']:>7.2f} | {r['convert_s']:>9.2f} | {p95:>7}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+        print(f"[BENCH] Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
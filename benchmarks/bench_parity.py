@@ -0,0 +1,91 @@
+"""
+Benchmark: ParityChecker on two large synthetic tables with a few known differences.
+
+    python benchmarks/bench_parity.py --rows 10000000 50000000 --columns 12 --changes 25 [--memory-limit 2GB]
+
+For each size a DuckDB file gets an `expected` table and an `actual` copy
+with --changes rows deleted, inserted and updated each. The comparison runs
+in a fresh process, so peak RSS is the checker's alone; the found
+differences are checked against the injected ones.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import multiprocessing
+import duckdb
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.bench_migration import peak_rss_mb
+
+
+def write_tables(path, rows, columns, changes):
+    con = duckdb.connect(path)
+    con.execute("SET enable_progress_bar = false")
+    values = ", ".join(
+        f"(range * {i + 1} % 100003)::DOUBLE / 7 AS m{i}" if i % 3 == 0 else
+        f"'v' || (range * {i + 1} % 9973) AS s{i}" if i % 3 == 1 else
+        f"DATE '2000-01-01' + (range % 9000)::INTEGER AS d{i}"
+        for i in range(columns)
+    )
+    con.execute(f"CREATE OR REPLACE TABLE expected AS SELECT range AS id, {values} FROM range({rows})")
+    con.execute("CREATE OR REPLACE TABLE actual AS SELECT * FROM expected")
+    step = max(1, rows // (3 * changes + 1))
+    ids = [step * (i + 1) for i in range(3 * changes)]
+    deleted, updated = ids[:changes], ids[changes:2 * changes]
+    con.execute(f"DELETE FROM actual WHERE id IN ({', '.join(map(str, deleted))})")
+    con.execute(f"INSERT INTO actual SELECT id + {rows}, * EXCLUDE (id) FROM expected "
+                f"WHERE id IN ({', '.join(map(str, ids[2 * changes:]))})")
+    if columns:
+        column = con.execute("SELECT * FROM actual LIMIT 0").description[1][0]
+        new_value = "-1" if column.startswith("m") else "'changed'" if column.startswith("s") else "DATE '1999-01-01'"
+        con.execute(f"UPDATE actual SET {column} = {new_value} WHERE id IN ({', '.join(map(str, updated))})")
+    con.close()
+
+
+def run_check(scenario):
+    """Runs in a child process: one comparison, returns its measurements."""
+    from src.parity_checker import ParityChecker
+
+    checker = ParityChecker(database=scenario["path"], memory_limit=scenario["memory_limit"])
+    try:
+        report = checker.compare("expected", "actual", keys=["id"])
+    finally:
+        checker.close()
+    return {"report": report, "peak_rss_mb": peak_rss_mb()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000000, 10000000])
+    parser.add_argument("--columns", type=int, default=12, help="value columns besides the key")
+    parser.add_argument("--changes", type=int, default=25, help="rows deleted, inserted and updated (each)")
+    parser.add_argument("--memory-limit", help="DuckDB memory_limit for the checker, e.g. 2GB")
+    args = parser.parse_args(argv)
+
+    ctx = multiprocessing.get_context("spawn")
+    print(f"{'rows':>12} | {'setup s':>8} | {'check s':>8} | {'rows/s':>11} | {'levels':>6} | "
+          f"{'missing':>7} | {'extra':>7} | {'changed':>7} | {'peak MB':>7} | ok")
+    print("-" * 100)
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            path = os.path.join(tmp, f"parity_{rows}.duckdb")
+            start = time.perf_counter()
+            write_tables(path, rows, args.columns, args.changes)
+            setup = time.perf_counter() - start
+            with ctx.Pool(1) as pool:
+                r = pool.apply(run_check, ({"path": path, "memory_limit": args.memory_limit},))
+            report = r["report"]
+            diffs = report["differences"]
+            ok = diffs == {"missing": args.changes, "extra": args.changes, "changed": args.changes if args.columns else 0}
+            rss = f"{r['peak_rss_mb']:.0f}" if r["peak_rss_mb"] is not None else "n/a"
+            print(f"{rows:>12,} | {setup:>8.1f} | {report['seconds']:>8.2f} | "
+                  f"{rows / report['seconds']:>11,.0f} | {report['buckets']['levels']:>6} | {diffs['missing']:>7} | "
+                  f"{diffs['extra']:>7} | {diffs['changed']:>7} | {rss:>7} | {'yes' if ok else 'NO'}")
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Local stand-in for the Ollama server used by the benchmarks.
+
+Speaks enough of /api/chat (NDJSON stream, prompt_eval_count / eval_count)
+for ChatOllama, so SouravAgent runs unchanged: prompt building, retrieval,
+JSON parsing and token accounting are all exercised, only the model is fake.
+Each answer is `SELECT * FROM <SOURCE>`, returned after a configurable delay;
+`slots` caps concurrent generations like OLLAMA_NUM_PARALLEL on one GPU.
+With error_rate > 0 that share of conversions comes back with a column that
+does not exist, so validation and repair prompts (always answered
+correctly) show up in the measurements.
+"""
+import re
+import json
+import time
+import random
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SOURCE_RE = re.compile(r"^SOURCE: (.*)$", re.MULTILINE)
+BLOCK_RE = re.compile(r"^### ID: (\S+)\n.*?^SOURCE: (.*?)$", re.MULTILINE | re.DOTALL)
+
+
+def _sql(source, broken=False):
+    return f"SELECT *, no_such_column FROM {source}" if broken else f"SELECT * FROM {source}"
+
+
+def answer(prompt, broken=False):
+    """The stub's JSON reply to the human message of a single, batch or repair prompt."""
+    blocks = BLOCK_RE.findall(prompt)
+    if blocks:
+        return json.dumps({"results": [
+            {"id": int(i) if i.isdigit() else i, "status": "SUCCESS", "sql_logic": _sql(source, broken), "issues": []}
+            for i, source in blocks
+        ]})
+    match = SOURCE_RE.search(prompt)
+    source = match.group(1) if match else "dual"
+    broken = broken and "PREVIOUS ANSWER:" not in prompt
+    return json.dumps({"status": "SUCCESS", "sql_logic": _sql(source, broken), "issues": []})
+
+
+class StubOllama:
+    """
+    with StubOllama(latency_s=0.2, slots=1) as llm:
+        SouravAgent(base_url=llm.url, cache_dir=None)
+    """
+    def __init__(self, latency_s=0.2, jitter=0.1, slots=1, error_rate=0.0, seed=0, host="127.0.0.1", port=0):
+        self.latency_s = latency_s
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.slots = threading.Semaphore(max(1, slots))
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def draw(self):
+        """(delay in seconds, whether this answer is broken) for one call."""
+        with self._lock:
+            self.calls += 1
+            spread = self._random.uniform(-self.jitter, self.jitter)
+            broken = self._random.random() < self.error_rate
+        return max(0.0, self.latency_s * (1 + spread)), broken
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                if self.path != "/api/chat":
+                    self.send_error(404)
+                    return
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                messages = request.get("messages", [])
+                prompt = "\n".join(m.get("content", "") for m in messages)
+                delay, broken = stub.draw()
+                with stub.slots:
+                    time.sleep(delay)
+                content = answer(messages[-1].get("content", "") if messages else "", broken)
+                chunks = [
+                    {"message": {"role": "assistant", "content": content}, "done": False},
+                    {"message": {"role": "assistant", "content": ""}, "done": True, "done_reason": "stop",
+                     "prompt_eval_count": len(prompt) // 4, "eval_count": len(content) // 4},
+                ]
+                created = datetime.now(timezone.utc).isoformat()
+                body = "".join(
+                    json.dumps({"model": request.get("model", "stub"), "created_at": created, **chunk}) + "\n"
+                    for chunk in chunks
+                ).encode("utf-8")
+                if not request.get("stream", True):
+                    body = json.dumps({"model": request.get("model", "stub"), "created_at": created,
+                                       **chunks[1], "message": chunks[0]["message"]}).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
@@ -0,0 +1,111 @@
+"""
+Synthetic Talend .item generator used by the benchmarks.
+Output mirrors the structure of a real Studio export (namespaced ProcessType,
+<node> with elementParameters + metadata, FLOW <connection>s) without any
+customer data.
+"""
+import os
+from xml.sax.saxutils import quoteattr
+
+HEADER = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="no"?>'
+    '<talendfile:ProcessType xmlns:talendfile="platform:/resource/org.talend.model/model/TalendFile.xsd" '
+    'xmlns:TalendMapper="http://www.talend.org/mapper" xmlns:xmi="http://www.omg.org/XMI" '
+    'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" defaultContext="Default" jobType="Standard" xmi:version="2.0">\n'
+    '  <context confirmationNeeded="false" name="Default"/>\n'
+)
+FOOTER = "</talendfile:ProcessType>\n"
+
+# Cycled through for the transformation part of each chain.
+TRANSFORM_TYPES = ["tMap", "tFilterRow", "tSortRow", "tUniqRow", "tConvertType", "tReplicate", "tAggregateRow"]
+
+
+def _param(name, value, field="TEXT"):
+    return f'    <elementParameter field="{field}" name="{name}" value={quoteattr(value)}/>\n'
+
+
+def build_node(unique_name, comp_type, n_params=40, n_columns=12, pos=0):
+    parts = [f'  <node componentName="{comp_type}" componentVersion="0.102" offsetLabelX="0" offsetLabelY="0" posX="{pos * 96}" posY="192">\n']
+    parts.append(_param("UNIQUE_NAME", unique_name))
+    if comp_type.endswith("Input"):
+        parts.append(_param("FILENAME", f'"/data/raw/{unique_name.lower()}.csv"', field="FILE"))
+        parts.append(_param("FIELDSEPARATOR", '","'))
+        parts.append(_param("HEADER", "1"))
+    for i in range(n_params):
+        parts.append(_param(f"SETTING_{i}", f'"value {i} of {unique_name}"'))
+    parts.append(f'    <metadata connector="FLOW" label="{unique_name}_schema" name="{unique_name}">\n')
+    for c in range(n_columns):
+        col_type = "id_Integer" if c == 0 else "id_String"
+        parts.append(
+            f'      <column comment="" key="{"true" if c == 0 else "false"}" length="50" name="COL_{c}" '
+            f'nullable="true" pattern="" precision="0" type="{col_type}" usefulColumn="true"/>\n'
+        )
+    parts.append("    </metadata>\n  </node>\n")
+    return "".join(parts)
+
+
+def build_connection(source, target, label):
+    return (
+        f'  <connection connectorName="FLOW" label="{label}" lineStyle="0" metaname="{source}" '
+        f'offsetLabelX="0" offsetLabelY="0" source="{source}" target="{target}">\n'
+        f'    <elementParameter field="TEXT" name="UNIQUE_NAME" show="false" value="{label}"/>\n'
+        "  </connection>\n"
+    )
+
+
+def build_job_xml(n_components, n_params=40, n_columns=12, extra_nodes=""):
+    """
+    One linear job: tFileInputDelimited -> (n_components - 2) transforms -> tMysqlOutput.
+    `extra_nodes` is appended verbatim (used for tRunJob nodes).
+    """
+    n_components = max(n_components, 2)
+    names = ["tFileInputDelimited_1"]
+    types = ["tFileInputDelimited"]
+    for i in range(n_components - 2):
+        comp_type = TRANSFORM_TYPES[i % len(TRANSFORM_TYPES)]
+        names.append(f"{comp_type}_{i + 1}")
+        types.append(comp_type)
+    names.append("tMysqlOutput_1")
+    types.append("tMysqlOutput")
+
+    body = [HEADER]
+    for pos, (name, comp_type) in enumerate(zip(names, types)):
+        body.append(build_node(name, comp_type, n_params, n_columns, pos))
+    body.append(extra_nodes)
+    for i in range(len(names) - 1):
+        body.append(build_connection(names[i], names[i + 1], f"row{i + 1}"))
+    body.append(FOOTER)
+    return "".join(body)
+
+
+def write_synthetic_job(path, n_components, n_params=40, n_columns=12, extra_nodes=""):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(build_job_xml(n_components, n_params, n_columns, extra_nodes))
+    return path
+
+
+def build_run_job_node(unique_name, child_job, pos=0):
+    """tRunJob calling `child_job` (PROCESS:PROCESS_TYPE_PROCESS)."""
+    return (
+        f'  <node componentName="tRunJob" componentVersion="0.102" offsetLabelX="0" offsetLabelY="0" posX="{pos * 96}" posY="384">\n'
+        + _param("UNIQUE_NAME", unique_name)
+        + _param("PROCESS:PROCESS_TYPE_PROCESS", child_job, field="PROCESS_TYPE")
+        + "  </node>\n"
+    )
+
+
+def write_synthetic_project(root, n_jobs, n_components, run_job_depth=0, n_params=40, n_columns=12):
+    """
+    A Studio-like export under root/process/Bench: n_jobs linear jobs split
+    into tRunJob chains of run_job_depth + 1 jobs (each job calls the next
+    one of its chain). Returns the job names.
+    """
+    chain = run_job_depth + 1
+    names = [f"bench_job_{i:04d}" for i in range(n_jobs)]
+    for i, name in enumerate(names):
+        calls_next = (i + 1) % chain != 0 and i + 1 < n_jobs
+        extra = build_run_job_node("tRunJob_1", names[i + 1], pos=n_components) if calls_next else ""
+        write_synthetic_job(os.path.join(root, "process", "Bench", f"{name}_0.1.item"),
+                            n_components, n_params, n_columns, extra_nodes=extra)
+    return names
@@ -3,58 +3,148 @@ import asyncio
 from datetime import timedelta
 from temporalio import workflow, activity
 
-@activity.defn
-async def dbt_run(model: str) -> str:
-    print(f"[ACTIVITY] Running dbt: {model}")
-    return "OK"
+with workflow.unsafe.imports_passed_through():
+    from src.temporal_activities import dbt_run, dbt_run_batch, dbt_run_model, file_scan
+
+OK_STATUSES = ("success", "pass", "skipped")
+
+MAX_PARALLEL = 8
+MAX_CHILDREN = 8
+BATCH_SIZE = 10
+CONTINUE_AFTER = 200
+FILE_LOOP_MODE = 'batch'
+FILE_LOOP_MAX_PARALLEL = 8
+# Model builds run on the worker process that owns the DuckDB file.
+DB_TASK_QUEUE = 'talend-migration-db'
+
+# tFileList jobs: run by FileLoopWorkflow instead of a plain model batch.
+FILE_LOOPS = {
+}
+
+# One entry per JobTreeWorkflow: the dependency levels of a tRunJob subtree
+# (callees before callers). Small independent subtrees share an entry.
+UNITS = [
+    [
+        ['complaints_historical', 'dim_KY_CD', 'dim_Law_', 'dim_PD_code', 'dim_agegroup', 'dim_borough', 'dim_kycode', 'dim_race', 'dim_transit', 'fact_complaint', 'fact_complaints', 'fact_shooting_incident', 'fact_summon', 'load_complaints_historical', 'load_dim_pdcode', 'load_dim_race', 'shootingincidents_historical1', 'summons_historical', 'summonscases_historical'],
+    ],
+]
 
-@activity.defn
-async def file_scan(path: str) -> list[str]:
-    print(f"[ACTIVITY] Scanning path: {path}")
-    return ["file1", "file2"]
+@workflow.defn
+class FileLoopWorkflow:
+    """
+    tFileList job: scans its directories (file_scan), then runs the job's
+    model over the matched files - in one query (batch), or one file per
+    activity with bounded fan-out, continuing as new every CONTINUE_AFTER files.
+    """
+    @workflow.run
+    async def run(self, job: str, pending: list = None, rows: int = 0, errors: list = None) -> dict:
+        specs = FILE_LOOPS[job]
+        errors = list(errors or [])
+
+        async def run_model(variables, append=False):
+            return await workflow.execute_activity(
+                dbt_run_model, {"model": job, "vars": variables, "append": append},
+                task_queue=DB_TASK_QUEUE, start_to_close_timeout=timedelta(minutes=60),
+            )
+
+        if pending is None:
+            scans = await asyncio.gather(*(
+                workflow.execute_activity(file_scan, spec, start_to_close_timeout=timedelta(minutes=10))
+                for spec in specs
+            ))
+            files = {spec["var"]: found for spec, found in zip(specs, scans)}
+            if not all(files.values()):
+                return {"models": {job: {"status": "skipped", "seconds": 0, "rows": 0, "error": "no matching files"}}}
+            if FILE_LOOP_MODE != "fanout" or len(specs) != 1:
+                return await run_model(files)
+            # Fan-out: the first file creates the table, the rest append to it.
+            pending = files[specs[0]["var"]]
+            first = (await run_model({specs[0]["var"]: pending[:1]}))["models"][job]
+            if first["status"] != "success":
+                return {"models": {job: first}}
+            rows, pending = first["rows"] or 0, pending[1:]
+
+        gate = asyncio.Semaphore(FILE_LOOP_MAX_PARALLEL)
+
+        async def load(path):
+            async with gate:
+                return (await run_model({specs[0]["var"]: [path]}, append=True))["models"][job]
+
+        window, pending = pending[:CONTINUE_AFTER], pending[CONTINUE_AFTER:]
+        for result in await asyncio.gather(*(load(path) for path in window)):
+            if result["status"] == "success":
+                rows += result["rows"] or 0
+            else:
+                errors.append(result.get("error") or result["status"])
+        if pending:
+            workflow.continue_as_new(args=[job, pending, rows, errors])
+
+        status = "error" if errors else "success"
+        return {"models": {job: {"status": status, "rows": rows, "error": errors[0] if errors else None}}}
+
+@workflow.defn
+class JobTreeWorkflow:
+    """Builds one unit level by level; continues as new every CONTINUE_AFTER batches."""
+    @workflow.run
+    async def run(self, unit: int, level: int = 0, offset: int = 0, built: int = 0, failed: list = None) -> dict:
+        failed = list(failed or [])
+        levels = UNITS[unit]
+        gate = asyncio.Semaphore(MAX_PARALLEL)
+        executed = 0
+
+        async def run_item(item):
+            async with gate:
+                if isinstance(item, str):
+                    return await workflow.execute_child_workflow(
+                        FileLoopWorkflow.run, item, id=f"{workflow.info().workflow_id}-loop-{item}"
+                    )
+                # One activity (= one dbt invocation) per batch of ready models.
+                return await workflow.execute_activity(
+                    dbt_run_batch, item, task_queue=DB_TASK_QUEUE, start_to_close_timeout=timedelta(minutes=30)
+                )
+
+        while level < len(levels):
+            models = levels[level]
+            plain = [m for m in models if m not in FILE_LOOPS]
+            items = [plain[i:i + BATCH_SIZE] for i in range(0, len(plain), BATCH_SIZE)]
+            items += [m for m in models if m in FILE_LOOPS]
+            window = items[offset:offset + max(1, CONTINUE_AFTER - executed)]
+            for result in await asyncio.gather(*(run_item(item) for item in window)):
+                for model, r in result["models"].items():
+                    if r.get("status") in OK_STATUSES:
+                        built += 1
+                    else:
+                        failed.append(model)
+            executed += len(window)
+            offset += len(window)
+            if offset >= len(items):
+                level, offset = level + 1, 0
+            if executed >= CONTINUE_AFTER and level < len(levels):
+                workflow.continue_as_new(args=[unit, level, offset, built, failed])
+
+        return {"built": built, "failed": failed}
 
 @workflow.defn
 class MasterWorkflow:
     @workflow.run
-    async def run(self) -> str:
+    async def run(self, start: int = 0, built: int = 0, failed: list = None) -> dict:
         print("[WORKFLOW] Start Migration")
-
-        await workflow.execute_activity(dbt_run, "complaints_historical", start_to_close_timeout=timedelta(minutes=5))
-
-        await workflow.execute_activity(dbt_run, "dim_agegroup", start_to_close_timeout=timedelta(minutes=5))
-
-        await workflow.execute_activity(dbt_run, "dim_borough", start_to_close_timeout=timedelta(minutes=5))
-
-        await workflow.execute_activity(dbt_run, "dim_kycode", start_to_close_timeout=timedelta(minutes=5))
-
-        await workflow.execute_activity(dbt_run, "dim_KY_CD", start_to_close_timeout=timedelta(minutes=5))
-
-        await workflow.execute_activity(dbt_run, "dim_Law_", start_to_close_timeout=timedelta(minutes=5))
-
-        await workflow.execute_activity(dbt_run, "dim_PD_code", start_to_close_timeout=timedelta(minutes=5))
-
-        await workflow.execute_activity(dbt_run, "dim_race", start_to_close_timeout=timedelta(minutes=5))
-
-        await workflow.execute_activity(dbt_run, "dim_transit", start_to_close_timeout=timedelta(minutes=5))
-
-        await workflow.execute_activity(dbt_run, "fact_complaints", start_to_close_timeout=timedelta(minutes=5))
-
-        await workflow.execute_activity(dbt_run, "fact_complaint", start_to_close_timeout=timedelta(minutes=5))
-
-        await workflow.execute_activity(dbt_run, "fact_shooting_incident", start_to_close_timeout=timedelta(minutes=5))
-
-        await workflow.execute_activity(dbt_run, "fact_summon", start_to_close_timeout=timedelta(minutes=5))
-
-        await workflow.execute_activity(dbt_run, "load_complaints_historical", start_to_close_timeout=timedelta(minutes=5))
-
-        await workflow.execute_activity(dbt_run, "load_dim_pdcode", start_to_close_timeout=timedelta(minutes=5))
-
-        await workflow.execute_activity(dbt_run, "load_dim_race", start_to_close_timeout=timedelta(minutes=5))
-
-        await workflow.execute_activity(dbt_run, "shootingincidents_historical1", start_to_close_timeout=timedelta(minutes=5))
-
-        await workflow.execute_activity(dbt_run, "summonscases_historical", start_to_close_timeout=timedelta(minutes=5))
-
-        await workflow.execute_activity(dbt_run, "summons_historical", start_to_close_timeout=timedelta(minutes=5))
-
-        return "Done"
+        failed = list(failed or [])
+        gate = asyncio.Semaphore(MAX_CHILDREN)
+        parent_id = workflow.info().workflow_id
+
+        async def run_unit(unit):
+            async with gate:
+                return await workflow.execute_child_workflow(
+                    JobTreeWorkflow.run, unit, id=f"{parent_id}-unit-{unit}"
+                )
+
+        end = min(len(UNITS), start + CONTINUE_AFTER)
+        for result in await asyncio.gather(*(run_unit(unit) for unit in range(start, end))):
+            built += result["built"]
+            failed.extend(result["failed"])
+        if end < len(UNITS):
+            workflow.continue_as_new(args=[end, built, failed])
+
+        print(f"[WORKFLOW] Done: {built} models built, {len(failed)} failed")
+        return {"built": built, "failed": sorted(failed)}
@@ -1,27 +1,111 @@
 import os
 import sys
 import time
+import argparse
+import tempfile
 import subprocess
 import webbrowser
 from src.main_engine import MigrationEngine
 from src.verify_migration import MigrationTester # <--- IMPORT
+from src.instrumentation import RECORDER
+from src.config import RUN_REPORT_PATH
+
+# Worker readiness: it writes WORKER_READY_FILE once connected and polling.
+WORKER_READY_TIMEOUT = 60
+
+def wait_for_worker(process, ready_file, timeout=WORKER_READY_TIMEOUT):
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if os.path.exists(ready_file):
+            print(f"[WORKER] Ready after {time.perf_counter() - start:.2f}s.")
+            os.remove(ready_file)
+            return True
+        if process.poll() is not None:
+            print(f"[ERROR] Worker exited during startup (code {process.returncode}).")
+            return False
+        time.sleep(0.05)
+    print(f"[ERROR] Worker not ready after {timeout}s.")
+    return False
+
+def convert_distributed(incremental):
+    """
+    Conversion as a Temporal workflow (src/migration_workflow.py): this
+    machine coordinates and converts; every host running
+    `run_temporal_worker.py --roles convert` takes jobs too.
+    """
+    ready_file = os.path.join(tempfile.gettempdir(), f"talend-coordinator-{os.getpid()}.ready")
+    if os.path.exists(ready_file):
+        os.remove(ready_file)
+    worker_script = os.path.join("src", "run_temporal_worker.py")
+    env = dict(os.environ, WORKER_READY_FILE=ready_file)
+    process = subprocess.Popen([sys.executable, worker_script, "--roles", "migration", "convert"], env=env)
+    print(f"[WORKER] Coordinator worker spawned (PID: {process.pid}).")
+    try:
+        if not wait_for_worker(process, ready_file):
+            raise RuntimeError("coordinator worker did not start")
+        trigger_script = os.path.join("src", "trigger_migration.py")
+        command = [sys.executable, trigger_script, "--convert", "--wait"] + (["--incremental"] if incremental else [])
+        if subprocess.run(command).returncode != 0:
+            raise RuntimeError("conversion workflow failed")
+    finally:
+        if process.poll() is None:
+            process.terminate()
+            process.wait()
 
 def main():
+    parser = argparse.ArgumentParser(description="Talend -> dbt/DuckDB + Temporal migration")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only reconvert jobs whose .item files changed since the last run (and their callers)")
+    parser.add_argument("--distributed", action="store_true",
+                        help="convert through MigrationWorkflow on Temporal, spread over all conversion workers")
+    args = parser.parse_args()
+
     # --- STEP 0: PRE-FLIGHT CHECKS ---
     if not os.path.exists("./input_data/TALEND_PROJECT"):
         print("[ERROR] Target folder './input_data/TALEND_PROJECT' not found.")
         sys.exit(1)
 
     # --- STEP 1: RUN MIGRATION ENGINE ---
+    # Phases overlap: each model is verified as soon as it is written, and the
+    # worker starts as soon as workflow.py exists (while models convert).
     print("\n" + "="*60)
-    print("[INFO] PHASE 1: GENERATING DBT & TEMPORAL CODE")
+    print("[INFO] PHASE 1: GENERATING DBT & TEMPORAL CODE (+ VERIFYING, STARTING WORKER)")
     print("="*60)
-    
+
+    tester = MigrationTester("./output/dbt_project").start()
+    ready_file = os.path.join(tempfile.gettempdir(), f"talend-worker-{os.getpid()}.ready")
+    worker = {}
+
+    def start_worker():
+        if os.path.exists(ready_file):
+            os.remove(ready_file)
+        worker_script = os.path.join("src", "run_temporal_worker.py")
+        env = dict(os.environ, WORKER_READY_FILE=ready_file)
+        worker["process"] = subprocess.Popen([sys.executable, worker_script], env=env)
+        print(f"[WORKER] Worker process spawned (PID: {worker['process'].pid}).")
+
+    def stop_worker():
+        process = worker.get("process")
+        if process is not None and process.poll() is None:
+            print("[SYSTEM] Terminating worker process...")
+            process.terminate()
+            process.wait()
+
     try:
-        engine = MigrationEngine()
-        engine.run()
+        if args.distributed:
+            # Models are verified in finish(); the worker starts in phase 2.
+            convert_distributed(args.incremental)
+        else:
+            engine = MigrationEngine(
+                incremental=args.incremental,
+                on_workflow_generated=start_worker,
+                on_model_written=tester.submit,
+            )
+            engine.run()
     except Exception as e:
         print(f"[FATAL] Migration failed: {e}")
+        tester.finish()
+        stop_worker()
         sys.exit(1)
 
     # --- STEP 1.5: VERIFY CODE QUALITY (NEW AGENT) ---
@@ -29,25 +113,28 @@ def main():
     print("[INFO] PHASE 1.5: VERIFYING CODE INTEGRITY")
     print("="*60)
     
-    tester = MigrationTester("./output/dbt_project")
-    is_valid = tester.run_checks()
+    is_valid = tester.finish()
+    # Again, now with the verification stages included.
+    RECORDER.write_report(RUN_REPORT_PATH)
     
     if not is_valid:
         print("\n[STOP] Critical issues found in generated code.")
         print("       Aborting migration execution to prevent runtime errors.")
         print("       Please check ./output/dbt_project/models logs for details.")
+        stop_worker()
         sys.exit(1)
 
-    # --- STEP 2: START WORKER ---
+    # --- STEP 2: WAIT FOR WORKER ---
     print("\n" + "="*60)
-    print("[INFO] PHASE 2: STARTING TEMPORAL WORKER")
+    print("[INFO] PHASE 2: WAITING FOR TEMPORAL WORKER")
     print("="*60)
     
-    worker_script = os.path.join("src", "run_temporal_worker.py")
-    worker_process = subprocess.Popen([sys.executable, worker_script])
-    
-    print("[WORKER] Worker process spawned. Waiting 5s for initialization...")
-    time.sleep(5) 
+    if "process" not in worker:
+        start_worker()
+    worker_process = worker["process"]
+    if not wait_for_worker(worker_process, ready_file):
+        stop_worker()
+        sys.exit(1)
 
     try:
         # --- STEP 3: TRIGGER WORKFLOW ---
@@ -1,9 +1,15 @@
-import os
 import json
+import time
 from langchain_ollama import ChatOllama
 from langchain_core.prompts import ChatPromptTemplate
-from src.config import OLLAMA_MODEL, OLLAMA_BASE_URL, AGENT_NAME
+from src.config import OLLAMA_MODEL, OLLAMA_BASE_URL, CACHE_ENABLED, CACHE_DIR, CACHE_MAX_MB
 from src.knowledge_base import KnowledgeRetriever
+from src.llm_cache import ConversionCache, make_cache_key
+from src.instrumentation import RECORDER
+
+# Bump whenever SYSTEM_PROMPT or the human message changes so cached
+# conversions produced by the old prompt are no longer served.
+PROMPT_VERSION = "2"
 
 # STRICTLY LOCKED PROMPT STRUCTURE - FULL TRANSFORMATION LOGIC PRESERVED
 SYSTEM_PROMPT = """
@@ -37,8 +43,52 @@ OUTPUT FORMAT (JSON):
 }}
 """
 
+SINGLE_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", SYSTEM_PROMPT),
+    ("human", "COMPONENT: {comp_type}\nSOURCE: {prev_cte}\nDEFINITION:\n{xml_input}")
+])
+
+# Repair round for an answer that failed validation: no retrieval context,
+# just the failing SQL (or raw reply), DuckDB's error and the source schemas.
+REPAIR_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", "You fix DuckDB SQL generated from a Talend component. Keep the logic, fix only what the "
+               "error points at, use only the SOURCE tables and columns listed.\n"
+               "OUTPUT FORMAT (JSON): {{\"status\": \"SUCCESS\", \"sql_logic\": \"SELECT ... FROM ...\", \"issues\": []}}"),
+    ("human", "COMPONENT: {comp_type}\nSOURCE: {prev_cte}\nSOURCE COLUMNS:\n{schema}\nDEFINITION:\n{xml_input}\n\n"
+              "PREVIOUS ANSWER:\n{previous}\n\nERROR:\n{error}")
+])
+
+# Multi-component variant used by the async pipeline for small components.
+BATCH_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", SYSTEM_PROMPT),
+    ("human", "Convert EACH component below independently. Every component has its own SOURCE.\n"
+              "Return ONE JSON object: {{\"results\": [{{\"id\": <ID>, \"status\": \"SUCCESS\", \"sql_logic\": \"SELECT ...\", \"issues\": []}}]}}\n\n"
+              "{components}")
+])
+
+def _usage(response, seconds, share=1):
+    """Token counts reported by Ollama (usage_metadata), split over `share` components."""
+    meta = getattr(response, "usage_metadata", None) or {}
+    return {
+        "tokens_in": meta.get("input_tokens", 0) // share,
+        "tokens_out": meta.get("output_tokens", 0) // share,
+        "seconds": seconds / share,
+        "cache_hit": False,
+        "retries": 0,
+    }
+
+
+def _with_usage(result, usage):
+    # Copy: the cached entry must not carry per-call accounting.
+    return {**result, "usage": usage}
+
+
+CACHE_HIT_USAGE = {"tokens_in": 0, "tokens_out": 0, "seconds": 0.0, "cache_hit": True, "retries": 0}
+
+
 class SouravAgent:
-    def __init__(self):
+    def __init__(self, base_url=OLLAMA_BASE_URL, cache_dir=CACHE_DIR):
+        # base_url / cache_dir=None: used by the benchmarks (stub server, no cache).
         # HARDWARE OPTIMIZATION: PURE SPEED (RTX 4050 Priority)
         
         # We target the 6 Performance Cores of the i7-13650HX for the data feed pipeline.
@@ -47,7 +97,7 @@ class SouravAgent:
 
         self.llm = ChatOllama(
             model=OLLAMA_MODEL,
-            base_url=OLLAMA_BASE_URL,
+            base_url=base_url,
             temperature=0.0,
             format="json",
             
@@ -67,24 +117,181 @@ class SouravAgent:
             repeat_last_n=64     # Optimize context lookback window.
         )
         self.kb = KnowledgeRetriever()
+        self.cache = ConversionCache(cache_dir, CACHE_MAX_MB * 1024 * 1024) if CACHE_ENABLED and cache_dir else None
 
-    def convert_component(self, job_name, comp_type, xml_snippet, prev_cte, input_map):
+    def _lookup(self, comp_type, xml_snippet, prev_cte):
+        """Returns (context, cache_key, cached_result_or_None)."""
         context = self.kb.get_context(comp_type, xml_snippet)
-        
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", SYSTEM_PROMPT),
-            ("human", "COMPONENT: {comp_type}\nSOURCE: {prev_cte}\nXML:\n{xml_input}")
-        ])
-        
+
+        # CACHE LOOKUP: identical component + context + model + prompt => identical answer
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self._cache_key(comp_type, xml_snippet, prev_cte, context)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                print(f"   ... [CACHE] Reusing {comp_type} conversion")
+                return context, cache_key, cached
+        return context, cache_key, None
+
+    @staticmethod
+    def _cache_key(comp_type, xml_snippet, prev_cte, context):
+        return make_cache_key(comp_type, xml_snippet, context['rag'], OLLAMA_MODEL, PROMPT_VERSION, prev_cte)
+
+    def remember(self, comp_type, xml_snippet, prev_cte, result):
+        """
+        Replaces the cached answer of a component after a repair, so warm runs
+        get the fixed SQL; result=None drops it so the next run asks again.
+        """
+        if self.cache is None:
+            return
+        key = self._cache_key(comp_type, xml_snippet, prev_cte, self.kb.get_context(comp_type, xml_snippet))
+        if result is None:
+            self.cache.invalidate(key=key)
+        else:
+            self._store(key, comp_type, {k: v for k, v in result.items() if k != "usage"})
+
+    def _store(self, cache_key, comp_type, result):
+        # Only successful answers are worth keeping; errors get retried next run.
+        if cache_key and result.get('status') == 'SUCCESS':
+            self.cache.put(cache_key, result, comp_type=comp_type, model=OLLAMA_MODEL)
+
+    def _prepare(self, comp_type, xml_snippet, prev_cte):
+        """
+        Cache lookup and prompt inputs of a single conversion. Returns
+        (cached_result_or_None, cache_key, inputs).
+        """
+        context, cache_key, cached = self._lookup(comp_type, xml_snippet, prev_cte)
+        if cached is not None:
+            return _with_usage(cached, dict(CACHE_HIT_USAGE)), cache_key, None
+        inputs = {
+            "comp_type": comp_type,
+            "prev_cte": prev_cte,
+            "rag_context": context['rag'],
+            "xml_input": xml_snippet
+        }
+        return None, cache_key, inputs
+
+    def _answer(self, comp_type, cache_key, response, error, start):
+        """Parses (and caches) the model's reply, or turns the failure into an ERROR result."""
+        if error is None:
+            try:
+                result = json.loads(response.content)
+                self._store(cache_key, comp_type, result)
+            except Exception as e:
+                error = e
+        if error is not None:
+            result = {"status": "ERROR", "issues": [str(error)]}
+            if response is not None:
+                # The model answered, just not with valid JSON: repairable.
+                result["raw"] = response.content
+        seconds = time.perf_counter() - start
+        RECORDER.record_stage("SouravAgent.convert_component", seconds)
+        return _with_usage(result, _usage(response, seconds))
+
+    def convert_component(self, job_name, comp_type, xml_snippet, prev_cte, input_map):
+        """
+        Returns the model's JSON answer plus a "usage" entry (tokens, LLM
+        seconds, cache_hit, retries) for the run report.
+        """
+        cached, cache_key, inputs = self._prepare(comp_type, xml_snippet, prev_cte)
+        if cached is not None:
+            return cached
+
+        start = time.perf_counter()
+        response = error = None
         try:
             print(f"   ... [LLM] Converting {comp_type} ...")
-            chain = prompt | self.llm
+            response = (SINGLE_PROMPT | self.llm).invoke(inputs)
+        except Exception as e:
+            error = e
+        return self._answer(comp_type, cache_key, response, error, start)
+
+    async def aconvert_component(self, job_name, comp_type, xml_snippet, prev_cte, input_map):
+        """Non-blocking twin of convert_component (LangChain ainvoke)."""
+        cached, cache_key, inputs = self._prepare(comp_type, xml_snippet, prev_cte)
+        if cached is not None:
+            return cached
+
+        start = time.perf_counter()
+        response = error = None
+        try:
+            print(f"   ... [LLM] Converting {comp_type} (async) ...")
+            response = await (SINGLE_PROMPT | self.llm).ainvoke(inputs)
+        except Exception as e:
+            error = e
+        return self._answer(comp_type, cache_key, response, error, start)
+
+    def repair_component(self, job_name, comp_type, xml_snippet, prev_cte, previous, error, schema=""):
+        """
+        One repair round for an answer that failed validation (bad JSON or
+        SQL DuckDB rejects). Not cached: the caller decides via remember().
+        """
+        start = time.perf_counter()
+        response = None
+        try:
+            print(f"   ... [LLM] Repairing {comp_type} ...")
+            chain = REPAIR_PROMPT | self.llm
             response = chain.invoke({
                 "comp_type": comp_type,
                 "prev_cte": prev_cte,
-                "rag_context": context['rag'],
-                "xml_input": xml_snippet
+                "schema": schema or "(unknown)",
+                "xml_input": xml_snippet,
+                "previous": previous or "(empty)",
+                "error": error,
             })
-            return json.loads(response.content)
+            result = json.loads(response.content)
+        except Exception as e:
+            result = {"status": "ERROR", "issues": [str(e)]}
+            if response is not None:
+                result["raw"] = response.content
+        seconds = time.perf_counter() - start
+        RECORDER.record_stage("SouravAgent.repair_component", seconds)
+        return _with_usage(result, _usage(response, seconds))
+
+    async def aconvert_batch(self, items):
+        """
+        Converts several small components in ONE call.
+        `items` is a list of dicts with comp_type, xml_snippet, prev_cte.
+        Returns one result per item, in order; items the model did not answer
+        come back as None so the caller can retry them individually. The
+        call's tokens and time are split evenly over the answered items.
+        """
+        results = [None] * len(items)
+        pending = []
+        rag_lines = []
+        for i, item in enumerate(items):
+            context, cache_key, cached = self._lookup(item['comp_type'], item['xml_snippet'], item['prev_cte'])
+            if cached is not None:
+                results[i] = _with_usage(cached, dict(CACHE_HIT_USAGE))
+                continue
+            pending.append((i, cache_key))
+            for line in context['rag'].splitlines():
+                if line and line not in rag_lines:
+                    rag_lines.append(line)
+        if not pending:
+            return results
+
+        blocks = "\n\n".join(
+            f"### ID: {i}\nCOMPONENT: {items[i]['comp_type']}\nSOURCE: {items[i]['prev_cte']}\nDEFINITION:\n{items[i]['xml_snippet']}"
+            for i, _ in pending
+        )
+        start = time.perf_counter()
+        try:
+            print(f"   ... [LLM] Converting batch of {len(pending)} components (async) ...")
+            chain = BATCH_PROMPT | self.llm
+            response = await chain.ainvoke({"rag_context": "\n".join(rag_lines), "components": blocks})
+            answers = {str(r.get('id')): r for r in json.loads(response.content).get('results', [])}
         except Exception as e:
-            return {"status": "ERROR", "issues": [str(e)]}
\ No newline at end of file
+            print(f"   ... [LLM] Batch failed, falling back to single calls: {e}")
+            return results
+        finally:
+            seconds = time.perf_counter() - start
+            RECORDER.record_stage("SouravAgent.aconvert_batch", seconds)
+
+        answered = [(i, key) for i, key in pending if str(i) in answers]
+        for i, cache_key in answered:
+            answer = answers[str(i)]
+            answer.pop('id', None)
+            self._store(cache_key, items[i]['comp_type'], answer)
+            results[i] = _with_usage(answer, _usage(response, seconds, share=len(answered)))
+        return results
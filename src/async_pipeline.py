@@ -0,0 +1,185 @@
+import time
+import collections
+import asyncio
+import threading
+
+
+def _cached(result):
+    """True when the conversion was served from the cache (no LLM call)."""
+    return result is not None and (result.get("usage") or {}).get("cache_hit", False)
+
+
+class AdaptiveLimiter:
+    """
+    In-flight limit for LLM requests, tuned from observed latency (AIMD).
+    While latency stays near its baseline the limit grows by one per
+    completion; once the server queues up (average > backoff_ratio x
+    baseline) it is cut by a quarter. Single and batch calls are tracked
+    apart (a batch is slower by nature); the baseline is the lowest of the
+    last `window` latencies, so one fast outlier is forgotten instead of
+    pinning the limit low for the rest of the run.
+    """
+    def __init__(self, min_limit, max_limit, backoff_ratio=2.0, alpha=0.2, window=50):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = min_limit
+        self.backoff_ratio = backoff_ratio
+        self.alpha = alpha
+        self.window = window
+        self.in_flight = 0
+        self.latency = {}   # kind -> (recent latencies, average)
+        self._cond = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._cond:
+            while self.in_flight >= self.limit:
+                await self._cond.wait()
+            self.in_flight += 1
+
+    async def release(self, latency=None, kind="single"):
+        """latency=None: nothing reached the LLM (cache hits), nothing to learn."""
+        async with self._cond:
+            self.in_flight -= 1
+            if latency is not None:
+                self._observe(latency, kind)
+            self._cond.notify_all()
+
+    def _observe(self, latency, kind="single"):
+        recent, average = self.latency.get(kind) or (collections.deque(maxlen=self.window), latency)
+        recent.append(latency)
+        average = self.alpha * latency + (1 - self.alpha) * average
+        self.latency[kind] = (recent, average)
+        if average > min(recent) * self.backoff_ratio:
+            self.limit = max(self.min_limit, int(self.limit * 0.75))
+        elif self.limit < self.max_limit:
+            self.limit += 1
+
+
+class AsyncConversionPipeline:
+    """
+    asyncio front-end for SouravAgent. Owns an event loop on a background
+    thread; any thread can submit() a conversion and get a concurrent Future.
+
+    - All requests share one AdaptiveLimiter (bounded, latency-aware in-flight).
+    - Components whose XML is below batch_max_chars are held for up to
+      batch_window_s and sent together as one multi-component prompt.
+    """
+    def __init__(self, agent, min_in_flight=2, max_in_flight=16,
+                 batch_size=4, batch_max_chars=2000, batch_window_s=0.05):
+        self.agent = agent
+        self.min_in_flight = min_in_flight
+        self.max_in_flight = max_in_flight
+        self.batch_size = batch_size
+        self.batch_max_chars = batch_max_chars
+        self.batch_window_s = batch_window_s
+        self.loop = None
+        self.limiter = None
+        self._queue = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    # --- LIFECYCLE ---
+    def start(self):
+        self._thread = threading.Thread(target=self._run_loop, name="llm-async", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def _run_loop(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.limiter = AdaptiveLimiter(self.min_in_flight, self.max_in_flight)
+        self._queue = asyncio.Queue()
+        if self.batch_size > 1:
+            self.loop.create_task(self._batcher())
+        self._ready.set()
+        self.loop.run_forever()
+        # Stopped: cancel the batcher and anything still queued, then close.
+        pending = asyncio.all_tasks(self.loop)
+        for task in pending:
+            task.cancel()
+        self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        self.loop.close()
+
+    def stop(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join()
+
+    # --- PUBLIC API (thread-safe) ---
+    def submit(self, job_name, comp_type, xml_snippet, prev_cte, input_map):
+        return asyncio.run_coroutine_threadsafe(
+            self.convert(job_name, comp_type, xml_snippet, prev_cte, input_map), self.loop
+        )
+
+    def convert_component(self, job_name, comp_type, xml_snippet, prev_cte, input_map):
+        """Blocking adapter with SouravAgent.convert_component's signature."""
+        return self.submit(job_name, comp_type, xml_snippet, prev_cte, input_map).result()
+
+    # --- COROUTINES ---
+    async def convert(self, job_name, comp_type, xml_snippet, prev_cte, input_map):
+        if self.batch_size > 1 and len(xml_snippet) <= self.batch_max_chars:
+            future = self.loop.create_future()
+            item = {"comp_type": comp_type, "xml_snippet": xml_snippet, "prev_cte": prev_cte}
+            await self._queue.put((item, job_name, input_map, future))
+            return await future
+        return await self._single(job_name, comp_type, xml_snippet, prev_cte, input_map)
+
+    async def _single(self, job_name, comp_type, xml_snippet, prev_cte, input_map):
+        await self.limiter.acquire()
+        start, result = time.perf_counter(), None
+        try:
+            result = await self.agent.aconvert_component(job_name, comp_type, xml_snippet, prev_cte, input_map)
+            return result
+        finally:
+            await self.limiter.release(None if _cached(result) else time.perf_counter() - start)
+
+    async def _batcher(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = self.loop.time() + self.batch_window_s
+            while len(batch) < self.batch_size:
+                timeout = deadline - self.loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self.loop.create_task(self._dispatch(batch))
+
+    async def _dispatch(self, batch):
+        try:
+            await self._dispatch_batch(batch)
+        except Exception as e:
+            for _, _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    async def _dispatch_batch(self, batch):
+        if len(batch) == 1:
+            item, job_name, input_map, future = batch[0]
+            results = [await self._single(job_name, item["comp_type"], item["xml_snippet"], item["prev_cte"], input_map)]
+        else:
+            await self.limiter.acquire()
+            start, results = time.perf_counter(), None
+            try:
+                results = await self.agent.aconvert_batch([b[0] for b in batch])
+            finally:
+                called = results is None or not all(_cached(r) for r in results)
+                await self.limiter.release(time.perf_counter() - start if called else None, kind="batch")
+
+        # Not answered inside the batch: retried on their own, concurrently.
+        missing = [i for i, result in enumerate(results) if result is None]
+        retried = await asyncio.gather(*(
+            self._single(batch[i][1], batch[i][0]["comp_type"], batch[i][0]["xml_snippet"], batch[i][0]["prev_cte"],
+                         batch[i][2])
+            for i in missing
+        ))
+        for i, result in zip(missing, retried):
+            usage = result.setdefault("usage", {})
+            usage["retries"] = usage.get("retries", 0) + 1
+            results[i] = result
+        for (_, _, _, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
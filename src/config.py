@@ -16,4 +16,147 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 INPUT_DIR = os.path.join(BASE_DIR, "input_data", "TALEND_PROJECT")
 OUTPUT_DIR = os.path.join(BASE_DIR, "output")
 DBT_OUTPUT_DIR = os.path.join(OUTPUT_DIR, "dbt_project")
-TEMPORAL_OUTPUT_DIR = os.path.join(OUTPUT_DIR, "temporal_workflows")
\ No newline at end of file
+TEMPORAL_OUTPUT_DIR = os.path.join(OUTPUT_DIR, "temporal_workflows")
+# Stage timings, per-component latency/tokens/cache hits (src/instrumentation.py)
+RUN_REPORT_PATH = os.path.join(OUTPUT_DIR, "run_report.json")
+
+# --- LLM CONVERSION CACHE ---
+# Content-addressed store of successful conversions. A warm re-run of an
+# unchanged project never reaches Ollama.
+CACHE_ENABLED = True
+CACHE_DIR = os.path.join(BASE_DIR, ".llm_cache")
+CACHE_MAX_MB = 512
+
+# --- PROMPT COMPACTION ---
+# Send src/xml_distiller.py's compact text (relevant parameters, schema,
+# mappings) instead of the raw <node> XML. Part of the manifest settings,
+# so switching it reconverts everything.
+PROMPT_DISTILL = True
+
+# --- LLM OUTPUT VALIDATION ---
+# Every LLM-generated CTE is bound on DuckDB against empty, typed stand-ins
+# of its upstream CTEs (src/cte_validator.py). Bad JSON or SQL gets up to
+# LLM_REPAIR_ATTEMPTS repair prompts carrying the error; a CTE that still
+# fails is dropped with a warning.
+LLM_VALIDATE = True
+LLM_REPAIR_ATTEMPTS = 2
+
+# --- MODEL OPTIMIZATION ---
+# Each assembled model goes through src/cte_optimizer.py before it is
+# written: pass-through and unused CTEs removed, ORDER BY without LIMIT
+# dropped, stacked filters/projections merged. conversion_report.json lists
+# the rewrites per model.
+CTE_OPTIMIZE = True
+
+# --- MATERIALIZATION ---
+# Each model gets a dbt config() block chosen by src/materialization.py from
+# its Output component (DATA_ACTION, TABLE_ACTION, key columns), how many
+# other jobs read what it writes, and the size of its sources. Append-only
+# and upsert loads become incremental models.
+MATERIALIZATION_ADVISE = True
+MATERIALIZATION_VIEW_MAX_BYTES = 10 * 1024 * 1024   # small sources stay views...
+MATERIALIZATION_VIEW_MAX_READERS = 1                # ...unless more jobs read the result
+SOURCE_SIZE_HINTS = {}   # dataset name -> approximate bytes, for sources not on this machine
+
+# --- FILE SOURCES ---
+# Delimited file inputs are read with read_csv from their Talend settings
+# (schema columns and types, separator, header lines, quoting) instead of a
+# raw source DuckDB has to sniff (src/file_sources.py). FILE_SOURCE_ROOTS
+# maps the Talend directories to where the files are on this machine.
+TYPED_FILE_SOURCES = True
+FILE_SOURCE_ROOTS = {}          # {"C:/Users/me/Project - NYPD Data": "/data/nypd"}
+# "parquet": models read a Parquet copy of each file, written once before the
+# models run and again only when the file changes. None: read the files.
+FILE_SOURCE_STAGING = None
+STAGING_DIR = os.path.join(OUTPUT_DIR, "staging")
+STAGING_PARTITION_BY = {}       # dataset name -> [columns] for hive-partitioned copies
+
+# --- ASYNC LLM PIPELINE ---
+# When enabled, conversions go through one asyncio client (ainvoke) with an
+# adaptive in-flight limit instead of one blocking call per worker thread.
+# Small components are grouped into multi-component prompts.
+ASYNC_LLM_ENABLED = False
+ASYNC_MIN_IN_FLIGHT = 2
+ASYNC_MAX_IN_FLIGHT = 16
+ASYNC_BATCH_SIZE = 4           # 1 disables multi-component prompts
+ASYNC_BATCH_MAX_CHARS = 2000   # only components with XML this small are batched
+ASYNC_BATCH_WINDOW_MS = 50
+
+# --- VALIDATION (MigrationTester) ---
+# Total CPU budget for model checks: worker threads x DuckDB threads.
+# Parse-only checks are single-threaded, so by default every core gets one
+# validator thread and DuckDB itself runs single-threaded.
+VALIDATION_THREADS = os.cpu_count() or 4
+VALIDATION_BATCH_SIZE = 32     # models per pool task
+VALIDATION_MODE = "parse"      # "parse" (extract_statements) or "explain"
+
+# --- PARITY (src/parity_checker.py) ---
+# Compares what a Talend job produced with what its model produces:
+# per-range hash aggregates first, rows only for the ranges that differ.
+# PARITY_TARGETS drives MigrationTester.check_parity():
+#   {"model_name": {"expected": "/data/out/result.csv" | "talend.table" | "SELECT ...",
+#                   "keys": ["ID"], "exclude": ["LOAD_TS"]}}   ("actual" defaults to the model)
+PARITY_TARGETS = {}
+PARITY_BUCKET_BITS = 12         # 4096 key-hash ranges per level
+PARITY_DRILL_ROWS = 100000      # fetch rows once the differing ranges hold at most this many
+PARITY_DRILL_BUCKETS = 256      # ranges followed per level when differences are widespread
+PARITY_FLOAT_DIGITS = 6
+PARITY_EMPTY_IS_NULL = True     # Talend file outputs write NULL as ''
+PARITY_SAMPLE = 10              # example rows per kind of difference
+PARITY_MEMORY_LIMIT = None      # e.g. "4GB"; DuckDB spills past it
+PARITY_THREADS = None           # None = DuckDB default
+PARITY_REPORT_PATH = os.path.join(OUTPUT_DIR, "parity_report.json")
+
+# --- TEMPORAL WORKER ---
+# Workflows and file scans run on TEMPORAL_TASK_QUEUE (any worker process).
+# Model builds go to TEMPORAL_DB_TASK_QUEUE, served by worker process 0 only:
+# DuckDB allows a single writing process per database file.
+TEMPORAL_ADDRESS = "localhost:7233"
+TEMPORAL_TASK_QUEUE = "talend-migration-queue"
+TEMPORAL_DB_TASK_QUEUE = "talend-migration-db"
+WORKER_PROCESSES = 1
+WORKER_MAX_ACTIVITIES = os.cpu_count() or 4       # per process
+WORKER_MAX_WORKFLOW_TASKS = 100                   # per process
+WORKER_EXECUTOR = "thread"                        # "thread" or "process" (main queue activities)
+DUCKDB_THREADS = None                             # DuckDB threads in the DB worker (None = DuckDB default)
+
+# --- DISTRIBUTED CONVERSION (src/migration_workflow.py) ---
+# run_migration.py --distributed: MigrationWorkflow plans the run on this
+# host (the coordinator, which writes all output) and converts each job in
+# its own activity on MIGRATION_CONVERT_QUEUE. Every host running
+#   python src/run_temporal_worker.py --roles convert --ollama-url http://localhost:11434
+# with the same Talend export and config takes jobs from that queue.
+MIGRATION_TASK_QUEUE = "talend-migration-plan"
+MIGRATION_CONVERT_QUEUE = "talend-migration-convert"
+MIGRATION_WORKFLOW_ID = "talend-conversion"   # re-triggering attaches to a running migration
+MIGRATION_MAX_PARALLEL = 64       # jobs in flight across all conversion hosts
+MIGRATION_JOB_ATTEMPTS = 5
+MIGRATION_JOB_TIMEOUT_MIN = 60
+MIGRATION_HEARTBEAT_S = 60        # a silent host's jobs are rescheduled after this long
+MIGRATION_CONTINUE_AFTER = 200    # jobs per workflow run (model text is in the history)
+CONVERT_WORKER_JOBS = 4           # jobs converted at once per conversion worker process
+
+# --- TEMPORAL WORKFLOW GENERATION ---
+# Each connected tRunJob subtree runs in its own JobTreeWorkflow (child);
+# small independent subtrees are packed together up to TEMPORAL_JOBS_PER_CHILD.
+TEMPORAL_MAX_PARALLEL = 8       # activities in flight per child workflow
+TEMPORAL_MAX_CHILDREN = 8       # child workflows in flight under MasterWorkflow
+TEMPORAL_JOBS_PER_CHILD = 50
+TEMPORAL_CONTINUE_AFTER = 200   # activities (child) / children (master) per run before continue-as-new
+TEMPORAL_ACTIVITY_MAX_ATTEMPTS = 3  # per activity; configuration errors are never retried
+# tFileList jobs (FileLoopWorkflow):
+# "batch":  one model run over every scanned file (a single read_csv/read_parquet)
+# "fanout": one run per file, FILE_LOOP_MAX_PARALLEL at a time (duckdb mode only)
+FILE_LOOP_MODE = "batch"
+FILE_LOOP_MAX_PARALLEL = 8
+
+# --- MODEL EXECUTION (Temporal activity) ---
+# "dbt":    one `dbt run --select m1 m2 ...` per batch (needs dbt-duckdb and
+#           a dbt_project.yml in DBT_OUTPUT_DIR)
+# "duckdb": render the models' Jinja and build them directly on DUCKDB_PATH
+# "auto":   dbt when available, otherwise duckdb
+DBT_EXECUTION_MODE = "auto"
+DBT_BATCH_SIZE = 10            # models per activity / dbt invocation
+DBT_PROFILES_DIR = DBT_OUTPUT_DIR
+DUCKDB_PATH = os.path.join(OUTPUT_DIR, "warehouse.duckdb")
+DBT_VARS = {}                  # values for {{ var('x') }} without a default
@@ -0,0 +1,310 @@
+"""
+Static clean-up of an assembled model (WITH ... SELECT * FROM final_cte).
+
+The engine emits one CTE per component, so models are full of steps that
+only cost planning time and hide the logic when reading them:
+
+    tReplicate_1 AS (SELECT * FROM tFilterRow_1)        -> inlined
+    tSortRow_1 AS (SELECT * FROM x ORDER BY "id" ASC)   -> ORDER BY dropped
+    tFilterRow_1 AS (SELECT * FROM x WHERE a > 0),
+    tMap_1 AS (SELECT a + 1 AS b FROM tFilterRow_1)     -> merged into one SELECT
+    final_cte AS (SELECT * FROM tMap_1)                 -> inlined
+
+The SQL is parsed with sqlglot (DuckDB dialect); Jinja expressions become
+placeholder identifiers for the round trip. Every rewrite is local and
+conservative: anything the optimizer cannot prove safe (joins, aggregates,
+windows, subqueries, volatile functions, LIMIT) is left alone, and a model
+that fails to parse, or whose rewrite no longer parses in DuckDB, is kept
+as it was.
+"""
+import re
+import time
+import duckdb
+import sqlglot
+from sqlglot import exp
+from src.instrumentation import RECORDER
+
+JINJA_EXPR_RE = re.compile(r"\{\{.*?\}\}", re.DOTALL)
+JINJA_BLOCK_RE = re.compile(r"\{%.*?%\}", re.DOTALL)
+
+# An ORDER BY upstream of these can change their result.
+ORDER_SENSITIVE_FUNCTIONS = {
+    "first", "last", "any_value", "arbitrary", "list", "array_agg", "string_agg", "group_concat",
+    "listagg", "histogram", "row_number", "lag", "lead", "first_value", "last_value", "nth_value",
+}
+# Must not be evaluated more often than the source wrote them.
+VOLATILE_FUNCTIONS = {"random", "uuid", "gen_random_uuid", "nextval", "setseed"}
+
+# Clauses that make a SELECT more than a per-row filter/projection.
+NON_SIMPLE_CLAUSES = ("joins", "laterals", "group", "having", "qualify", "distinct", "order", "limit",
+                      "offset", "windows", "with", "pivots", "sample")
+
+ACTION_KINDS = ("drop unused", "drop ORDER BY", "inline", "merge")
+
+
+def action_kind(action):
+    """'merge tFilterRow_1 into tMap_1' -> 'merge'."""
+    for kind in ACTION_KINDS:
+        if action.startswith(kind + " "):
+            return kind
+    return action
+
+
+def _key(node, name):
+    # sqlglot >= 26 suffixes reserved-word args: "from_", "with_".
+    return name + "_" if name + "_" in node.arg_types else name
+
+
+def _arg(node, name):
+    return node.args.get(_key(node, name))
+
+
+def _function_names(node):
+    names = set()
+    for func in node.find_all(exp.Func):
+        names.add((func.sql_name() if not isinstance(func, exp.Anonymous) else func.name).lower())
+    return names
+
+
+def _single_table(select):
+    """The Table of `FROM t` when it is the only source, else None."""
+    source = _arg(select, "from")
+    if source is None or _arg(select, "joins") or _arg(select, "laterals"):
+        return None
+    return source.this if isinstance(source.this, exp.Table) else None
+
+
+def _references(tree, name):
+    """Table nodes that read the CTE `name`."""
+    return [
+        t for t in tree.find_all(exp.Table)
+        if isinstance(t.this, exp.Identifier) and not t.args.get("db") and t.name.lower() == name
+    ]
+
+
+def _is_star(select):
+    return len(select.expressions) == 1 and isinstance(select.expressions[0], exp.Star) \
+        and not any(select.expressions[0].args.values())
+
+
+class CteOptimizer:
+    """
+    optimize(model_sql) -> (sql, actions), actions like
+    ["inline tReplicate_1", "drop ORDER BY tSortRow_1", "merge tFilterRow_1 into tMap_1",
+     "drop unused tLogRow_1"].
+    """
+    def __init__(self, dialect="duckdb"):
+        self.dialect = dialect
+
+    # --- MASKING ---
+    @staticmethod
+    def mask(sql):
+        placeholders = {}
+
+        def _sub(match):
+            key = f"__jinja_{len(placeholders)}__"
+            placeholders[key] = match.group(0)
+            return key
+        return JINJA_EXPR_RE.sub(_sub, sql), placeholders
+
+    @staticmethod
+    def unmask(sql, placeholders):
+        for key, text in placeholders.items():
+            sql = sql.replace(key, text)
+        return sql
+
+    # --- ENTRY POINT ---
+    def optimize(self, sql):
+        start = time.perf_counter()
+        try:
+            if JINJA_BLOCK_RE.search(sql):
+                return sql, []  # {% if %} blocks: not a single statement we can parse
+            masked, placeholders = self.mask(sql)
+            try:
+                tree = sqlglot.parse_one(masked, read=self.dialect)
+            except sqlglot.errors.SqlglotError:  # ParseError, TokenError, ...
+                return sql, []
+            if not isinstance(tree, exp.Select) or not tree.ctes:
+                return sql, []
+
+            actions = []
+            changed = True
+            while changed:
+                changed = (
+                    self._drop_unused(tree, actions)
+                    or self._drop_order_by(tree, actions)
+                    or self._inline_pass_through(tree, actions)
+                    or self._merge_projection(tree, actions)
+                )
+            if not actions:
+                return sql, []
+
+            optimized = tree.sql(dialect=self.dialect, pretty=True)
+            try:
+                with duckdb.connect() as con:
+                    con.extract_statements(optimized)
+            except Exception:
+                return sql, []
+            return self.unmask(optimized, placeholders), actions
+        finally:
+            RECORDER.record_stage("CteOptimizer.optimize", time.perf_counter() - start)
+
+    # --- PASSES ---
+    def _drop_unused(self, tree, actions):
+        """CTEs nothing reads, e.g. branches whose only consumer was an output."""
+        for cte in tree.ctes:
+            if not [ref for ref in _references(tree, cte.alias.lower()) if ref.find_ancestor(exp.CTE) is not cte]:
+                cte.pop()
+                actions.append(f"drop unused {cte.alias}")
+                return True
+        return False
+
+    def _drop_order_by(self, tree, actions):
+        """
+        ORDER BY inside a CTE is not part of the result unless a LIMIT uses it.
+        A LIMIT anywhere in the model may read an ordered CTE (directly or
+        through other CTEs), so then every ORDER BY stays.
+        """
+        if _function_names(tree) & ORDER_SENSITIVE_FUNCTIONS \
+                or any(d.args.get("on") for d in tree.find_all(exp.Distinct)) \
+                or tree.find(exp.Limit, exp.Offset, exp.Fetch):
+            return False
+        changed = False
+        for cte in tree.ctes:
+            body = cte.this
+            if _arg(body, "order"):
+                body.set(_key(body, "order"), None)
+                actions.append(f"drop ORDER BY {cte.alias}")
+                changed = True
+        return changed
+
+    def _inline_pass_through(self, tree, actions):
+        """`x AS (SELECT * FROM y)`: readers of x read y (aliased x) instead."""
+        for cte in tree.ctes:
+            body = cte.this
+            source = _single_table(body) if isinstance(body, exp.Select) else None
+            if source is None or not _is_star(body) or _arg(body, "where") \
+                    or any(_arg(body, clause) for clause in NON_SIMPLE_CLAUSES):
+                continue
+            name = cte.alias.lower()
+            if source.name.lower() == name:
+                continue
+            for ref in _references(tree, name):
+                if ref.find_ancestor(exp.CTE) is cte:
+                    continue
+                alias = ref.alias or cte.alias
+                scope = ref.find_ancestor(exp.Select)
+                qualified = scope is not None and any(
+                    c.table.lower() == alias.lower() for c in scope.find_all(exp.Column)
+                )
+                replacement = source.copy()
+                replacement.set("alias", exp.TableAlias(this=exp.to_identifier(alias)) if qualified or ref.alias else None)
+                ref.replace(replacement)
+            cte.pop()
+            actions.append(f"inline {cte.alias}")
+            return True
+        return False
+
+    def _merge_projection(self, tree, actions):
+        """
+        A filter/projection CTE read by exactly one single-source SELECT is
+        folded into it: WHERE clauses are ANDed and the reader's column
+        references are replaced by the upstream expressions.
+        """
+        for cte in tree.ctes:
+            upstream = cte.this
+            name = cte.alias.lower()
+            if not self._simple(upstream):
+                continue
+            refs = _references(tree, name)
+            if len(refs) != 1:
+                continue
+            ref = refs[0]
+            reader = ref.parent.parent if isinstance(ref.parent, exp.From) else None
+            # Readers are CTEs themselves: the final SELECT stays a plain SELECT * FROM.
+            if not isinstance(reader, exp.Select) or not isinstance(reader.parent, exp.CTE) \
+                    or _single_table(reader) is not ref or reader.find(exp.Subquery) \
+                    or any(s is not reader for s in reader.find_all(exp.Select)):
+                continue
+            mapping = self._output_map(upstream)
+            if mapping is False:
+                continue
+            merged = self._merge(upstream, reader, ref.alias_or_name.lower(), mapping)
+            if merged is None:
+                continue
+            reader_cte = reader.parent
+            reader.replace(merged)
+            cte.pop()
+            actions.append(f"merge {cte.alias} into {reader_cte.alias}")
+            return True
+        return False
+
+    # --- HELPERS ---
+    @staticmethod
+    def _simple(select):
+        if not isinstance(select, exp.Select) or _single_table(select) is None:
+            return False
+        if any(_arg(select, clause) for clause in NON_SIMPLE_CLAUSES):
+            return False
+        if select.find(exp.Window, exp.AggFunc, exp.Subquery) \
+                or any(s is not select for s in select.find_all(exp.Select)):
+            return False
+        return not (_function_names(select) & VOLATILE_FUNCTIONS)
+
+    @staticmethod
+    def _output_map(select):
+        """{lower output name: expression}, None for SELECT *, False if unnamed outputs."""
+        if _is_star(select):
+            return None
+        mapping = {}
+        for e in select.expressions:
+            if isinstance(e, exp.Star) or (isinstance(e, exp.Column) and isinstance(e.this, exp.Star)):
+                return False
+            if not e.alias_or_name or e.alias_or_name.lower() in mapping:
+                return False
+            mapping[e.alias_or_name.lower()] = e.unalias()
+        return mapping
+
+    @staticmethod
+    def _unqualify(select, qualifier):
+        """Drops `qualifier.` from columns of a single-source SELECT."""
+        for column in select.find_all(exp.Column):
+            if column.table and column.table.lower() == qualifier and not column.args.get("db"):
+                column.set("table", None)
+
+    def _merge(self, upstream, reader, reader_alias, mapping):
+        upstream = upstream.copy()
+        reader = reader.copy()
+        source = _single_table(upstream)
+        self._unqualify(upstream, source.alias_or_name.lower())
+        self._unqualify(reader, reader_alias)
+        if any(c.table for c in reader.find_all(exp.Column)) or any(c.table for c in upstream.find_all(exp.Column)):
+            return None
+
+        if mapping is not None:
+            # Every column the reader uses must be an upstream output.
+            columns = list(reader.find_all(exp.Column))
+            if any(isinstance(c.this, exp.Star) or c.name.lower() not in mapping for c in columns):
+                return None
+            if any(isinstance(e, exp.Star) and any(e.args.values()) for e in reader.expressions):
+                return None  # * EXCLUDE / REPLACE
+            # Bare columns keep their output name once substituted.
+            for e in list(reader.expressions):
+                if isinstance(e, exp.Column) and mapping[e.name.lower()].output_name != e.name:
+                    e.replace(exp.alias_(e.copy(), e.this.copy()))
+            for column in list(reader.find_all(exp.Column)):
+                replacement = mapping[column.name.lower()].copy()
+                if isinstance(column.parent, (exp.Binary, exp.Unary, exp.Between, exp.In)) \
+                        and not isinstance(replacement, (exp.Column, exp.Literal, exp.Paren, exp.Func, exp.Null, exp.Boolean)):
+                    replacement = exp.Paren(this=replacement)
+                column.replace(replacement)
+            expressions = []
+            for e in reader.expressions:
+                expressions.extend(u.copy() for u in upstream.expressions) if isinstance(e, exp.Star) else expressions.append(e)
+            reader.set("expressions", expressions)
+
+        reader.set(_key(reader, "from"), _arg(upstream, "from").copy())
+        conditions = [c.this for c in (_arg(upstream, "where"), _arg(reader, "where")) if c is not None]
+        if conditions:
+            reader.set(_key(reader, "where"), exp.Where(this=exp.and_(*conditions)))
+        return reader
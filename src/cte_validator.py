@@ -0,0 +1,63 @@
+import re
+import time
+from src.verify_migration import CursorPool
+from src.instrumentation import RECORDER
+from src.sql_util import quote
+
+JINJA_RE = re.compile(r"\{\{.*?\}\}|\{%.*?%\}", re.DOTALL)
+
+
+class CteValidator:
+    """
+    Inline check of one LLM-generated CTE, before it joins the model.
+
+    The CTE is bound with EXPLAIN on an in-memory DuckDB, behind empty
+    stand-ins for its upstream CTEs typed from their Talend metadata:
+
+        WITH row1 AS (SELECT CAST(NULL AS INTEGER) AS "id", ... WHERE false),
+             tMap_1 AS (<llm sql>)
+        SELECT * FROM tMap_1
+
+    so unknown columns, functions and type errors surface here instead of in
+    MigrationTester. Upstreams without a schema, or SQL containing Jinja,
+    get a parse-only check. Nothing is created in the catalog, so the
+    per-thread cursors never interfere.
+    """
+    def __init__(self, kb):
+        self.kb = kb
+        self.pool = CursorPool(duckdb_threads=1)
+
+    def stub_sql(self, name, columns):
+        select = ", ".join(f"CAST(NULL AS {self.kb.sql_type(c)}) AS {quote(c['name'])}" for c in columns)
+        return f"{quote(name)} AS (SELECT {select} WHERE false)"
+
+    def describe(self, upstream):
+        """Upstream schemas as prompt text: 'row1: id INTEGER, name VARCHAR'."""
+        return "\n".join(
+            f"{name}: " + (", ".join(f"{c['name']} {self.kb.sql_type(c)}" for c in columns) if columns else "(unknown)")
+            for name, columns in upstream.items()
+        )
+
+    def check(self, cte_name, sql, upstream):
+        """
+        upstream: {cte name: metadata columns or None}.
+        Returns None when the CTE is valid, otherwise DuckDB's error message.
+        """
+        start = time.perf_counter()
+        try:
+            cursor = self.pool.cursor()
+            body = f"{quote(cte_name)} AS (\n{sql}\n)"
+            if upstream and all(upstream.values()) and not JINJA_RE.search(sql):
+                stubs = [self.stub_sql(name, columns) for name, columns in upstream.items()]
+                cursor.execute(f"EXPLAIN WITH {', '.join(stubs + [body])} SELECT * FROM {quote(cte_name)}")
+            else:
+                # Parser only: Jinja becomes a placeholder table.
+                cursor.extract_statements(f"WITH {JINJA_RE.sub('dummy_table', body)} SELECT * FROM {quote(cte_name)}")
+            return None
+        except Exception as e:
+            return str(e).strip()
+        finally:
+            RECORDER.record_stage("CteValidator.check", time.perf_counter() - start)
+
+    def close(self):
+        self.pool.close()
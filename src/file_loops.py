@@ -0,0 +1,111 @@
+import re
+from src.talend_job import unquote, is_true
+from src.java_expr import tokenize, java_string_value, UntranslatableExpression
+
+GLOBALMAP_RE = re.compile(r'globalMap\.get\(\s*"([^"]+)"\s*\)')
+CONTEXT_RE = re.compile(r"\bcontext\.(\w+)")
+VAR_RE = re.compile(r"\{\{ var\('(\w+)'\) \}\}")
+
+
+def jinja_string(expression):
+    """
+    Java string expression made of literals and context variables
+    ("C:/in/" + context.region) as text with dbt vars: C:/in/{{ var('region') }}.
+    Anything else raises UntranslatableExpression.
+    """
+    parts, expect_operand = [], True
+    tokens = tokenize(expression or "")
+    i = 0
+    while i < len(tokens):
+        kind, value = tokens[i]
+        if expect_operand and kind == "string":
+            parts.append(java_string_value(value))
+            i += 1
+        elif expect_operand and value == "context" and i + 2 < len(tokens) and tokens[i + 1][1] == ".":
+            parts.append(f"{{{{ var('{tokens[i + 2][1]}') }}}}")
+            i += 3
+        elif not expect_operand and value == "+":
+            i += 1
+        else:
+            raise UntranslatableExpression(f"unsupported path expression {expression!r}")
+        expect_operand = not expect_operand
+    if expect_operand:
+        raise UntranslatableExpression(f"incomplete path expression {expression!r}")
+    return "".join(parts)
+
+
+def jinja_expression(text):
+    """jinja_string() output as a Jinja expression: 'C:/in/' ~ var('region')."""
+    parts = []
+    for i, part in enumerate(VAR_RE.split(text)):
+        if i % 2:
+            parts.append(f"var('{part}')")
+        elif part:
+            parts.append("'" + part.replace("\\", "\\\\").replace("'", "\\'") + "'")
+    return " ~ ".join(parts) or "''"
+
+
+def loop_var(component):
+    """dbt var that carries the file(s) of one tFileList iteration."""
+    return f"{component}_CURRENT_FILEPATH"
+
+
+def file_loop_specs(job):
+    """
+    tFileList components of a job as plain dicts (JSON-safe, so they can be
+    embedded in the generated workflow and passed to activities):
+        {"component", "directory", "masks", "glob", "recursive", "case_sensitive", "var"}
+    """
+    specs = []
+    for entry in job.components:
+        if entry.comp_type != "tFileList":
+            continue
+        try:
+            directory = jinja_string(entry.params.get("DIRECTORY"))
+        except UntranslatableExpression as e:
+            print(f"[WARN] {job.name}/{entry.unique_name}: {e}")
+            continue
+        masks = [unquote(row.get("FILEMASK") or "") for row in entry.tables.get("FILES") or []]
+        specs.append({
+            "component": entry.unique_name,
+            "directory": directory.rstrip("/\\").replace("\\", "/"),
+            "masks": [m for m in masks if m] or ["*"],
+            "glob": entry.params.get("GLOBEXPRESSIONS") is None or is_true(entry.params.get("GLOBEXPRESSIONS")),
+            "recursive": is_true(entry.params.get("INCLUDSUBDIR")),
+            "case_sensitive": entry.params.get("CASE_SENSITIVE") != "NO",
+            "var": loop_var(entry.unique_name),
+        })
+    return specs
+
+
+def iterated_spec(raw_filename, specs):
+    """The tFileList spec whose CURRENT_FILE(PATH) a FILENAME parameter reads, if any."""
+    for key in GLOBALMAP_RE.findall(raw_filename or ""):
+        for spec in specs:
+            if key.startswith(spec["component"] + "_CURRENT_FILE"):
+                return spec
+    return None
+
+
+def default_globs(spec):
+    """DuckDB globs equivalent to the tFileList (regex masks fall back to '*')."""
+    prefix = spec["directory"] + ("/**/" if spec["recursive"] else "/")
+    masks = spec["masks"] if spec["glob"] else ["*"]
+    return [prefix + mask for mask in masks]
+
+
+def loop_source_sql(spec):
+    """
+    Table function reading every file of the loop in one query. The file list
+    is the dbt var loop_var(component); by default it is the loop's glob, and
+    the Temporal FileLoopWorkflow passes the scanned paths (all at once, or
+    one file per run in fan-out mode).
+    """
+    default = "[" + ", ".join(jinja_expression(g) for g in default_globs(spec)) + "]"
+    files = f"{{{{ var('{spec['var']}', {default}) }}}}"
+    masks = " ".join(spec["masks"]).lower()
+    if ".parquet" in masks:
+        return f"read_parquet({files}, union_by_name = true)"
+    if ".json" in masks:
+        return f"read_json_auto({files}, union_by_name = true)"
+    return f"read_csv({files}, union_by_name = true)"
@@ -0,0 +1,354 @@
+"""
+Typed reads of Talend delimited file inputs.
+
+Instead of a raw source DuckDB has to sniff on every run, a
+tFileInputDelimited becomes a read_csv with the job's own settings:
+
+    SELECT * REPLACE (try_strptime("RPT_DT", '%m/%d/%Y')::DATE AS "RPT_DT")
+    FROM read_csv('/data/nypd/complaints.tsv', delim = '\\t', header = false, skip = 1,
+                  quote = '', escape = '', auto_detect = false,
+                  columns = {'CMPLNT_NUM': 'INTEGER', ..., 'RPT_DT': 'VARCHAR'})
+
+Columns and types come from the FLOW metadata; dates are read as text and
+parsed with their own Talend pattern (lenient unless CHECK_DATE is set, like
+Talend). With FILE_SOURCE_STAGING = "parquet" the model reads a Parquet copy
+instead; the copy is (re)written from the same SELECT by stage_file_sources()
+before the models run, only when the file changed.
+"""
+import os
+import re
+import glob
+import json
+import uuid
+import shutil
+import hashlib
+import threading
+import contextlib
+import duckdb
+from src.config import FILE_SOURCE_ROOTS, FILE_SOURCE_STAGING, STAGING_DIR, STAGING_PARTITION_BY
+from src.talend_job import is_true, dataset_name
+from src.java_expr import java_string_value, UntranslatableExpression
+from src.sql_util import sql_string, quote
+from src.file_loops import jinja_string
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DELIMITED_INPUTS = {"tFileInputDelimited", "tFileInputCSV"}
+# Staged sources: model -> keys, key -> spec. Written next to the models.
+STAGING_MANIFEST = "staging_sources.json"
+
+ENCODINGS = {
+    "ISO-8859-1": "latin-1", "ISO-8859-15": "latin-1", "CP1252": "latin-1", "WINDOWS-1252": "latin-1",
+    "UTF-16": "utf-16", "UTF-16LE": "utf-16", "UTF-16BE": "utf-16",
+}
+SQL_ESCAPES = {"\t": "\\t", "\n": "\\n", "\r": "\\r"}
+JINJA_SPLIT_RE = re.compile(r"(\{\{.*?\}\})")
+# stand_in_sources(): the reader calls FileSources writes and their typed columns.
+READ_CALL_RE = re.compile(r"\b(read_csv|read_parquet)\s*\(", re.IGNORECASE)
+COLUMNS_RE = re.compile(r"\bcolumns\s*=\s*\{((?:[^{}']|'(?:[^']|'')*')*)\}")
+COLUMN_RE = re.compile(r"'((?:[^']|'')*)'\s*:\s*'((?:[^']|'')*)'")
+FIRST_LITERAL_RE = re.compile(r"\(\s*('(?:[^']|'')*')")
+
+
+def _java_value(raw):
+    """Talend parameter holding a Java string literal ('"\\t"') as text."""
+    raw = (raw or "").strip()
+    if len(raw) >= 2 and raw[0] == raw[-1] == '"':
+        return java_string_value(raw)
+    return raw
+
+
+def _literal(value):
+    """SQL string for a delimiter/quote character ('\\t' stays readable)."""
+    return "'" + "".join(SQL_ESCAPES.get(ch, ch) for ch in value).replace("'", "''") + "'"
+
+
+def path_literal(path):
+    """SQL string of a path that may contain {{ var() }} (Jinja left untouched)."""
+    parts = JINJA_SPLIT_RE.split(path)
+    return "'" + "".join(p if i % 2 else p.replace("'", "''") for i, p in enumerate(parts)) + "'"
+
+
+def local_path(path):
+    """Talend path with FILE_SOURCE_ROOTS applied (longest matching prefix)."""
+    normalized = path.replace("\\", "/")
+    for root in sorted(FILE_SOURCE_ROOTS, key=len, reverse=True):
+        prefix = root.replace("\\", "/").rstrip("/")
+        if normalized.lower().startswith(prefix.lower() + "/"):
+            return FILE_SOURCE_ROOTS[root].replace("\\", "/").rstrip("/") + normalized[len(prefix):]
+    return normalized
+
+
+def _sql_text(body):
+    """Text of a SQL string literal's body ('' -> ')."""
+    return body.replace("''", "'")
+
+
+def _call_end(sql, open_paren):
+    """Index just past the ')' matching sql[open_paren] (string literals skipped)."""
+    depth, in_string = 0, False
+    for i in range(open_paren, len(sql)):
+        ch = sql[i]
+        if ch == "'":
+            in_string = not in_string
+        elif not in_string and ch == "(":
+            depth += 1
+        elif not in_string and ch == ")":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    return None
+
+
+def stand_in_sources(sql, staged=None):
+    """
+    sql with the file reads FileSources writes replaced by empty, typed
+    SELECTs, so EXPLAIN binds a model on a machine without the data files:
+    read_csv(..., columns = {...}) by its columns, read_parquet() of a staged
+    source (staged: "sources" of STAGING_MANIFEST) by the stand-in of its
+    read_csv. Other reads are left as they are. Jinja must be resolved or
+    masked first.
+    """
+    parquet = {path_literal(spec["path"] + "/**/*.parquet"): spec["select"] for spec in (staged or {}).values()}
+    out, pos = [], 0
+    for match in READ_CALL_RE.finditer(sql):
+        end = _call_end(sql, match.end() - 1) if match.start() >= pos else None
+        if end is None:
+            continue
+        call = sql[match.start():end]
+        replacement = None
+        if match.group(1).lower() == "read_csv":
+            columns = COLUMNS_RE.search(call)
+            if columns:
+                select = ", ".join(
+                    f"CAST(NULL AS {_sql_text(sql_type)}) AS {quote(_sql_text(name))}"
+                    for name, sql_type in COLUMN_RE.findall(columns.group(1))
+                )
+                replacement = f"(SELECT {select} WHERE false)" if select else None
+        else:
+            path = FIRST_LITERAL_RE.search(call)
+            if path and path.group(1) in parquet:
+                source = JINJA_SPLIT_RE.sub("dummy", parquet[path.group(1)])
+                replacement = f"({stand_in_sources(source)})"
+        if replacement:
+            out.extend([sql[pos:match.start()], replacement])
+            pos = end
+    out.append(sql[pos:])
+    return "".join(out)
+
+
+class FileSources:
+    """
+    select(job_name, entry) -> SELECT text for one file input component, or
+    None when the engine should fall back to its raw source reference.
+    """
+    def __init__(self, kb, staging=FILE_SOURCE_STAGING, staging_dir=STAGING_DIR,
+                 partition_by=STAGING_PARTITION_BY):
+        self.kb = kb
+        self.staging = staging
+        self.staging_dir = staging_dir.replace("\\", "/")
+        self.partition_by = partition_by
+        self.staged = {}    # key -> {"source", "select", "path", "partition_by"}
+        self.models = {}    # job -> [keys]
+        self._lock = threading.Lock()
+
+    def read_sql(self, entry):
+        """(csv path text, typed SELECT) or None if the component can't be read this way."""
+        if entry.comp_type not in DELIMITED_INPUTS or not entry.columns:
+            return None
+        if (entry.params.get("FOOTER") or "0").strip() not in ("", "0"):
+            return None  # DuckDB cannot drop trailing lines
+        try:
+            path = local_path(jinja_string(entry.params.get("FILENAME")))
+        except UntranslatableExpression:
+            return None
+
+        header = (entry.params.get("HEADER") or "0").strip()
+        options = [
+            f"delim = {_literal(_java_value(entry.params.get('FIELDSEPARATOR')) or ';')}",
+            "header = false",
+            f"skip = {int(header) if header.isdigit() else 0}",
+        ]
+        if is_true(entry.params.get("CSV_OPTION")):
+            options.append(f"quote = {_literal(_java_value(entry.params.get('TEXT_ENCLOSURE')))}")
+            options.append(f"escape = {_literal(_java_value(entry.params.get('ESCAPE_CHAR')))}")
+        else:
+            # Plain split on the separator: quotes are data.
+            options.extend(["quote = ''", "escape = ''"])
+        encoding = ENCODINGS.get(_java_value(entry.params.get("ENCODING")).upper())
+        if encoding:
+            options.append(f"encoding = '{encoding}'")
+
+        columns, replace = [], []
+        trim = is_true(entry.params.get("TRIMALL"))
+        parse = "strptime" if is_true(entry.params.get("CHECK_DATE")) else "try_strptime"
+        for col in entry.columns:
+            sql_type = self.kb.sql_type(col)
+            name = quote(col["name"])
+            if col.get("type") == "id_Date" and (col.get("pattern") or "").strip('"'):
+                fmt = sql_string(self.kb.strftime_pattern(col["pattern"]))
+                value = f"trim({name})" if trim else name
+                replace.append(f"{parse}({value}, {fmt})::{sql_type} AS {name}")
+                sql_type = "VARCHAR"
+            elif trim and sql_type == "VARCHAR":
+                replace.append(f"trim({name}) AS {name}")
+            columns.append(f"{sql_string(col['name'])}: '{sql_type}'")
+        options.extend(["auto_detect = false", "columns = {" + ", ".join(columns) + "}"])
+
+        star = f"* REPLACE ({', '.join(replace)})" if replace else "*"
+        return path, f"SELECT {star} FROM read_csv({path_literal(path)}, {', '.join(options)})"
+
+    def select(self, job_name, entry):
+        read = self.read_sql(entry)
+        if read is None:
+            return None
+        path, sql = read
+        if self.staging != "parquet":
+            return sql
+        name = dataset_name(entry) or entry.unique_name
+        key = f"{name}_{hashlib.sha1(path.encode('utf-8')).hexdigest()[:8]}"
+        target = f"{self.staging_dir}/{key}"
+        with self._lock:
+            self.staged[key] = {"source": path, "select": sql, "path": target,
+                                "partition_by": list(self.partition_by.get(name, []))}
+            self.models.setdefault(job_name, [])
+            if key not in self.models[job_name]:
+                self.models[job_name].append(key)
+        return f"SELECT * FROM read_parquet({path_literal(target + '/**/*.parquet')}, hive_partitioning = true)"
+
+    def pop_job(self, job_name):
+        """Staged sources of one job ({key: spec}), removed from this run's job list."""
+        with self._lock:
+            keys = self.models.pop(job_name, [])
+            return {key: self.staged[key] for key in keys}
+
+    def merge(self, job_name, staged):
+        """Adds one job's staged sources, as returned by pop_job() in another process."""
+        with self._lock:
+            self.staged.update(staged)
+            self.models[job_name] = sorted(staged)
+
+    def write_manifest(self, dbt_dir, converted=(), deleted=()):
+        """
+        Merges this run's staged sources into dbt_dir/STAGING_MANIFEST:
+        jobs converted this run (or deleted) replace their previous entries.
+        """
+        path = os.path.join(dbt_dir, STAGING_MANIFEST)
+        data = {"models": {}, "sources": {}}
+        if os.path.exists(path):
+            with open(path, "r", encoding='utf-8') as f:
+                data = json.load(f)
+        for job in set(converted) | set(deleted):
+            data["models"].pop(job, None)
+        data["models"].update(self.models)
+        data["sources"].update(self.staged)
+        used = {key for keys in data["models"].values() for key in keys}
+        data["sources"] = {k: v for k, v in sorted(data["sources"].items()) if k in used}
+        if not data["models"] and not os.path.exists(path):
+            return None
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, path)
+        return path
+
+
+# --- RUNTIME (activities) ---
+_stage_locks = {}
+_stage_locks_guard = threading.Lock()
+
+
+def _stage_lock(key):
+    with _stage_locks_guard:
+        return _stage_locks.setdefault(key, threading.Lock())
+
+
+@contextlib.contextmanager
+def _file_lock(path):
+    """Exclusive lock on path across worker processes (_stage_lock only covers threads)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass  # LK_LOCK gives up after ~10s; keep waiting
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def stage_file_sources(dbt_dir, models, render):
+    """
+    Writes the Parquet copies the given models read, skipping those whose
+    source file is unchanged since it was staged (size + mtime).
+    render(text) resolves Jinja (vars) in paths and SELECTs.
+    Returns {key: "staged" | "fresh" | "missing"}.
+    """
+    path = os.path.join(dbt_dir, STAGING_MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding='utf-8') as f:
+        data = json.load(f)
+    keys = sorted({key for model in models for key in data["models"].get(model, [])})
+    results = {}
+    for key in keys:
+        spec = data["sources"][key]
+        with _stage_lock(key), _file_lock(spec["path"] + ".lock"):
+            results[key] = _stage(spec, render)
+    return results
+
+
+def _stage(spec, render):
+    source = render(spec["source"])
+    if not os.path.isfile(source):
+        return "missing"
+    st = os.stat(source)
+    stamp = {"source": source, "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+             "select": spec["select"], "partition_by": spec["partition_by"]}
+    marker = os.path.join(spec["path"], "_staged.json")
+    if os.path.exists(marker):
+        with open(marker, "r", encoding='utf-8') as f:
+            if json.load(f) == stamp:
+                return "fresh"
+
+    # Fresh directory: a partitioned COPY never removes stale partitions.
+    # Private name per process; under the file lock any other one is left
+    # over from a killed worker.
+    for stale in glob.glob(glob.escape(spec["path"]) + ".tmp-*"):
+        shutil.rmtree(stale, ignore_errors=True)
+    tmp_dir = f"{spec['path']}.tmp-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    os.makedirs(tmp_dir)
+    con = duckdb.connect()
+    try:
+        if spec["partition_by"]:
+            columns = ", ".join(quote(c) for c in spec["partition_by"])
+            con.execute(f"COPY ({render(spec['select'])}) TO {sql_string(tmp_dir)} "
+                        f"(FORMAT parquet, PARTITION_BY ({columns}), OVERWRITE_OR_IGNORE)")
+        else:
+            con.execute(f"COPY ({render(spec['select'])}) TO {sql_string(tmp_dir + '/data.parquet')} (FORMAT parquet)")
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    finally:
+        con.close()
+    with open(os.path.join(tmp_dir, "_staged.json"), "w", encoding='utf-8') as f:
+        json.dump(stamp, f, indent=2)
+    shutil.rmtree(spec["path"], ignore_errors=True)
+    os.replace(tmp_dir, spec["path"])
+    return "staged"
+
@@ -1,46 +1,109 @@
 import os
 import glob
 import networkx as nx
-from lxml import etree
+from src.talend_job import load_job, job_name_from_path, dataset_param, dataset_name, unquote, is_true
+from src.file_loops import file_loop_specs
+from src.instrumentation import RECORDER
 
 class ProjectGraph:
     def __init__(self, root_dir):
         self.root = root_dir
         self.graph = nx.DiGraph()
+        # Parsed TalendJob models, shared with MigrationEngine so each .item
+        # file is read once. Released per job once its conversion finishes.
+        self.jobs = {}
+        # Dataset name -> jobs that read it (Input components), for fan_out().
+        self.readers = {}
 
     def build(self):
+        with RECORDER.stage("ProjectGraph.build"):
+            return self._build()
+
+    def _build(self):
         print(f"[INFO] Scanning {self.root} for Jobs & Joblets...")
         files = glob.glob(os.path.join(self.root, "**", "*.item"), recursive=True)
         
         for filepath in files:
-            self._analyze_file(filepath)
-            
+            with RECORDER.stage("ProjectGraph._analyze_file"):
+                self._analyze_file(filepath)
+
+        self.readers = {}
+        for job_name, data in self.graph.nodes(data=True):
+            for name in data.get('reads', ()):
+                self.readers.setdefault(name.lower(), set()).add(job_name)
         print(f"[SUCCESS] Graph Built: {self.graph.number_of_nodes()} Nodes found.")
         return self.graph
 
+    def get_job(self, job_name):
+        """Shared parsed model; re-parses if it was already released."""
+        job = self.jobs.get(job_name)
+        if job is None:
+            job = load_job(self.graph.nodes[job_name]['filepath'])
+        return job
+
+    def release_job(self, job_name):
+        self.jobs.pop(job_name, None)
+
+    def fan_out(self, job_name):
+        """Other jobs that read a table or file this job writes."""
+        readers = set()
+        for output in self.graph.nodes[job_name].get('outputs', ()):
+            if output["dataset"]:
+                readers |= self.readers.get(output["dataset"].lower(), set())
+        readers.discard(job_name)
+        return readers
+
     def _analyze_file(self, filepath):
-        job_name = os.path.basename(filepath).replace("_0.1.item", "")
+        job_name = job_name_from_path(filepath)
         is_joblet = "joblets" in filepath.lower()
         
         node_type = "joblet" if is_joblet else "standard"
         
         try:
-            tree = etree.parse(filepath)
-            ns = tree.getroot().nsmap
-            if None in ns: ns['t'] = ns.pop(None)
+            job = load_job(filepath)
             
             # Check for Loops (Orchestration)
-            if tree.xpath("//node[contains(@componentName, 'Loop') or contains(@componentName, 'FileList')]", namespaces=ns):
+            if job.is_orchestration():
                 node_type = "orchestration"
                 
-            self.graph.add_node(job_name, filepath=filepath, type=node_type)
+            self.graph.add_node(job_name, filepath=filepath, type=node_type, **self._datasets(job))
+            if node_type == "orchestration":
+                # tFileList scans, executed by the generated FileLoopWorkflow
+                self.graph.nodes[job_name]['file_loops'] = file_loop_specs(job)
+            self.jobs[job_name] = job
             
             # Find Dependencies
             # 1. tRunJob
-            for node in tree.xpath("//node[@componentName='tRunJob']", namespaces=ns):
-                param = node.find("elementParameter[@name='PROCESS:PROCESS_TYPE_PROCESS']", namespaces=ns)
-                if param is not None:
-                    self.graph.add_edge(job_name, param.get("value"))
+            for child in job.run_jobs:
+                self.graph.add_edge(job_name, child)
                     
         except Exception as e:
-            print(f"[WARN] Failed to parse {job_name}: {e}")
\ No newline at end of file
+            print(f"[WARN] Failed to parse {job_name}: {e}")
+
+    @staticmethod
+    def _datasets(job):
+        """
+        What the job reads and writes, kept on the graph node after the
+        parsed job is released (materialization advice, fan-out):
+            reads:   dataset names of Input components
+            sources: {dataset name: local file path} for file inputs
+            outputs: [{type, dataset, data_action, table_action, append, keys}]
+        """
+        reads, sources, outputs = [], {}, []
+        for entry in job.components:
+            comp_type = entry.comp_type or ""
+            name = dataset_name(entry)
+            if "Input" in comp_type and name:
+                reads.append(name)
+                if "FILENAME" in entry.params:
+                    sources[name] = unquote(dataset_param(entry)).replace('\\', '/')
+            elif "Output" in comp_type:
+                outputs.append({
+                    "type": comp_type,
+                    "dataset": name,
+                    "data_action": (entry.params.get("DATA_ACTION") or "").upper(),
+                    "table_action": (entry.params.get("TABLE_ACTION") or "").upper(),
+                    "append": is_true(entry.params.get("APPEND")),
+                    "keys": [c["name"] for c in entry.columns if is_true(c.get("key")) and c.get("name")],
+                })
+        return {"reads": reads, "sources": sources, "outputs": outputs}
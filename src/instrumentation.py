@@ -0,0 +1,169 @@
+import os
+import json
+import math
+import time
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+def percentile(values, q):
+    """Nearest-rank percentile (q in 0..100); None for an empty list."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(q / 100 * len(ordered))) - 1]
+
+
+def _latency(values):
+    return {
+        "count": len(values),
+        "total_s": round(sum(values), 4),
+        "p50_s": round(percentile(values, 50), 4) if values else None,
+        "p95_s": round(percentile(values, 95), 4) if values else None,
+        "max_s": round(max(values), 4) if values else None,
+    }
+
+
+class RunRecorder:
+    """
+    Process-wide collector for one migration run (thread-safe):
+      - stages:     named durations (ProjectGraph.build, one entry per
+                    _process_xml_chain job, per LLM call, per model check...)
+      - components: one record per converted component with its path
+                    (source/rule/llm/...), wall time, LLM tokens, cache hit
+                    and retries.
+      - prompts:    estimated tokens of each LLM-bound component before and
+                    after prompt compaction (xml_distiller).
+    write_report() summarises them with p50/p95 latencies.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.stages = defaultdict(list)
+            self.components = []
+            self.prompts = defaultdict(lambda: [0, 0, 0])   # type -> [n, tokens before, after]
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stage(name, time.perf_counter() - start)
+
+    def record_stage(self, name, seconds):
+        with self._lock:
+            self.stages[name].append(seconds)
+
+    def record_component(self, job, component, comp_type, path, seconds, usage=None):
+        """usage: the "usage" dict SouravAgent attaches to LLM results."""
+        usage = usage or {}
+        record = {
+            "job": job,
+            "component": component,
+            "type": comp_type,
+            "path": path,
+            "seconds": round(seconds, 4),
+            "llm_seconds": round(usage.get("seconds", 0.0), 4),
+            "tokens_in": usage.get("tokens_in", 0),
+            "tokens_out": usage.get("tokens_out", 0),
+            "cache_hit": bool(usage.get("cache_hit")),
+            "retries": usage.get("retries", 0),
+        }
+        with self._lock:
+            self.components.append(record)
+
+    def record_prompt(self, comp_type, tokens_before, tokens_after):
+        with self._lock:
+            counts = self.prompts[comp_type]
+            counts[0] += 1
+            counts[1] += tokens_before
+            counts[2] += tokens_after
+
+    def summary(self):
+        with self._lock:
+            stages = {name: list(values) for name, values in self.stages.items()}
+            components = list(self.components)
+            prompts = {comp_type: list(counts) for comp_type, counts in self.prompts.items()}
+
+        by_type = defaultdict(list)
+        for record in components:
+            by_type[record["type"]].append(record)
+        component_types = {}
+        for comp_type, records in sorted(by_type.items()):
+            paths = defaultdict(int)
+            for record in records:
+                paths[record["path"]] += 1
+            llm = [r["llm_seconds"] for r in records if r["path"] == "llm" and not r["cache_hit"]]
+            component_types[comp_type] = {
+                **_latency([r["seconds"] for r in records]),
+                "llm": _latency(llm),
+                "paths": dict(paths),
+                "tokens_in": sum(r["tokens_in"] for r in records),
+                "tokens_out": sum(r["tokens_out"] for r in records),
+                "cache_hits": sum(r["cache_hit"] for r in records),
+                "retries": sum(r["retries"] for r in records),
+            }
+
+        return {
+            "stages": {name: _latency(values) for name, values in sorted(stages.items())},
+            "component_types": component_types,
+            "prompts": {
+                comp_type: {"count": n, "tokens_before": before, "tokens_after": after}
+                for comp_type, (n, before, after) in sorted(prompts.items())
+            },
+            "totals": {
+                "components": len(components),
+                "llm_calls": sum(1 for r in components if r["path"] == "llm" and not r["cache_hit"]),
+                "cache_hits": sum(r["cache_hit"] for r in components),
+                "retries": sum(r["retries"] for r in components),
+                "tokens_in": sum(r["tokens_in"] for r in components),
+                "tokens_out": sum(r["tokens_out"] for r in components),
+                "prompt_tokens_before": sum(p[1] for p in prompts.values()),
+                "prompt_tokens_after": sum(p[2] for p in prompts.values()),
+            },
+        }
+
+    def write_report(self, path):
+        """Writes {"started", "finished", "summary", "components"} as JSON."""
+        with self._lock:
+            components = list(self.components)
+        summary = self.summary()
+        data = {
+            "started": self.started,
+            "finished": time.time(),
+            "summary": summary,
+            "components": components,
+        }
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, path)
+        return summary
+
+    def print_summary(self, summary=None, top=10):
+        summary = summary or self.summary()
+        for name, s in summary["stages"].items():
+            print(f"[REPORT] Stage {name}: n={s['count']} total={s['total_s']:.2f}s "
+                  f"p50={s['p50_s']:.3f}s p95={s['p95_s']:.3f}s")
+        slowest = sorted(summary["component_types"].items(), key=lambda kv: kv[1]["p95_s"] or 0, reverse=True)
+        for comp_type, s in slowest[:top]:
+            print(f"[REPORT] {comp_type}: n={s['count']} p50={s['p50_s']:.3f}s p95={s['p95_s']:.3f}s "
+                  f"tokens={s['tokens_in']}/{s['tokens_out']} cache_hits={s['cache_hits']} retries={s['retries']}")
+        t = summary["totals"]
+        print(f"[REPORT] LLM: {t['llm_calls']} calls, {t['cache_hits']} cache hits, {t['retries']} retries, "
+              f"{t['tokens_in']} prompt / {t['tokens_out']} completion tokens")
+        if t["prompt_tokens_before"]:
+            saved = 1 - t["prompt_tokens_after"] / t["prompt_tokens_before"]
+            print(f"[REPORT] Component definitions: ~{t['prompt_tokens_before']} -> ~{t['prompt_tokens_after']} "
+                  f"tokens after compaction (-{saved:.0%})")
+
+
+# One recorder per process: every stage reports here.
+RECORDER = RunRecorder()
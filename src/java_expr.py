@@ -0,0 +1,454 @@
+import re
+from src.sql_util import sql_string, quote_ident
+
+
+class UntranslatableExpression(Exception):
+    """Raised when an expression uses Java the translator cannot map to SQL."""
+
+
+# ==============================================================================
+#  TOKENIZER
+# ==============================================================================
+TOKEN_RE = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<string>"(?:[^"\\]|\\.)*")
+  | (?P<char>'(?:[^'\\]|\\.)')
+  | (?P<number>(?:\d+\.\d*|\.\d+)(?:[eE][+-]?\d+)?[dDfF]?|\d+(?:[eE][+-]?\d+)?[lLdDfF]?)
+  | (?P<ident>[A-Za-z_$][A-Za-z0-9_$]*)
+  | (?P<op>==|!=|<=|>=|&&|\|\||[-+*/%<>!?:().,])
+""", re.VERBOSE)
+
+JAVA_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "\\": "\\", '"': '"', "'": "'", "0": "\0"}
+
+
+def tokenize(expression):
+    tokens, pos = [], 0
+    while pos < len(expression):
+        match = TOKEN_RE.match(expression, pos)
+        if not match:
+            raise UntranslatableExpression(f"unexpected character {expression[pos]!r}")
+        pos = match.end()
+        kind = match.lastgroup
+        if kind != "ws":
+            tokens.append((kind, match.group()))
+    return tokens
+
+
+def java_string_value(literal):
+    body = literal[1:-1]
+    return re.sub(r"\\(.)", lambda m: JAVA_ESCAPES.get(m.group(1), m.group(1)), body)
+
+
+# ==============================================================================
+#  PARSER (precedence climbing) -> tuple AST
+# ==============================================================================
+# Kinds: "integer" (Java int/long/short arithmetic) vs "number" (floating /
+# decimal) decides '/' between integer and float division.
+CAST_TYPES = {
+    "String": ("VARCHAR", "string"), "Integer": ("INTEGER", "integer"), "int": ("INTEGER", "integer"),
+    "Long": ("BIGINT", "integer"), "long": ("BIGINT", "integer"), "Short": ("SMALLINT", "integer"),
+    "short": ("SMALLINT", "integer"), "Double": ("DOUBLE", "number"), "double": ("DOUBLE", "number"),
+    "Float": ("FLOAT", "number"), "float": ("FLOAT", "number"), "BigDecimal": ("DECIMAL(38, 10)", "number"),
+    "Boolean": ("BOOLEAN", "bool"), "boolean": ("BOOLEAN", "bool"), "Date": ("TIMESTAMP", "date"),
+    "Object": (None, "unknown"),
+}
+BINARY_PRECEDENCE = [("||",), ("&&",), ("==", "!="), ("<", ">", "<=", ">="), ("+", "-"), ("*", "/", "%")]
+
+
+class _Parser:
+    def __init__(self, tokens, static_classes):
+        self.tokens = tokens
+        self.pos = 0
+        self.static_classes = static_classes
+
+    def peek(self, offset=0):
+        i = self.pos + offset
+        return self.tokens[i] if i < len(self.tokens) else (None, None)
+
+    def take(self, value=None):
+        tok = self.peek()
+        if tok[0] is None or (value is not None and tok[1] != value):
+            raise UntranslatableExpression(f"expected {value!r}, found {tok[1]!r}")
+        self.pos += 1
+        return tok
+
+    def parse(self):
+        node = self.ternary()
+        if self.peek()[0] is not None:
+            raise UntranslatableExpression(f"unexpected token {self.peek()[1]!r}")
+        return node
+
+    def ternary(self):
+        cond = self.binary(0)
+        if self.peek()[1] == "?":
+            self.take("?")
+            then = self.ternary()
+            self.take(":")
+            return ("ternary", cond, then, self.ternary())
+        return cond
+
+    def binary(self, level):
+        if level == len(BINARY_PRECEDENCE):
+            return self.unary()
+        left = self.binary(level + 1)
+        while self.peek()[0] == "op" and self.peek()[1] in BINARY_PRECEDENCE[level]:
+            op = self.take()[1]
+            left = ("binary", op, left, self.binary(level + 1))
+        return left
+
+    def unary(self):
+        kind, value = self.peek()
+        if value in ("!", "-"):
+            self.take()
+            return ("unary", value, self.unary())
+        # (Type) expr
+        if value == "(" and self.peek(1)[1] in CAST_TYPES and self.peek(2)[1] == ")":
+            next_kind, next_value = self.peek(3)
+            if next_kind in ("ident", "string", "number", "char") or next_value == "(":
+                self.take("(")
+                type_name = self.take()[1]
+                self.take(")")
+                return ("cast", type_name, self.unary())
+        return self.postfix()
+
+    def postfix(self):
+        node = self.primary()
+        while self.peek()[1] == ".":
+            self.take(".")
+            name = self.take()[1]
+            if self.peek()[1] == "(":
+                node = ("method", node, name, self.arguments())
+            else:
+                raise UntranslatableExpression(f"field access .{name} on an expression")
+        return node
+
+    def arguments(self):
+        self.take("(")
+        args = []
+        if self.peek()[1] != ")":
+            args.append(self.ternary())
+            while self.peek()[1] == ",":
+                self.take(",")
+                args.append(self.ternary())
+        self.take(")")
+        return args
+
+    def primary(self):
+        kind, value = self.peek()
+        if kind == "string":
+            self.take()
+            return ("lit", "string", sql_string(java_string_value(value)))
+        if kind == "char":
+            self.take()
+            return ("lit", "string", sql_string(java_string_value(value)))
+        if kind == "number":
+            self.take()
+            integer = re.fullmatch(r"\d+[lL]?", value) is not None
+            return ("lit", "integer" if integer else "number", value.rstrip("lLdDfF") or value)
+        if value == "(":
+            self.take("(")
+            node = self.ternary()
+            self.take(")")
+            return node
+        if kind == "ident":
+            if value in ("true", "false"):
+                self.take()
+                return ("lit", "bool", value.upper())
+            if value == "null":
+                self.take()
+                return ("lit", "null", "NULL")
+            if value == "new":
+                raise UntranslatableExpression("object construction")
+            return self.qualified_name()
+        raise UntranslatableExpression(f"unexpected token {value!r}")
+
+    def qualified_name(self):
+        # a.b.c            -> ("name", [a, b, c])
+        # Class.fn(...)    -> ("static", "Class.fn", args)   when Class is known
+        # a.b.fn(...)      -> ("method", ("name", [a, b]), fn, args)
+        parts = [self.take()[1]]
+        while self.peek()[1] == "." and self.peek(1)[0] == "ident":
+            self.take(".")
+            parts.append(self.take()[1])
+            if self.peek()[1] == "(":
+                owner = ".".join(parts[:-1])
+                if owner in self.static_classes:
+                    return ("static", ".".join(parts), self.arguments())
+                return ("method", ("name", parts[:-1]), parts[-1], self.arguments())
+        if self.peek()[1] == "(":
+            return ("static", parts[0], self.arguments())
+        return ("name", parts)
+
+
+# ==============================================================================
+#  SQL GENERATION
+# ==============================================================================
+# Java standard library calls outside the Talend routine map.
+JAVA_STATIC = {
+    "Integer.parseInt": ("CAST({arg1} AS INTEGER)", "integer"),
+    "Integer.valueOf": ("CAST({arg1} AS INTEGER)", "integer"),
+    "Long.parseLong": ("CAST({arg1} AS BIGINT)", "integer"),
+    "Long.valueOf": ("CAST({arg1} AS BIGINT)", "integer"),
+    "Double.parseDouble": ("CAST({arg1} AS DOUBLE)", "number"),
+    "Double.valueOf": ("CAST({arg1} AS DOUBLE)", "number"),
+    "Float.parseFloat": ("CAST({arg1} AS FLOAT)", "number"),
+    "Boolean.parseBoolean": ("CAST({arg1} AS BOOLEAN)", "bool"),
+    "String.valueOf": ("CAST({arg1} AS VARCHAR)", "string"),
+    "Math.abs": ("abs({arg1})", "number"),
+    "Math.round": ("round({arg1})", "number"),
+    "Math.floor": ("floor({arg1})", "number"),
+    "Math.ceil": ("ceil({arg1})", "number"),
+    "Math.max": ("greatest({arg1}, {arg2})", "number"),
+    "Math.min": ("least({arg1}, {arg2})", "number"),
+    "Math.pow": ("power({arg1}, {arg2})", "number"),
+    "Math.sqrt": ("sqrt({arg1})", "number"),
+}
+
+# Instance methods on strings / boxed values: (template with {self}, {arg1}.., result kind)
+JAVA_METHODS = {
+    ("equals", 1): ("({self} = {arg1})", "bool"),
+    ("equalsIgnoreCase", 1): ("(lower({self}) = lower({arg1}))", "bool"),
+    ("toUpperCase", 0): ("upper({self})", "string"),
+    ("toLowerCase", 0): ("lower({self})", "string"),
+    ("trim", 0): ("trim({self})", "string"),
+    ("length", 0): ("length({self})", "integer"),
+    ("isEmpty", 0): ("(length({self}) = 0)", "bool"),
+    ("substring", 1): ("substring({self}, ({arg1}) + 1)", "string"),
+    ("substring", 2): ("substring({self}, ({arg1}) + 1, ({arg2}) - ({arg1}))", "string"),
+    ("charAt", 1): ("substring({self}, ({arg1}) + 1, 1)", "string"),
+    ("contains", 1): ("contains({self}, {arg1})", "bool"),
+    ("startsWith", 1): ("starts_with({self}, {arg1})", "bool"),
+    ("endsWith", 1): ("ends_with({self}, {arg1})", "bool"),
+    ("indexOf", 1): ("(strpos({self}, {arg1}) - 1)", "integer"),
+    ("replace", 2): ("replace({self}, {arg1}, {arg2})", "string"),
+    ("replaceAll", 2): ("regexp_replace({self}, {arg1}, {arg2}, 'g')", "string"),
+    ("matches", 1): ("regexp_full_match({self}, {arg1})", "bool"),
+    ("toString", 0): ("CAST({self} AS VARCHAR)", "string"),
+    ("intValue", 0): ("CAST({self} AS INTEGER)", "integer"),
+    ("longValue", 0): ("CAST({self} AS BIGINT)", "integer"),
+    ("doubleValue", 0): ("CAST({self} AS DOUBLE)", "number"),
+    ("compareTo", 1): ("CASE WHEN {self} < {arg1} THEN -1 WHEN {self} > {arg1} THEN 1 ELSE 0 END", "integer"),
+}
+
+# Result kind of Talend routines (class default, then per-function overrides).
+ROUTINE_KINDS = {"StringHandling": "string", "Mathematical": "number", "TalendDate": "date",
+                 "Relational": "bool", "Numeric": "number", "BigDecimal": "number", "DataOperation": "string"}
+FUNCTION_KINDS = {
+    "StringHandling.ALPHA": "bool", "StringHandling.IS_ALPHA": "bool", "StringHandling.COUNT": "integer",
+    "StringHandling.INDEX": "integer", "StringHandling.LEN": "integer", "TalendDate.formatDate": "string",
+    "TalendDate.diffDate": "integer", "TalendDate.compareDate": "integer", "TalendDate.getPartOfDate": "integer",
+    "TalendDate.isDate": "bool", "DataOperation.DT": "date",
+}
+
+# Arguments that must be string literals and get rewritten before substitution.
+DATE_UNITS = {"yyyy": "YEAR", "MM": "MONTH", "dd": "DAY", "HH": "HOUR", "mm": "MINUTE", "ss": "SECOND", "SSS": "MILLISECOND"}
+DATE_PARTS = {"YEAR": "year", "MONTH": "month", "DAY_OF_MONTH": "day", "DAY_OF_WEEK": "dow", "DAY_OF_YEAR": "doy",
+              "WEEK_OF_YEAR": "week", "HOUR": "hour", "HOUR_OF_DAY": "hour", "MINUTE": "minute", "SECOND": "second",
+              "MILLISECOND": "millisecond"}
+ARG_ADAPTERS = {
+    ("TalendDate.formatDate", 1): "date_pattern",
+    ("TalendDate.parseDate", 1): "date_pattern",
+    ("TalendDate.addDate", 2): "paren",
+    ("TalendDate.addDate", 3): "interval_unit",
+    ("TalendDate.diffDate", 3): "diff_unit",
+    ("TalendDate.getPartOfDate", 1): "date_part",
+}
+
+# Routines whose value depends on the order rows arrive in (a per-job
+# counter): row_number() OVER () has no such order in DuckDB, so the LLM
+# gets them with the rest of the component.
+ORDER_DEPENDENT = {"Numeric.sequence"}
+
+# Talend job globals.
+GLOBALS = {"pid": ("'{{ invocation_id }}'", "string")}
+
+TALEND_KINDS = {"id_String": "string", "id_Character": "string", "id_Date": "date", "id_Boolean": "bool",
+                "id_Integer": "integer", "id_Long": "integer", "id_Short": "integer", "id_Byte": "integer",
+                "id_Double": "number", "id_Float": "number", "id_BigDecimal": "number"}
+
+PLACEHOLDER_RE = re.compile(r"\{(?:self|arg(\d+))\}")
+NUMERIC_KINDS = ("integer", "number")
+
+
+def _arithmetic_kind(left_kind, right_kind):
+    return "integer" if left_kind == right_kind == "integer" else "number"
+CALL_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*\((?:[^()]|\([^()]*\))*\)$")
+
+
+class JavaExpressionTranslator:
+    """
+    Translates Talend Java expressions (tMap mappings, tFilterRow conditions)
+    into DuckDB SQL. Talend routines go through KnowledgeRetriever.function_map
+    templates; anything outside the supported subset raises
+    UntranslatableExpression so the caller can hand the component to the LLM.
+
+    row_aliases:  input row name -> SQL qualifier ("" = bare column)
+    column_types: column name -> Talend type (drives '+' as concat vs add)
+    variables:    tMap Var.* name -> (sql, kind)
+    """
+    def __init__(self, kb, row_aliases=None, column_types=None, variables=None):
+        self.kb = kb
+        self.function_map = kb.function_map
+        self.row_aliases = row_aliases or {}
+        self.column_types = column_types or {}
+        self.variables = variables if variables is not None else {}
+        self.static_classes = {name.rsplit(".", 1)[0] for name in list(self.function_map) + list(JAVA_STATIC)}
+
+    def translate(self, expression):
+        return self.translate_typed(expression)[0]
+
+    def translate_typed(self, expression):
+        tokens = tokenize(expression or "")
+        if not tokens:
+            raise UntranslatableExpression("empty expression")
+        return self._sql(_Parser(tokens, self.static_classes).parse())
+
+    def try_translate(self, expression):
+        try:
+            return self.translate(expression)
+        except UntranslatableExpression:
+            return None
+
+    # --- AST -> (sql, kind) ---
+    def _sql(self, node):
+        kind = node[0]
+        if kind == "lit":
+            return node[2], node[1]
+        if kind == "name":
+            return self._name(node[1])
+        if kind == "unary":
+            sql, operand_kind = self._sql(node[2])
+            return (f"(NOT {sql})", "bool") if node[1] == "!" else (f"(-{sql})", operand_kind)
+        if kind == "binary":
+            return self._binary(node[1], node[2], node[3])
+        if kind == "ternary":
+            cond, _ = self._sql(node[1])
+            then, then_kind = self._sql(node[2])
+            other, other_kind = self._sql(node[3])
+            result_kind = then_kind if then_kind not in ("null", "unknown") else other_kind
+            if then_kind in NUMERIC_KINDS and other_kind in NUMERIC_KINDS:
+                result_kind = _arithmetic_kind(then_kind, other_kind)
+            return f"CASE WHEN {cond} THEN {then} ELSE {other} END", result_kind
+        if kind == "cast":
+            sql, operand_kind = self._sql(node[2])
+            sql_type, cast_kind = CAST_TYPES[node[1]]
+            if sql_type is None:
+                return sql, operand_kind
+            return f"CAST({sql} AS {sql_type})", cast_kind
+        if kind == "static":
+            return self._static(node[1], node[2])
+        if kind == "method":
+            return self._method(node[1], node[2], node[3])
+        raise UntranslatableExpression(f"unsupported node {kind}")
+
+    def _name(self, parts):
+        if len(parts) == 1:
+            name = parts[0]
+            if name in GLOBALS:
+                return GLOBALS[name]
+            if name in self.column_types:
+                return self._column("", name)
+            raise UntranslatableExpression(f"unknown identifier {name}")
+        if len(parts) == 2:
+            owner, name = parts
+            if owner in self.row_aliases:
+                if self.column_types and name not in self.column_types:
+                    raise UntranslatableExpression(f"{owner} has no column {name}")
+                return self._column(self.row_aliases[owner], name)
+            if owner == "context":
+                # A string literal: DuckDB casts it where a number is needed, while a
+                # bare {{ var() }} of a string value would not be valid SQL.
+                return f"""'{{{{ var("{name}") | string | replace("'", "''") }}}}'""", "unknown"
+            if owner == "Var" and name in self.variables:
+                sql, var_kind = self.variables[name]
+                return f"({sql})", var_kind
+        raise UntranslatableExpression(f"unknown reference {'.'.join(parts)}")
+
+    def _column(self, qualifier, name):
+        sql = quote_ident(name)
+        if qualifier:
+            sql = f"{qualifier}.{sql}"
+        return sql, TALEND_KINDS.get(self.column_types.get(name), "unknown")
+
+    def _binary(self, op, left_node, right_node):
+        left, left_kind = self._sql(left_node)
+        right, right_kind = self._sql(right_node)
+        if op == "+":
+            if "string" in (left_kind, right_kind):
+                return f"({left} || {right})", "string"
+            if left_kind in NUMERIC_KINDS and right_kind in NUMERIC_KINDS:
+                return f"({left} + {right})", _arithmetic_kind(left_kind, right_kind)
+            raise UntranslatableExpression("'+' with operands of unknown type")
+        if op == "/" and left_kind == right_kind == "integer":
+            # Java int division truncates; DuckDB's '/' is float division, '//' truncates like Java.
+            return f"({left} // {right})", "integer"
+        if op in ("-", "*", "/", "%"):
+            return f"({left} {op} {right})", _arithmetic_kind(left_kind, right_kind)
+        if op in ("==", "!="):
+            if right_kind == "null" or left_kind == "null":
+                operand = left if right_kind == "null" else right
+                return f"({operand} IS {'' if op == '==' else 'NOT '}NULL)", "bool"
+            return f"({left} {'=' if op == '==' else '<>'} {right})", "bool"
+        if op in ("<", ">", "<=", ">="):
+            return f"({left} {op} {right})", "bool"
+        if op == "&&":
+            return f"({left} AND {right})", "bool"
+        if op == "||":
+            return f"({left} OR {right})", "bool"
+        raise UntranslatableExpression(f"operator {op}")
+
+    def _static(self, qualified, arg_nodes):
+        if qualified in ORDER_DEPENDENT:
+            raise UntranslatableExpression(f"{qualified}() depends on row order")
+        if qualified in JAVA_STATIC:
+            template, result_kind = JAVA_STATIC[qualified]
+            return self._apply(template, [self._sql(a)[0] for a in arg_nodes]), result_kind
+        if qualified not in self.function_map:
+            raise UntranslatableExpression(f"no SQL mapping for {qualified}()")
+        args = []
+        for i, arg_node in enumerate(arg_nodes, start=1):
+            adapter = ARG_ADAPTERS.get((qualified, i))
+            args.append(self._adapt(adapter, arg_node) if adapter else self._sql(arg_node)[0])
+        owner = qualified.split(".")[0]
+        result_kind = FUNCTION_KINDS.get(qualified, ROUTINE_KINDS.get(owner, "unknown"))
+        sql = self._apply(self.function_map[qualified], args)
+        if not CALL_RE.match(sql):
+            sql = f"({sql})"  # templates like "{arg1} + INTERVAL ..." must stay one operand
+        return sql, result_kind
+
+    def _method(self, receiver_node, method, arg_nodes):
+        spec = JAVA_METHODS.get((method, len(arg_nodes)))
+        if spec is None:
+            raise UntranslatableExpression(f"method .{method}() with {len(arg_nodes)} args")
+        template, result_kind = spec
+        receiver = self._sql(receiver_node)[0]
+        return self._apply(template, [self._sql(a)[0] for a in arg_nodes], receiver), result_kind
+
+    def _adapt(self, adapter, arg_node):
+        sql, _ = self._sql(arg_node)
+        if adapter == "paren":
+            return f"({sql})"
+        if arg_node[0] != "lit" or arg_node[1] != "string":
+            raise UntranslatableExpression(f"{adapter} argument must be a string literal")
+        value = sql[1:-1].replace("''", "'")
+        if adapter == "date_pattern":
+            return sql_string(self.kb.strftime_pattern(value))
+        if adapter == "interval_unit" and value in DATE_UNITS:
+            return DATE_UNITS[value]
+        if adapter == "diff_unit" and value in DATE_UNITS:
+            return sql_string(DATE_UNITS[value].lower())
+        if adapter == "date_part" and value in DATE_PARTS:
+            return DATE_PARTS[value]
+        raise UntranslatableExpression(f"unsupported {adapter} {value!r}")
+
+    @staticmethod
+    def _apply(template, args, receiver=None):
+        # One pass: text already substituted (e.g. a '{arg1}' string literal) is never rescanned.
+        def substitute(match):
+            if match.group(1) is None:
+                return receiver
+            index = int(match.group(1))
+            if index > len(args):
+                raise UntranslatableExpression("missing argument")
+            return args[index - 1]
+        return PLACEHOLDER_RE.sub(substitute, template)
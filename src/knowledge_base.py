@@ -43,7 +43,7 @@ class KnowledgeRetriever:
             
             # --- Mathematical ---
             "Mathematical.ABS": "abs({arg1})",
-            "Mathematical.INT": "cast({arg1} as INTEGER)",
+            "Mathematical.INT": "CAST(trunc(CAST({arg1} AS DOUBLE)) AS INTEGER)",  # Java truncates, CAST rounds
             "Mathematical.SQRT": "sqrt({arg1})",
             "Mathematical.POW": "power({arg1}, {arg2})",
             "Mathematical.SMUL": "({arg1} * {arg2})",
@@ -56,7 +56,7 @@ class KnowledgeRetriever:
             # --- Relational & Numeric ---
             "Relational.ISNULL": "({arg1} IS NULL)",
             "Relational.NOTISNULL": "({arg1} IS NOT NULL)",
-            "Numeric.sequence": "row_number() OVER (ORDER BY (SELECT NULL))",
+            "Numeric.sequence": "({arg2} + (row_number() OVER () - 1) * {arg3})",
             "Numeric.random": "random()",
             "Numeric.convertImpliedDecimal": "cast({arg1} as decimal) / power(10, {arg2})",
             
@@ -126,10 +126,89 @@ class KnowledgeRetriever:
             
             # --- ORCHESTRATION ---
             "tLoop": "RULE: [ORCH] Loop. Handled by Temporal Workflow.",
+            "tFileList": "RULE: [ORCH] File loop. Handled by Temporal FileLoopWorkflow (file_scan + one read_csv over all files).",
             "tRunJob": "RULE: [ORCH] Subjob. Handled by Temporal ChildWorkflow.",
             "tDie": "RULE: [ORCH] Error. Handled by Temporal RetryPolicy.",
         }
 
+        # ==============================================================================
+        #  3. TALEND SCHEMA TYPES -> DUCKDB TYPES
+        # ==============================================================================
+        self.type_map = {
+            "id_String": "VARCHAR",
+            "id_Character": "VARCHAR",
+            "id_Object": "VARCHAR",
+            "id_Document": "VARCHAR",
+            "id_Dynamic": "VARCHAR",
+            "id_List": "VARCHAR[]",
+            "id_Integer": "INTEGER",
+            "id_Long": "BIGINT",
+            "id_Short": "SMALLINT",
+            "id_Byte": "TINYINT",
+            "id_Double": "DOUBLE",
+            "id_Float": "FLOAT",
+            "id_BigDecimal": "DECIMAL",
+            "id_Boolean": "BOOLEAN",
+            "id_Date": "TIMESTAMP",
+            "id_byte[]": "BLOB",
+        }
+
+        # ==============================================================================
+        #  4. PRECOMPILED ROUTINE MATCHER
+        # ==============================================================================
+        # One alternation over every routine in the map, scanned once per snippet.
+        # Matches qualified (TalendDate.formatDate) and bare (formatDate) calls.
+        self._funcs_by_method = {}
+        for func in self.function_map:
+            self._funcs_by_method.setdefault(func.split(".")[-1], []).append(func)
+        classes = sorted({func.split(".")[0] for func in self.function_map}, key=len, reverse=True)
+        methods = sorted(self._funcs_by_method, key=len, reverse=True)
+        self._func_pattern = re.compile(
+            r"(?<![\w.])(?:(%s)\.)?(%s)\s*\(" % ("|".join(map(re.escape, classes)), "|".join(map(re.escape, methods)))
+        )
+
+    def sql_type(self, column: dict) -> str:
+        """
+        DuckDB type for one metadata <column> (name/type/length/precision/pattern).
+        Dates whose pattern carries no time part become DATE.
+        """
+        talend_type = column.get("type", "id_String")
+        sql = self.type_map.get(talend_type, "VARCHAR")
+        if talend_type == "id_BigDecimal":
+            length, precision = column.get("length"), column.get("precision")
+            if length and length.isdigit() and 0 < int(length) <= 38:
+                scale = precision if precision and precision.isdigit() and int(precision) <= int(length) else "0"
+                sql = f"DECIMAL({length}, {scale})"
+        elif talend_type == "id_Date":
+            pattern = (column.get("pattern") or "").strip('"')
+            if pattern and not any(ch in pattern for ch in "HhmsS"):
+                sql = "DATE"
+        return sql
+
+    def strftime_pattern(self, java_pattern: str) -> str:
+        """
+        Java SimpleDateFormat pattern (as stored in Talend metadata, quotes
+        included) -> DuckDB strftime/strptime format. Upper-case DD/YYYY are
+        accepted as day/year since Talend users routinely write them that way.
+        """
+        pattern = (java_pattern or "").strip('"')
+        tokens = [
+            ("yyyy", "%Y"), ("YYYY", "%Y"), ("yy", "%y"), ("MMMM", "%B"), ("MMM", "%b"), ("MM", "%m"),
+            ("dd", "%d"), ("DD", "%d"), ("HH", "%H"), ("hh", "%I"), ("mm", "%M"), ("ss", "%S"),
+            ("SSS", "%g"), ("a", "%p"), ("EEE", "%a"),
+        ]
+        out, i = [], 0
+        while i < len(pattern):
+            for token, fmt in tokens:
+                if pattern.startswith(token, i):
+                    out.append(fmt)
+                    i += len(token)
+                    break
+            else:
+                out.append(pattern[i].replace("%", "%%").replace("'", ""))
+                i += 1
+        return "".join(out)
+
     def get_context(self, comp_type: str, xml_snippet: str) -> dict:
         """
         Retrieves the deterministic rule and function map for the LLM.
@@ -148,11 +227,18 @@ class KnowledgeRetriever:
             else:
                 rag_hint = "RULE: [GENERIC] Analyze XML logic and wrap in a dbt CTE."
 
-        # B. Dynamic Function Extraction
-        detected_funcs = []
-        for func, sql in self.function_map.items():
-            if func in xml_snippet or ('.' in func and func.split(".")[1] in xml_snippet):
-                detected_funcs.append(f"- JAVA: {func}(...) -> SQL: {sql}")
+        # B. Dynamic Function Extraction (single pass over the snippet)
+        found = set()
+        for match in self._func_pattern.finditer(xml_snippet):
+            cls, method = match.group(1), match.group(2)
+            if cls and f"{cls}.{method}" in self.function_map:
+                found.add(f"{cls}.{method}")
+            else:
+                found.update(self._funcs_by_method[method])
+        detected_funcs = [
+            f"- JAVA: {func}(...) -> SQL: {sql}"
+            for func, sql in self.function_map.items() if func in found
+        ]
         
         return {
             "rag": f"{rag_hint}\n\nFUNCTION MAP:\n" + ("\n".join(detected_funcs) if detected_funcs else "Standard SQL logic.")
@@ -0,0 +1,162 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from lxml import etree
+
+# GUI-only attributes on <node>. They move whenever someone drags a component
+# in the Studio designer and never change the generated SQL.
+VOLATILE_ATTRS = ("posX", "posY", "offsetLabelX", "offsetLabelY", "sizeX", "sizeY")
+
+
+def normalize_xml(xml_snippet):
+    """
+    Canonical form of a component snippet: blank text removed, GUI coordinates
+    dropped, attributes ordered (C14N). Falls back to whitespace folding when
+    the snippet is not well-formed.
+    """
+    try:
+        parser = etree.XMLParser(remove_blank_text=True)
+        root = etree.fromstring(xml_snippet.encode("utf-8"), parser)
+        for attr in VOLATILE_ATTRS:
+            root.attrib.pop(attr, None)
+        return etree.tostring(root, method="c14n").decode("utf-8")
+    except Exception:
+        return " ".join(xml_snippet.split())
+
+
+def make_cache_key(comp_type, xml_snippet, rag_context, model, prompt_version, prev_cte=""):
+    """
+    Content address of one conversion. Every input that reaches the prompt is
+    part of the key, so any change (XML, KB rule, model, prompt) is a miss.
+    """
+    payload = json.dumps(
+        [comp_type, normalize_xml(xml_snippet), rag_context, model, prompt_version, prev_cte],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ConversionCache:
+    """
+    Persistent, size-bounded (LRU) store of successful LLM conversions.
+    Backed by a single SQLite file so it is safe to share between worker threads.
+    """
+    def __init__(self, cache_dir, max_bytes=512 * 1024 * 1024):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, "conversions.sqlite")
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(self.path, check_same_thread=False)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key         TEXT PRIMARY KEY,
+                comp_type   TEXT,
+                model       TEXT,
+                payload     TEXT,
+                size        INTEGER,
+                created     REAL,
+                last_access REAL
+            )
+        """)
+        self._con.execute("CREATE INDEX IF NOT EXISTS idx_entries_access ON entries(last_access)")
+        self._con.commit()
+        self._total_bytes = self._con.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def get(self, key):
+        with self._lock:
+            row = self._con.execute("SELECT payload FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._con.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._con.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key, result, comp_type="", model=""):
+        payload = json.dumps(result, ensure_ascii=False)
+        size = len(payload.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            old = self._con.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            if old:
+                self._total_bytes -= old[0]
+            self._con.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, comp_type, model, payload, size, now, now),
+            )
+            self._total_bytes += size
+            self.writes += 1
+            self._evict()
+            self._con.commit()
+
+    def _evict(self):
+        # Caller holds the lock. Drop least-recently-used entries until under budget.
+        while self._total_bytes > self.max_bytes:
+            row = self._con.execute(
+                "SELECT key, size FROM entries ORDER BY last_access ASC LIMIT 1"
+            ).fetchone()
+            if row is None:
+                break
+            self._con.execute("DELETE FROM entries WHERE key = ?", (row[0],))
+            self._total_bytes -= row[1]
+            self.evictions += 1
+
+    def invalidate(self, key=None, comp_type=None, model=None):
+        """
+        Removes matching entries (all of them when called without filters).
+        Returns the number of entries removed.
+        """
+        clauses, args = [], []
+        for column, value in (("key", key), ("comp_type", comp_type), ("model", model)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                args.append(value)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            removed = self._con.execute(f"DELETE FROM entries{where}", args).rowcount
+            self._con.commit()
+            self._total_bytes = self._con.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        return removed
+
+    def stats(self):
+        with self._lock:
+            entries = self._con.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": self._total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "writes": self.writes,
+            "evictions": self.evictions,
+        }
+
+    def close(self):
+        with self._lock:
+            self._con.close()
+
+
+if __name__ == "__main__":
+    # python -m src.llm_cache [--stats | --clear | --invalidate <componentName>]
+    from src.config import CACHE_DIR
+
+    cache = ConversionCache(CACHE_DIR)
+    args = sys.argv[1:]
+    if args[:1] == ["--clear"]:
+        print(f"[CACHE] Removed {cache.invalidate()} entries.")
+    elif args[:1] == ["--invalidate"] and len(args) == 2:
+        print(f"[CACHE] Removed {cache.invalidate(comp_type=args[1])} '{args[1]}' entries.")
+    else:
+        print(f"[CACHE] {cache.stats()}")
+    cache.close()
@@ -1,49 +1,168 @@
 import os
 import json
+import time
+import threading
 import networkx as nx
+from collections import Counter, defaultdict
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from lxml import etree
-from src.config import INPUT_DIR, DBT_OUTPUT_DIR, TEMPORAL_OUTPUT_DIR
+from src.config import (
+    INPUT_DIR, OUTPUT_DIR, DBT_OUTPUT_DIR, TEMPORAL_OUTPUT_DIR, OLLAMA_MODEL, RUN_REPORT_PATH, PROMPT_DISTILL,
+    ASYNC_LLM_ENABLED, ASYNC_MIN_IN_FLIGHT, ASYNC_MAX_IN_FLIGHT,
+    ASYNC_BATCH_SIZE, ASYNC_BATCH_MAX_CHARS, ASYNC_BATCH_WINDOW_MS,
+    LLM_VALIDATE, LLM_REPAIR_ATTEMPTS, CTE_OPTIMIZE,
+    MATERIALIZATION_ADVISE, TYPED_FILE_SOURCES, FILE_SOURCE_STAGING,
+)
 from src.graph_builder import ProjectGraph
-from src.agent_llm import SouravAgent
+from src.agent_llm import SouravAgent, PROMPT_VERSION
 from src.temporal_generator import TemporalGenerator
+from src.scheduler import PriorityExecutor, run_dag
+from src.async_pipeline import AsyncConversionPipeline
+from src.rule_transpiler import RuleTranspiler
+from src.manifest import MigrationManifest
+from src.instrumentation import RECORDER
+from src.xml_distiller import distill, estimate_tokens
+from src.cte_validator import CteValidator
+from src.cte_optimizer import CteOptimizer, action_kind
+from src.materialization import MaterializationAdvisor, config_block, incremental_filter
+from src.talend_job import ORCHESTRATION_COMPONENTS, dataset_param, dataset_name
+from src.file_sources import FileSources
+from src.file_loops import file_loop_specs, iterated_spec, loop_source_sql, GLOBALMAP_RE, CONTEXT_RE
 
 # --- HARDWARE OPTIMIZATION ---
 MAX_WORKERS = 8  
 
+MANIFEST_NAME = "migration_manifest.json"
+
 class MigrationEngine:
-    def __init__(self):
-        self.graph_builder = ProjectGraph(INPUT_DIR)
-        self.agent = SouravAgent()
+    def __init__(self, incremental=False, on_workflow_generated=None, on_model_written=None,
+                 input_dir=INPUT_DIR, output_dir=None, agent=None, max_workers=MAX_WORKERS,
+                 async_llm=ASYNC_LLM_ENABLED):
+        self.incremental = incremental
+        self.max_workers = max_workers
+        # Paths come from config unless output_dir is given (benchmarks use a
+        # scratch directory); `agent` replaces the Ollama-backed SouravAgent.
+        self.output_dir = output_dir or OUTPUT_DIR
+        self.dbt_dir = os.path.join(output_dir, "dbt_project") if output_dir else DBT_OUTPUT_DIR
+        self.temporal_dir = os.path.join(output_dir, "temporal_workflows") if output_dir else TEMPORAL_OUTPUT_DIR
+        self.report_path = os.path.join(output_dir, "run_report.json") if output_dir else RUN_REPORT_PATH
+        # Hooks for overlapping later phases with conversion (run_migration.py):
+        # on_workflow_generated() once workflow.py exists, on_model_written(path)
+        # after each dbt model file is written.
+        self.on_workflow_generated = on_workflow_generated
+        self.on_model_written = on_model_written
+        self.graph_builder = ProjectGraph(input_dir)
+        self.agent = agent or SouravAgent()
+        # Sync: blocking agent call per pool thread.
+        # Async: pool threads hand off to one event loop that owns the HTTP traffic.
+        self.converter = self.agent
+        pool_size = max_workers
+        if async_llm:
+            self.converter = AsyncConversionPipeline(
+                self.agent,
+                min_in_flight=ASYNC_MIN_IN_FLIGHT,
+                max_in_flight=ASYNC_MAX_IN_FLIGHT,
+                batch_size=ASYNC_BATCH_SIZE,
+                batch_max_chars=ASYNC_BATCH_MAX_CHARS,
+                batch_window_s=ASYNC_BATCH_WINDOW_MS / 1000,
+            ).start()
+            pool_size = ASYNC_MAX_IN_FLIGHT
+        # One LLM budget for the whole run: every job submits its components here.
+        self.component_pool = PriorityExecutor(pool_size)
+        # Deterministic tier: mechanical components never reach the LLM.
+        self.transpiler = RuleTranspiler(self.agent.kb)
+        # LLM answers are checked against their upstream schemas before use.
+        self.validator = CteValidator(self.agent.kb) if LLM_VALIDATE else None
+        self.optimizer = CteOptimizer() if CTE_OPTIMIZE else None
+        self.optimizations = {}        # job -> optimizer rewrites
+        self.advisor = MaterializationAdvisor(self.graph_builder) if MATERIALIZATION_ADVISE else None
+        self.materializations = {}     # job -> advice
+        # Typed read_csv (or staged Parquet) for delimited file inputs.
+        self.file_sources = FileSources(self.agent.kb) if TYPED_FILE_SOURCES else None
+        self.path_counts = Counter()   # (path, componentName) -> n
+        self.job_paths = defaultdict(Counter)   # job -> (path, componentName) -> n
+        self._stats_lock = threading.Lock()
+        # Written on every run so the next --incremental run has a baseline.
+        self.manifest = MigrationManifest.load(
+            os.path.join(self.output_dir, MANIFEST_NAME),
+            settings={"model": OLLAMA_MODEL, "prompt_version": PROMPT_VERSION, "prompt_distill": PROMPT_DISTILL,
+                      "cte_optimize": CTE_OPTIMIZE, "materialization": MATERIALIZATION_ADVISE,
+                      "file_sources": TYPED_FILE_SOURCES, "file_source_staging": FILE_SOURCE_STAGING},
+        )
 
     def run(self):
-        print(f"[INFO] STARTING TALEND-TO-DBT-SOURAV-AGENT (Parallel Threads: {MAX_WORKERS})...")
+        print(f"[INFO] STARTING TALEND-TO-DBT-SOURAV-AGENT (Parallel Threads: {self.max_workers})...")
+        graph, dirty, deleted = self.plan()
+        with RECORDER.stage("MigrationEngine.convert_all"):
+            self._generate_dbt_assets_parallel(graph, dirty)
+        self.finish(dirty, deleted)
+
+    def plan(self):
+        """
+        Builds the graph, decides what to convert (incremental: removes the
+        outputs of deleted jobs) and generates the Temporal workflow.
+        Returns (graph, dirty jobs, deleted jobs).
+        """
         graph = self.graph_builder.build()
-        TemporalGenerator(graph, TEMPORAL_OUTPUT_DIR).generate()
-        self._generate_dbt_assets_parallel(graph)
+        dirty, deleted = self.manifest.plan(graph)
+        if self.incremental:
+            for job in deleted:
+                for path in self.manifest.remove_outputs(job):
+                    print(f"[INCREMENTAL] Removed {path} (job {job} deleted)")
+            print(f"[INCREMENTAL] {len(dirty)} of {graph.number_of_nodes()} jobs changed, {len(deleted)} deleted")
+        else:
+            dirty = set(graph.nodes)
+        with RECORDER.stage("TemporalGenerator.generate"):
+            TemporalGenerator(graph, self.temporal_dir).generate()
+        if self.on_workflow_generated:
+            self.on_workflow_generated()
+        return graph, dirty, deleted
+
+    def finish(self, dirty, deleted):
+        """Manifest, staging manifest and reports once every job is converted."""
+        self.manifest.save()
+        if self.file_sources is not None and self.file_sources.staging:
+            staging = self.file_sources.write_manifest(self.dbt_dir, converted=dirty, deleted=deleted)
+            if staging:
+                print(f"[INFO] Staged file sources: {len(self.file_sources.staged)} this run ({staging})")
+        self.close()
+        self._write_path_report()
+        if self.agent.cache is not None:
+            print(f"[CACHE] {self.agent.cache.stats()}")
+        RECORDER.print_summary(RECORDER.write_report(self.report_path))
+        print(f"[REPORT] Run report: {self.report_path}")
 
-    def _generate_dbt_assets_parallel(self, graph):
-        os.makedirs(os.path.join(DBT_OUTPUT_DIR, "models"), exist_ok=True)
-        os.makedirs(os.path.join(DBT_OUTPUT_DIR, "macros"), exist_ok=True)
+    def close(self):
+        """Stops the LLM pipeline, the component pool and the validator."""
+        if isinstance(self.converter, AsyncConversionPipeline):
+            self.converter.stop()
+        if self.validator is not None:
+            self.validator.close()
+        self.component_pool.shutdown(wait=False)
+
+    def _generate_dbt_assets_parallel(self, graph, dirty):
+        os.makedirs(os.path.join(self.dbt_dir, "models"), exist_ok=True)
+        os.makedirs(os.path.join(self.dbt_dir, "macros"), exist_ok=True)
         
-        tasks = []
-        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        tasks = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
             for job in graph.nodes:
                 node_data = graph.nodes[job]
                 
-                if node_data.get('type') == 'orchestration': 
+                if job not in dirty:
+                    # Unchanged since the last run: keep its existing output.
+                    self.graph_builder.release_job(job)
                     continue
                 
                 if node_data.get('type') == 'joblet':
-                    future = executor.submit(self._convert_joblet, job, node_data['filepath'])
+                    future = executor.submit(self._convert_joblet, job)
                 else:
-                    future = executor.submit(self._convert_job_chain, job, node_data['filepath'])
+                    future = executor.submit(self._convert_job_chain, job)
                 
-                tasks.append(future)
+                tasks[future] = job
 
             total = len(tasks)
             completed = 0
-            print(f"[INFO] Processing {total} conversion tasks with {MAX_WORKERS} threads...")
+            print(f"[INFO] Processing {total} conversion tasks with {self.max_workers} threads...")
             
             for future in as_completed(tasks):
                 completed += 1
@@ -51,101 +170,141 @@ class MigrationEngine:
                     result = future.result()
                     print(f"   [{completed}/{total}] {result}")
                 except Exception as e:
-                    print(f"   [ERROR] Task failed: {e}")
-
-    def _convert_joblet(self, name, filepath):
-        sql = self._process_xml_chain(name, filepath)
-        if sql:
-            path = os.path.join(DBT_OUTPUT_DIR, "macros", f"{name}.sql")
-            with open(path, "w", encoding='utf-8') as f:
-                f.write(f"{{% macro {name}() %}}\n{sql}\n{{% endmacro %}}")
+                    # Retried by the next --incremental run instead of passing as up to date.
+                    self.manifest.mark_failed(tasks[future])
+                    print(f"   [ERROR] Task failed: {tasks[future]}: {e}")
+
+    def _convert_joblet(self, name):
+        text = self._render_joblet(name)
+        if text:
+            self.write_output(name, os.path.join("macros", f"{name}.sql"), text)
             return f"Converted Joblet: {name}"
+        self.manifest.mark_failed(name)
         return f"Skipped Joblet: {name}"
 
-    def _convert_job_chain(self, name, filepath):
-        sql = self._process_xml_chain(name, filepath)
-        if sql:
-            path = os.path.join(DBT_OUTPUT_DIR, "models", f"{name}.sql")
-            with open(path, "w", encoding='utf-8') as f:
-                f.write(f"-- Migrated Job: {name}\n")
-                f.write("WITH \n")
-                f.write(sql)
-                f.write(f"\n\nSELECT * FROM final_cte")
+    def _convert_job_chain(self, name):
+        text = self._render_model(name)
+        if text:
+            path = self.write_output(name, os.path.join("models", f"{name}.sql"), text)
+            if self.on_model_written:
+                self.on_model_written(path)
             return f"Converted Job: {name}"
+        self.manifest.mark_failed(name)
         return f"Skipped Job: {name}"
 
-    def _process_xml_chain(self, job_name, filepath):
+    def _render_joblet(self, name):
+        sql = self._convert_shared_job(name)
+        return f"{{% macro {name}() %}}\n{sql}\n{{% endmacro %}}" if sql else None
+
+    def _render_model(self, name):
+        sql = self._convert_shared_job(name)
+        if not sql:
+            return None
+        model = f"WITH \n{sql}\n\nSELECT * FROM final_cte"
+        if self.optimizer is not None:
+            model, actions = self.optimizer.optimize(model)
+            if actions:
+                with self._stats_lock:
+                    self.optimizations[name] = actions
+        if self.advisor is not None:
+            advice = self.advisor.advise(name)
+            model = f"{config_block(advice)}\n{model}{incremental_filter(advice)}"
+            with self._stats_lock:
+                self.materializations[name] = advice
+        return f"-- Migrated Job: {name}\n{model}"
+
+    def write_output(self, name, relpath, text):
+        """Writes a model/macro under the dbt project and records it in the manifest."""
+        path = os.path.join(self.dbt_dir, relpath)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding='utf-8') as f:
+            f.write(text)
+        self.manifest.record_output(name, path)
+        return path
+
+    # --- DISTRIBUTED CONVERSION (src/migration_activities.py) ---
+    def render_job(self, name):
+        """
+        Converts one job without writing anything; the coordinator writes
+        the text (write_output) and merges the rest with merge_job_stats().
+        """
+        if self.graph_builder.graph.nodes[name].get('type') == 'joblet':
+            kind, relpath, text = "macro", os.path.join("macros", f"{name}.sql"), self._render_joblet(name)
+        else:
+            kind, relpath, text = "model", os.path.join("models", f"{name}.sql"), self._render_model(name)
+        with self._stats_lock:
+            paths = self.job_paths.pop(name, Counter())
+            actions = self.optimizations.pop(name, None)
+            advice = self.materializations.pop(name, None)
+        staged = self.file_sources.pop_job(name) if self.file_sources is not None else {}
+        return {
+            "job": name, "kind": kind, "path": relpath.replace(os.sep, "/"), "text": text,
+            "paths": [[path, comp_type, n] for (path, comp_type), n in sorted(paths.items())],
+            "optimizations": actions, "materialization": advice, "staged": staged,
+        }
+
+    def merge_job_stats(self, result):
+        """Adds a render_job() result (minus its text) to this run's reports."""
+        name = result["job"]
+        with self._stats_lock:
+            for path, comp_type, n in result.get("paths", ()):
+                self.path_counts[(path, comp_type)] += n
+            if result.get("optimizations"):
+                self.optimizations[name] = result["optimizations"]
+            if result.get("materialization"):
+                self.materializations[name] = result["materialization"]
+        if self.file_sources is not None and result.get("staged"):
+            self.file_sources.merge(name, result["staged"])
+
+    def _convert_shared_job(self, name):
+        # Reuse the model parsed during graph building, then free it.
+        try:
+            job = self.graph_builder.get_job(name)
+            with RECORDER.stage("MigrationEngine._process_xml_chain"):
+                return self._process_xml_chain(name, job)
+        finally:
+            self.graph_builder.release_job(name)
+
+    def _process_xml_chain(self, job_name, job):
         try:
-            tree = etree.parse(filepath)
-            
             # NAMESPACE-AGNOSTIC GRAPH BUILDING
             internal_graph = nx.DiGraph()
-            connections = tree.xpath("//*[local-name()='connection']")
-            for conn in connections:
-                src, tgt = conn.get("source"), conn.get("target")
-                if src and tgt:
-                    internal_graph.add_edge(src, tgt)
+            for src, tgt, _ in job.connections:
+                internal_graph.add_edge(src, tgt)
             
+            # SINGLE-PASS INDEX: UNIQUE_NAME -> componentName / params / xml
+            index = job.components
+            # tFileList iterations: inputs reading CURRENT_FILEPATH read all files at once
+            loops = file_loop_specs(job)
+
             try:
                 comps = list(nx.topological_sort(internal_graph))
             except:
                 # Fallback: Get all UNIQUE_NAME values directly if graph fails
-                comps = tree.xpath("//*[local-name()='elementParameter' and @name='UNIQUE_NAME']/@value")
-                
+                # and treat them as one linear chain.
+                comps = index.unique_names()
+                internal_graph = nx.DiGraph()
+                internal_graph.add_nodes_from(comps)
+                nx.add_path(internal_graph, comps)
+
+            # DAG-AWARE SCHEDULING: independent branches are converted concurrently
+            # on the run-wide component pool, longest critical path first.
+            weight = lambda comp_id: self._component_weight(index.get(comp_id))
+            results = run_dag(
+                internal_graph,
+                lambda comp_id, upstream: self._convert_component(job_name, comp_id, index.get(comp_id), upstream, loops, index),
+                self.component_pool,
+                weight=weight,
+                inline=lambda comp_id: weight(comp_id) == 0,
+            )
+
+            # Assemble in topological order so the model text is deterministic.
             cte_list = []
             prev_cte = "dual"
-            
-            # FETCH ALL NODES
-            all_nodes = tree.xpath("//*[local-name()='node']")
-            
             for comp_id in comps:
-                # SEARCH FOR NODE
-                node = None
-                for candidate in all_nodes:
-                    u_name = candidate.xpath(".//*[local-name()='elementParameter' and @name='UNIQUE_NAME']/@value")
-                    if u_name and u_name[0] == comp_id:
-                        node = candidate
-                        break
-                
-                if node is None: continue
-                
-                comp_type = node.get("componentName")
-                xml_str = etree.tostring(node).decode('utf-8')
-                
-                # 1. Handle Inputs
-                if "Input" in comp_type:
-                    params = node.xpath(".//*[local-name()='elementParameter']")
-                    raw_val = None
-                    for p in params:
-                        if p.get("name") in ["TABLE", "FILENAME"]:
-                            raw_val = p.get("value")
-                            break
-                    
-                    if raw_val:
-                        if "context." in raw_val or "globalMap.get" in raw_val:
-                            var_name = raw_val.split('.')[-1].replace('"', '').replace(')', '')
-                            source_ref = f"{{{{ var('{var_name}', 'default_{comp_id}') }}}}"
-                        else:
-                            clean_val = raw_val.replace('"', '').replace('\\', '/')
-                            tbl_name = os.path.splitext(os.path.basename(clean_val))[0] if '/' in clean_val else clean_val
-                            source_ref = f"{{{{ source('raw', '{tbl_name}') }}}}"
-                    else:
-                        source_ref = f"{{{{ source('raw', 'src_{comp_id}') }}}}"
-
-                    cte_list.append(f"{comp_id} AS ( SELECT * FROM {source_ref} )")
-                    prev_cte = comp_id
-                    continue
-                
-                if "Output" in comp_type:
-                    continue
-
-                # 3. Handle Transformations
-                input_map = { "prev_cte": prev_cte }
-                result = self.agent.convert_component(job_name, comp_type, xml_str, prev_cte, json.dumps(input_map))
-                
-                if result.get('status') == 'SUCCESS':
-                    clean_sql = result['sql_logic'].strip().rstrip(';')
-                    cte_list.append(f"{comp_id} AS (\n {clean_sql} \n)")
+                result = results.get(comp_id)
+                if result and result["sql"]:
+                    cte_list.append(result["sql"])
                     prev_cte = comp_id
             
             # --- CRITICAL PATCH: NO LEADING/DANGLING COMMAS ---
@@ -156,4 +315,165 @@ class MigrationEngine:
             
         except Exception as e:
             print(f"[WARN] Error processing XML chain for {job_name}: {e}")
-            return None
\ No newline at end of file
+            return None
+
+    def _component_weight(self, entry):
+        # Only LLM-bound transformations cost anything; sources, sinks and
+        # rule-based components are free.
+        if entry is None or "Input" in entry.comp_type or "Output" in entry.comp_type:
+            return 0
+        if entry.comp_type in ORCHESTRATION_COMPONENTS:
+            return 0
+        if self.transpiler.can_transpile(entry):
+            return 0
+        return 1
+
+    def _count_path(self, path, comp_type, job_name, comp_id, start, usage=None):
+        with self._stats_lock:
+            self.path_counts[(path, comp_type)] += 1
+            self.job_paths[job_name][(path, comp_type)] += 1
+        RECORDER.record_component(job_name, comp_id, comp_type, path, time.perf_counter() - start, usage)
+
+    def _write_path_report(self):
+        """Per-run summary of how each component was converted."""
+        totals = Counter()
+        by_component = {}
+        for (path, comp_type), n in sorted(self.path_counts.items()):
+            totals[path] += n
+            by_component.setdefault(comp_type, {})[path] = n
+        summary = ", ".join(f"{path}={n}" for path, n in sorted(totals.items()))
+        print(f"[REPORT] Component paths: {summary or 'none'}")
+        if self.optimizations:
+            kinds = Counter(action_kind(a) for actions in self.optimizations.values() for a in actions)
+            print(f"[REPORT] CTE optimizer: {len(self.optimizations)} models rewritten ("
+                  + ", ".join(f"{kind}={n}" for kind, n in sorted(kinds.items())) + ")")
+        if self.materializations:
+            kinds = Counter(advice["materialized"] for advice in self.materializations.values())
+            print("[REPORT] Materializations: " + ", ".join(f"{kind}={n}" for kind, n in sorted(kinds.items())))
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(os.path.join(self.output_dir, "conversion_report.json"), "w", encoding='utf-8') as f:
+            json.dump({"paths": dict(totals), "by_component": by_component,
+                       "optimizer": dict(sorted(self.optimizations.items())),
+                       "materializations": dict(sorted(self.materializations.items()))}, f, indent=2)
+
+    def _convert_component(self, job_name, comp_id, entry, upstream, loops=(), index=None):
+        """
+        Converts one component given its finished predecessors.
+        Returns {"cte": name | None, "sql": CTE text | None, "inputs": [...]},
+        where "inputs" are the nearest upstream CTE names. Components that
+        produce no CTE pass their inputs through to their successors.
+        """
+        inputs = []
+        for pred in upstream.values():
+            for name in ([pred["cte"]] if pred["cte"] else pred["inputs"]):
+                if name not in inputs:
+                    inputs.append(name)
+        skipped = {"cte": None, "sql": None, "inputs": inputs}
+
+        if entry is None:
+            return skipped
+        comp_type = entry.comp_type
+        start = time.perf_counter()
+
+        # 1. Handle Inputs
+        if "Input" in comp_type:
+            self._count_path("source", comp_type, job_name, comp_id, start)
+            select = None
+            if self.file_sources is not None and not iterated_spec(dataset_param(entry), loops):
+                select = self.file_sources.select(job_name, entry)
+            if select is None:
+                select = f"SELECT * FROM {self._source_ref(comp_id, entry, loops)}"
+            return {"cte": comp_id, "sql": f"{comp_id} AS ( {select} )", "inputs": inputs}
+
+        if "Output" in comp_type:
+            self._count_path("sink", comp_type, job_name, comp_id, start)
+            return skipped
+
+        # Control flow lives in the Temporal workflow, not in SQL.
+        if comp_type in ORCHESTRATION_COMPONENTS:
+            self._count_path("orchestration", comp_type, job_name, comp_id, start)
+            return skipped
+
+        # 2. Deterministic rules (no LLM)
+        rule_sql = self.transpiler.transpile(entry, inputs)
+        if rule_sql:
+            self._count_path("rule", comp_type, job_name, comp_id, start)
+            return {"cte": comp_id, "sql": f"{comp_id} AS (\n {rule_sql} \n)", "inputs": inputs}
+
+        # 3. Handle Transformations
+        prev_cte = ", ".join(inputs) if inputs else "dual"
+        input_map = { "prev_cte": prev_cte, "inputs": inputs }
+        # Compact definition instead of the raw <node> XML (layout, labels, credentials...)
+        snippet = distill(entry) if PROMPT_DISTILL else entry.xml
+        RECORDER.record_prompt(comp_type, estimate_tokens(entry.xml), estimate_tokens(snippet))
+        try:
+            result = self.converter.convert_component(job_name, comp_type, snippet, prev_cte, json.dumps(input_map))
+        except Exception as e:
+            print(f"[WARN] {job_name}/{comp_id}: {e}")
+            self._count_path("failed", comp_type, job_name, comp_id, start)
+            return skipped
+
+        if self.validator is not None:
+            upstream_columns = {name: index.get(name).columns if index and index.get(name) else None for name in inputs}
+            result, error = self._validate_llm_result(job_name, comp_id, comp_type, snippet, prev_cte, upstream_columns, result)
+            if error:
+                print(f"[WARN] {job_name}/{comp_id}: dropped, still invalid after repairs: {error.splitlines()[0][:200]}")
+                self._count_path("failed", comp_type, job_name, comp_id, start, result.get("usage"))
+                return skipped
+
+        if result.get('status') == 'SUCCESS':
+            self._count_path("llm", comp_type, job_name, comp_id, start, result.get("usage"))
+            clean_sql = result['sql_logic'].strip().rstrip(';')
+            return {"cte": comp_id, "sql": f"{comp_id} AS (\n {clean_sql} \n)", "inputs": inputs}
+        self._count_path("failed", comp_type, job_name, comp_id, start, result.get("usage"))
+        return skipped
+
+    def _answer_error(self, comp_id, result, upstream_columns):
+        if result.get("status") != "SUCCESS":
+            return "; ".join(map(str, result.get("issues") or [])) or f"status {result.get('status')!r}"
+        sql = result.get("sql_logic")
+        if not isinstance(sql, str) or not sql.strip():
+            return "the JSON answer has no sql_logic"
+        return self.validator.check(comp_id, sql.strip().rstrip(';'), upstream_columns)
+
+    def _validate_llm_result(self, job_name, comp_id, comp_type, snippet, prev_cte, upstream_columns, result):
+        """
+        Checks an LLM answer (JSON shape, then a DuckDB bind against the
+        upstream schemas) and sends up to LLM_REPAIR_ATTEMPTS repair prompts
+        with the error. Only answers the model actually gave are repaired
+        (not connection failures). Returns (result, error or None).
+        """
+        usage = dict(result.get("usage") or {})
+        error = self._answer_error(comp_id, result, upstream_columns)
+        attempts = 0
+        while error and attempts < LLM_REPAIR_ATTEMPTS and (result.get("status") == "SUCCESS" or result.get("raw")):
+            attempts += 1
+            print(f"   ... [REPAIR] {job_name}/{comp_id} (attempt {attempts}): {error.splitlines()[0][:200]}")
+            previous = result.get("sql_logic") if result.get("status") == "SUCCESS" else result.get("raw")
+            result = self.agent.repair_component(
+                job_name, comp_type, snippet, prev_cte, previous, error,
+                schema=self.validator.describe(upstream_columns),
+            )
+            for key in ("tokens_in", "tokens_out", "seconds"):
+                usage[key] = usage.get(key, 0) + result["usage"].get(key, 0)
+            error = self._answer_error(comp_id, result, upstream_columns)
+        if attempts:
+            usage["retries"] = usage.get("retries", 0) + attempts
+            # Cache the repaired answer in place of the broken one (or drop it).
+            self.agent.remember(comp_type, snippet, prev_cte, None if error else result)
+        return {**result, "usage": usage}, error
+
+    @staticmethod
+    def _source_ref(comp_id, entry, loops=()):
+        raw_val = dataset_param(entry)
+
+        if raw_val:
+            spec = iterated_spec(raw_val, loops)
+            if spec:
+                return loop_source_sql(spec)
+            if "context." in raw_val or "globalMap.get" in raw_val:
+                names = GLOBALMAP_RE.findall(raw_val) or CONTEXT_RE.findall(raw_val)
+                var_name = names[0] if names else f"src_{comp_id}"
+                return f"{{{{ var('{var_name}', 'default_{comp_id}') }}}}"
+            return f"{{{{ source('raw', '{dataset_name(entry)}') }}}}"
+        return f"{{{{ source('raw', 'src_{comp_id}') }}}}"
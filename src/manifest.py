@@ -0,0 +1,140 @@
+import os
+import json
+import hashlib
+import threading
+import networkx as nx
+
+MANIFEST_VERSION = 1
+
+
+def file_sha256(filepath, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def project_digest(graph, settings):
+    """
+    Fingerprint of a Talend export (every job's content) and the conversion
+    settings. Conversion hosts compare theirs with the coordinator's before
+    converting anything, so a stale checkout cannot write mismatched models.
+    """
+    jobs = {
+        job: file_sha256(data["filepath"]) if data.get("filepath") else None
+        for job, data in sorted(graph.nodes(data=True))
+    }
+    payload = json.dumps({"settings": settings, "jobs": jobs}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class MigrationManifest:
+    """
+    Record of the last migration run, used by incremental mode:
+        {"version", "settings": {...},
+         "jobs":  {job: {"filepath", "sha256", "type", "outputs": [paths]}},
+         "edges": [[caller, callee], ...]}      (tRunJob edges from ProjectGraph)
+
+    A job is reconverted when its .item content changed, it is new, one of
+    its outputs is missing, or a job it calls (directly or not) is dirty.
+    Jobs that disappeared from the export have their outputs removed.
+    """
+    def __init__(self, path, settings=None):
+        self.path = path
+        self.settings = settings or {}
+        self.jobs = {}
+        self.edges = []
+        self._previous = {"jobs": {}, "edges": [], "settings": {}}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path, settings=None):
+        manifest = cls(path, settings)
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get("version") == MANIFEST_VERSION:
+                    manifest._previous = data
+            except (OSError, ValueError) as e:
+                print(f"[WARN] Ignoring unreadable manifest {path}: {e}")
+        return manifest
+
+    def plan(self, graph):
+        """
+        Compares the freshly built ProjectGraph with the previous run.
+        Returns (dirty_jobs, deleted_jobs). Everything is dirty when there is
+        no usable previous manifest or the conversion settings changed.
+        """
+        previous_jobs = self._previous.get("jobs", {})
+        full_run = not previous_jobs or self._previous.get("settings") != self.settings
+
+        changed = set()
+        for job in graph.nodes:
+            filepath = graph.nodes[job].get("filepath")
+            digest = file_sha256(filepath) if filepath else None
+            old = previous_jobs.get(job)
+            self.jobs[job] = {
+                "filepath": filepath,
+                "sha256": digest,
+                "type": graph.nodes[job].get("type"),
+                "outputs": list(old["outputs"]) if old else [],
+            }
+            if full_run or old is None or old.get("sha256") != digest:
+                changed.add(job)
+            elif any(not os.path.exists(p) for p in old.get("outputs", [])):
+                changed.add(job)
+        self.edges = [[u, v] for u, v in graph.edges]
+
+        # A caller depends on everything it runs: reconvert all ancestors.
+        dirty = set(changed)
+        for job in changed:
+            dirty |= nx.ancestors(graph, job)
+        # Edges that appeared or vanished also touch the caller.
+        old_edges = {tuple(e) for e in self._previous.get("edges", [])}
+        new_edges = {tuple(e) for e in self.edges}
+        for caller, _ in old_edges ^ new_edges:
+            if caller in graph:
+                dirty.add(caller)
+                dirty |= nx.ancestors(graph, caller)
+
+        deleted = sorted(set(previous_jobs) - set(graph.nodes))
+        return dirty, deleted
+
+    def remove_outputs(self, job):
+        """Deletes the generated files of a job that no longer exists."""
+        removed = []
+        for path in self._previous.get("jobs", {}).get(job, {}).get("outputs", []):
+            if os.path.exists(path):
+                os.remove(path)
+                removed.append(path)
+        return removed
+
+    def record_output(self, job, path):
+        """Registers a job's new output; files it replaces are deleted."""
+        with self._lock:
+            entry = self.jobs.setdefault(job, {"filepath": None, "sha256": None, "type": None, "outputs": []})
+            for old in entry["outputs"]:
+                if old != path and os.path.exists(old):
+                    os.remove(old)
+            entry["outputs"] = [path]
+
+    def mark_failed(self, job):
+        # No hash -> treated as changed next time, so the job is retried.
+        with self._lock:
+            if job in self.jobs:
+                self.jobs[job]["sha256"] = None
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        data = {
+            "version": MANIFEST_VERSION,
+            "settings": self.settings,
+            "jobs": self.jobs,
+            "edges": self.edges,
+        }
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding='utf-8') as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
@@ -0,0 +1,124 @@
+"""
+dbt materialization per model, from what the Talend job does with its output.
+
+    Output DATA_ACTION             TABLE_ACTION kept   ->  model
+    INSERT / INSERT_IGNORE / file APPEND, with keys    ->  incremental (append), new keys only
+    INSERT_OR_UPDATE, UPDATE_OR_INSERT, REPLACE, ...   ->  incremental (delete+insert) on the keys
+    UPDATE, with keys                                  ->  incremental (delete+insert), existing keys only
+    anything else (reloads, no keys, several outputs)  ->  view when the sources are small and at
+                                                           most MATERIALIZATION_VIEW_MAX_READERS jobs
+                                                           read the result, otherwise table
+
+A small model becomes a view rather than ephemeral: the direct DuckDB runner (temporal_activities)
+builds each model as its own relation and cannot inline ephemeral models into their readers.
+
+Source sizes come from the input files (FILE_SOURCE_ROOTS applied) when they exist on this machine,
+otherwise from SOURCE_SIZE_HINTS; unknown sizes never make a view.
+"""
+import os
+from src.config import MATERIALIZATION_VIEW_MAX_BYTES, MATERIALIZATION_VIEW_MAX_READERS, SOURCE_SIZE_HINTS
+from src.sql_util import quote
+from src.file_sources import local_path
+
+APPEND_ACTIONS = {"INSERT", "INSERT_IGNORE"}
+UPSERT_ACTIONS = {"INSERT_OR_UPDATE", "UPDATE_OR_INSERT", "REPLACE", "INSERT_ON_DUPLICATE_KEY_UPDATE"}
+UPDATE_ACTIONS = {"UPDATE"}
+# The target is emptied or recreated on every run: a full rebuild is the same.
+RELOAD_TABLE_ACTIONS = {"DROP_CREATE", "DROP_IF_EXISTS_AND_CREATE", "CLEAR", "TRUNCATE"}
+
+
+class MaterializationAdvisor:
+    def __init__(self, project_graph, size_hints=None, view_max_bytes=MATERIALIZATION_VIEW_MAX_BYTES,
+                 view_max_readers=MATERIALIZATION_VIEW_MAX_READERS):
+        self.project = project_graph
+        self.size_hints = {k.lower(): v for k, v in (SOURCE_SIZE_HINTS if size_hints is None else size_hints).items()}
+        self.view_max_bytes = view_max_bytes
+        self.view_max_readers = view_max_readers
+
+    def source_bytes(self, job_name):
+        """Total size of the job's inputs, None if any of them is unknown."""
+        data = self.project.graph.nodes[job_name]
+        total = 0
+        for name in data.get("reads", ()):
+            path = data.get("sources", {}).get(name)
+            path = local_path(path) if path else None
+            if path and os.path.isfile(path):
+                total += os.path.getsize(path)
+            elif name.lower() in self.size_hints:
+                total += self.size_hints[name.lower()]
+            else:
+                return None
+        return total if data.get("reads") else None
+
+    def advise(self, job_name):
+        """
+        {"materialized", "incremental_strategy", "unique_key", "filter", "reason"};
+        filter is "new_keys" / "existing_keys" / None (see incremental_filter).
+        """
+        outputs = self.project.graph.nodes[job_name].get("outputs", [])
+        if len(outputs) == 1:
+            advice = self._incremental(outputs[0])
+            if advice:
+                return advice
+            reason = f"{outputs[0]['type']} {outputs[0]['data_action'] or 'write'}"
+            if outputs[0]["table_action"] in RELOAD_TABLE_ACTIONS:
+                reason += f" after {outputs[0]['table_action']}"
+            elif not outputs[0]["keys"]:
+                reason += " without key columns"
+        else:
+            reason = f"{len(outputs)} outputs"
+
+        readers = len(self.project.fan_out(job_name))
+        size = self.source_bytes(job_name)
+        if size is not None and size <= self.view_max_bytes and readers <= self.view_max_readers:
+            return self._advice("view", f"{reason}; sources {size} bytes, {readers} readers")
+        detail = "sources of unknown size" if size is None else f"sources {size} bytes"
+        return self._advice("table", f"{reason}; {detail}, {readers} readers")
+
+    def _incremental(self, output):
+        action, keys = output["data_action"], output["keys"]
+        if output["table_action"] in RELOAD_TABLE_ACTIONS or not keys:
+            return None
+        on = ", ".join(keys)
+        if action in APPEND_ACTIONS or (output["append"] and not action):
+            return self._advice("incremental", f"append-only {action or 'file'} on {on}",
+                                strategy="append", keys=keys, filter="new_keys")
+        if action in UPSERT_ACTIONS:
+            return self._advice("incremental", f"{action} on {on}", strategy="delete+insert", keys=keys)
+        if action in UPDATE_ACTIONS:
+            return self._advice("incremental", f"UPDATE on {on}", strategy="delete+insert", keys=keys,
+                                filter="existing_keys")
+        return None
+
+    @staticmethod
+    def _advice(materialized, reason, strategy=None, keys=None, filter=None):
+        return {"materialized": materialized, "incremental_strategy": strategy, "unique_key": keys,
+                "filter": filter, "reason": reason}
+
+
+def config_block(advice):
+    """{{ config(materialized='incremental', incremental_strategy='append', unique_key=[...]) }}"""
+    # repr() gives valid Jinja string literals, quotes in column names included.
+    args = [f"materialized={advice['materialized']!r}"]
+    if advice["incremental_strategy"]:
+        args.append(f"incremental_strategy={advice['incremental_strategy']!r}")
+    if advice["unique_key"]:
+        args.append("unique_key=[" + ", ".join(repr(k) for k in advice["unique_key"]) + "]")
+    return "{{ config(" + ", ".join(args) + ") }}"
+
+
+def incremental_filter(advice):
+    """
+    WHERE clause appended to the model's final `SELECT * FROM ...` for
+    incremental runs: rows whose key is (not) already in the target.
+    """
+    if not advice["filter"]:
+        return ""
+    keys = ", ".join(quote(k) for k in advice["unique_key"])
+    not_null = " AND ".join(f"{quote(k)} IS NOT NULL" for k in advice["unique_key"])
+    operator = "NOT IN" if advice["filter"] == "new_keys" else "IN"
+    return (
+        "\n{% if is_incremental() %}\n"
+        f"WHERE ({keys}) {operator} (SELECT {keys} FROM {{{{ this }}}} WHERE {not_null})\n"
+        "{% endif %}"
+    )
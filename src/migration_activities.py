@@ -0,0 +1,203 @@
+"""
+Activities of the distributed conversion (MigrationWorkflow, src/migration_workflow.py).
+
+Coordinator - MIGRATION_TASK_QUEUE, the host that owns the output directory:
+    plan_migration     graph, incremental plan, workflow.py -> jobs to convert
+    write_job_output   writes one converted model/macro, keeps its stats on disk
+    finish_migration   manifest, staging manifest and reports from those stats
+Conversion hosts - MIGRATION_CONVERT_QUEUE, each with its own Ollama and a
+copy of the Talend export (TALEND_INPUT_DIR / OLLAMA_BASE_URL override the
+config, see run_temporal_worker.py --roles convert):
+    convert_job        one job through MigrationEngine.render_job()
+
+Per-job stats are kept in output/migration_runs/<workflow id>-<run id>/ as they
+arrive, so a coordinator restart loses nothing the workflow history says
+is done, and finish_migration never needs them in a workflow payload.
+"""
+import os
+import json
+import time
+import socket
+import shutil
+import asyncio
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+from temporalio import activity
+from temporalio.exceptions import ApplicationError
+from src.config import (
+    INPUT_DIR, OUTPUT_DIR, DBT_OUTPUT_DIR, OLLAMA_BASE_URL, FILE_SOURCE_STAGING, STAGING_DIR, MIGRATION_HEARTBEAT_S,
+    FILE_SOURCE_ROOTS, STAGING_PARTITION_BY, SOURCE_SIZE_HINTS, MATERIALIZATION_VIEW_MAX_BYTES,
+    MATERIALIZATION_VIEW_MAX_READERS,
+)
+from src.main_engine import MigrationEngine
+from src.manifest import project_digest
+
+RUNS_DIR = os.path.join(OUTPUT_DIR, "migration_runs")
+
+_engine_lock = threading.Lock()
+_engine = None     # (digest, MigrationEngine) of this conversion host
+
+
+def _digest_settings(engine):
+    """
+    Conversion settings every host must share: besides the manifest's, those
+    that end up in the models (file paths via FILE_SOURCE_ROOTS, staging
+    targets, config() from the materialization thresholds and size hints).
+    """
+    settings = dict(engine.manifest.settings)
+    settings["file_source_roots"] = FILE_SOURCE_ROOTS
+    settings["materialization_view"] = [MATERIALIZATION_VIEW_MAX_BYTES, MATERIALIZATION_VIEW_MAX_READERS]
+    settings["source_size_hints"] = SOURCE_SIZE_HINTS
+    if FILE_SOURCE_STAGING:
+        settings["staging_dir"] = STAGING_DIR
+        settings["staging_partition_by"] = STAGING_PARTITION_BY
+    return settings
+
+
+def _run_dir(run_id):
+    path = os.path.join(RUNS_DIR, run_id)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+# --- COORDINATOR ---
+@activity.defn
+def plan_migration(request: dict) -> dict:
+    """
+    request: {"incremental": bool}. Returns {"digest", "jobs", "deleted"};
+    jobs are ordered largest .item first, so long conversions start early.
+    """
+    # Stats of earlier migrations (one runs at a time: fixed workflow id).
+    shutil.rmtree(RUNS_DIR, ignore_errors=True)
+    engine = MigrationEngine(incremental=request.get("incremental", False))
+    graph, dirty, deleted = engine.plan()
+    missing = sorted(job for job in dirty if not graph.nodes[job].get("filepath"))
+    for job in missing:
+        print(f"[WARN] {job}: called by tRunJob but not in the export, nothing to convert")
+    jobs = sorted((job for job in dirty if job not in missing),
+                  key=lambda job: (-os.path.getsize(graph.nodes[job]["filepath"]), job))
+    engine.close()
+    os.makedirs(os.path.join(engine.dbt_dir, "models"), exist_ok=True)
+    os.makedirs(os.path.join(engine.dbt_dir, "macros"), exist_ok=True)
+    print(f"[INFO] Migration plan: {len(jobs)} jobs to convert, {len(deleted)} deleted")
+    return {"digest": project_digest(graph, _digest_settings(engine)), "jobs": jobs, "deleted": deleted}
+
+
+@activity.defn
+def write_job_output(request: dict) -> dict:
+    """request: {"run", "result"} (a render_job() result). Returns {"job", "status"}."""
+    result = request["result"]
+    status = "skipped"
+    if result["text"]:
+        path = os.path.join(DBT_OUTPUT_DIR, *result["path"].split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding='utf-8') as f:
+            f.write(result["text"])
+        os.replace(tmp, path)
+        status = "converted"
+    stats = {k: v for k, v in result.items() if k != "text"}
+    stats["status"] = status
+    stats_path = os.path.join(_run_dir(request["run"]), f"{result['job']}.json")
+    with open(stats_path + ".tmp", "w", encoding='utf-8') as f:
+        json.dump(stats, f)
+    os.replace(stats_path + ".tmp", stats_path)
+    return {"job": result["job"], "status": status}
+
+
+@activity.defn
+def finish_migration(request: dict) -> dict:
+    """
+    request: {"run", "incremental"}. Rebuilds the manifest from the stats of
+    run `run` (jobs without stats failed) and writes the reports.
+    """
+    engine = MigrationEngine(incremental=request.get("incremental", False))
+    # Same plan as plan_migration: the previous manifest is only replaced below.
+    graph, dirty, deleted = engine.plan()
+    for job in list(engine.graph_builder.jobs):
+        engine.graph_builder.release_job(job)
+
+    run_dir = _run_dir(request["run"])
+    counts = {"converted": 0, "skipped": 0, "failed": 0}
+    for job in sorted(dirty):
+        stats_path = os.path.join(run_dir, f"{job}.json")
+        stats = None
+        if os.path.exists(stats_path):
+            with open(stats_path, "r", encoding='utf-8') as f:
+                stats = json.load(f)
+        if stats and stats["status"] == "converted":
+            engine.manifest.record_output(job, os.path.join(engine.dbt_dir, *stats["path"].split("/")))
+            engine.merge_job_stats(stats)
+            counts["converted"] += 1
+        else:
+            engine.manifest.mark_failed(job)
+            counts["skipped" if stats else "failed"] += 1
+    engine.finish(dirty, deleted)
+    print(f"[INFO] Migration {request['run']}: " + ", ".join(f"{k}={v}" for k, v in counts.items()))
+    return counts
+
+
+# --- CONVERSION HOSTS ---
+def _conversion_engine(digest):
+    """
+    This host's engine over its own copy of the export, built once per
+    process (again if the export changed since). Parsed jobs are released
+    after the build; each conversion re-reads only its own .item file.
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is None or _engine[0] != digest:
+            from src.agent_llm import SouravAgent
+            engine = MigrationEngine(
+                input_dir=os.environ.get("TALEND_INPUT_DIR") or INPUT_DIR,
+                output_dir=os.path.join(tempfile.gettempdir(), "talend-convert"),
+                agent=SouravAgent(base_url=os.environ.get("OLLAMA_BASE_URL") or OLLAMA_BASE_URL),
+            )
+            graph = engine.graph_builder.build()
+            for job in list(engine.graph_builder.jobs):
+                engine.graph_builder.release_job(job)
+            _engine = (project_digest(graph, _digest_settings(engine)), engine)
+        if _engine[0] != digest:
+            # Retryable: another host may hold the coordinator's version.
+            raise ApplicationError(f"Talend export or settings on {socket.gethostname()} differ from the "
+                                   f"coordinator's ({_engine[0][:12]} != {digest[:12]})", type="ProjectMismatch")
+        return _engine[1]
+
+
+def _check_ollama():
+    """Fails the attempt (retried, possibly elsewhere) instead of converting without an LLM."""
+    url = (os.environ.get("OLLAMA_BASE_URL") or OLLAMA_BASE_URL).rstrip("/") + "/api/tags"
+    try:
+        urllib.request.urlopen(url, timeout=5).close()
+    except urllib.error.HTTPError:
+        pass  # it answered
+    except OSError as e:
+        raise ApplicationError(f"Ollama not reachable on {socket.gethostname()} ({url}): {e}", type="LlmUnavailable")
+
+
+def _convert(request):
+    engine = _conversion_engine(request["digest"])
+    _check_ollama()
+    start = time.perf_counter()
+    result = engine.render_job(request["job"])
+    result["host"] = socket.gethostname()
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    print(f"[WORKER] {request['job']}: {'converted' if result['text'] else 'skipped'} in {result['seconds']:.1f}s")
+    return result
+
+
+@activity.defn
+async def convert_job(request: dict) -> dict:
+    """
+    request: {"job", "digest"}. Runs the conversion on a thread and
+    heartbeats meanwhile: a host that dies stops heartbeating and its job is
+    retried on another one after MIGRATION_HEARTBEAT_S.
+    """
+    task = asyncio.ensure_future(asyncio.to_thread(_convert, request))
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=MIGRATION_HEARTBEAT_S / 3)
+        if done:
+            return task.result()
+        activity.heartbeat(request["job"])
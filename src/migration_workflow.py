@@ -0,0 +1,89 @@
+"""
+MigrationWorkflow: the conversion itself as a Temporal workflow.
+
+    plan_migration (coordinator)                 graph + incremental plan + workflow.py
+      -> convert_job x N (MIGRATION_CONVERT_QUEUE) one activity per job, any conversion host
+      -> write_job_output (coordinator)          as each job comes back
+    finish_migration (coordinator)               manifest, staging manifest, reports
+
+Every finished job is recorded in the workflow history, so nothing is
+converted twice: a conversion host that dies only loses its in-flight jobs
+(retried elsewhere once their heartbeat times out), and a coordinator that
+restarts replays the history and carries on. Jobs that still fail after
+MIGRATION_JOB_ATTEMPTS are marked failed in the manifest and retried by the
+next --incremental run. Continues as new every MIGRATION_CONTINUE_AFTER jobs,
+so the history stays small on large projects.
+"""
+import asyncio
+from datetime import timedelta
+from temporalio import workflow
+from temporalio.common import RetryPolicy
+from temporalio.exceptions import ActivityError
+
+with workflow.unsafe.imports_passed_through():
+    from src.migration_activities import plan_migration, convert_job, write_job_output, finish_migration
+    from src.config import (
+        MIGRATION_TASK_QUEUE, MIGRATION_CONVERT_QUEUE, MIGRATION_MAX_PARALLEL, MIGRATION_JOB_ATTEMPTS,
+        MIGRATION_JOB_TIMEOUT_MIN, MIGRATION_HEARTBEAT_S, MIGRATION_CONTINUE_AFTER,
+    )
+
+CONVERT_RETRY = RetryPolicy(
+    initial_interval=timedelta(seconds=10),
+    backoff_coefficient=2.0,
+    maximum_attempts=MIGRATION_JOB_ATTEMPTS,
+)
+
+
+@workflow.defn
+class MigrationWorkflow:
+    """
+    request: {"incremental": bool}; the state between runs (continue-as-new)
+    travels in request["state"]. Returns {"converted", "skipped", "failed"}
+    as counted by finish_migration, plus "failed_jobs".
+    """
+    @workflow.run
+    async def run(self, request: dict) -> dict:
+        state = request.get("state")
+        if state is None:
+            plan = await workflow.execute_activity(
+                plan_migration, request, task_queue=MIGRATION_TASK_QUEUE,
+                start_to_close_timeout=timedelta(minutes=60),
+            )
+            workflow.logger.info(f"Migration plan: {len(plan['jobs'])} jobs")
+            # Keys this migration's per-job stats on the coordinator (same across continue-as-new).
+            run_id = f"{workflow.info().workflow_id}-{workflow.info().run_id}"
+            state = {"run": run_id, "digest": plan["digest"], "pending": plan["jobs"], "failed": []}
+        run_id = state["run"]
+
+        gate = asyncio.Semaphore(MIGRATION_MAX_PARALLEL)
+
+        async def convert(job):
+            async with gate:
+                try:
+                    result = await workflow.execute_activity(
+                        convert_job, {"job": job, "digest": state["digest"]},
+                        task_queue=MIGRATION_CONVERT_QUEUE,
+                        start_to_close_timeout=timedelta(minutes=MIGRATION_JOB_TIMEOUT_MIN),
+                        heartbeat_timeout=timedelta(seconds=MIGRATION_HEARTBEAT_S),
+                        retry_policy=CONVERT_RETRY,
+                    )
+                except ActivityError as e:
+                    workflow.logger.warning(f"{job}: conversion failed after retries: {e.cause or e}")
+                    return job
+                await workflow.execute_activity(
+                    write_job_output, {"run": run_id, "result": result}, task_queue=MIGRATION_TASK_QUEUE,
+                    start_to_close_timeout=timedelta(minutes=5),
+                )
+                return None
+
+        window, pending = state["pending"][:MIGRATION_CONTINUE_AFTER], state["pending"][MIGRATION_CONTINUE_AFTER:]
+        failed = list(state["failed"])
+        failed.extend(job for job in await asyncio.gather(*(convert(job) for job in window)) if job)
+        if pending:
+            workflow.continue_as_new(args=[{**request, "state": {**state, "pending": pending, "failed": failed}}])
+
+        counts = await workflow.execute_activity(
+            finish_migration, {"run": run_id, "incremental": request.get("incremental", False)},
+            task_queue=MIGRATION_TASK_QUEUE, start_to_close_timeout=timedelta(minutes=60),
+        )
+        return {**counts, "failed_jobs": sorted(failed)}
@@ -0,0 +1,369 @@
+"""
+Data parity between what the Talend job produced and what the migrated
+model produces, both read through DuckDB (tables, views, files or queries).
+
+Rows are never joined wholesale. Each side is scanned once per level into a
+small aggregate per key-hash range:
+
+    SELECT _kh >> 52 AS bucket, count(*), sum(_rh::HUGEINT), bit_xor(_rh)
+    FROM (SELECT hash(<keys>) AS _kh, hash(<all columns>) AS _rh FROM side)
+    GROUP BY bucket
+
+(4096 buckets with the default PARITY_BUCKET_BITS = 12). Equal aggregates
+mean equal rows in that range. Only the mismatched ranges are split again
+on the next bits of the key hash, until they hold at most PARITY_DRILL_ROWS
+rows; those rows alone are fetched and classified as missing (expected row
+not in actual), extra (actual row not in expected) or changed (same key,
+different values). Memory stays bounded by the bucket count and
+PARITY_DRILL_ROWS whatever the table size; widespread differences are
+drilled into PARITY_DRILL_BUCKETS ranges per level and reported as samples.
+
+Columns are compared on the names both sides share (case-insensitive).
+Same-typed columns are hashed as they are; mixed types (DECIMAL vs DOUBLE,
+INTEGER vs a text file column) are compared on a common text form. Floats
+are rounded to PARITY_FLOAT_DIGITS and '' counts as NULL, because Talend's
+file outputs cannot tell them apart.
+
+    python -m src.parity_checker /data/out/complaints.csv complaint_historical --key CMPLNT_NUM
+"""
+import os
+import re
+import json
+import time
+import argparse
+import duckdb
+from src.config import (
+    DUCKDB_PATH, PARITY_BUCKET_BITS, PARITY_DRILL_ROWS, PARITY_DRILL_BUCKETS, PARITY_FLOAT_DIGITS,
+    PARITY_EMPTY_IS_NULL, PARITY_SAMPLE, PARITY_MEMORY_LIMIT, PARITY_THREADS,
+)
+from src.instrumentation import RECORDER
+from src.sql_util import quote
+
+QUERY_RE = re.compile(r"^\s*\(?\s*(select|with|from|values)\b", re.IGNORECASE)
+FILE_READERS = {
+    ".csv": "read_csv", ".tsv": "read_csv", ".txt": "read_csv", ".gz": "read_csv",
+    ".parquet": "read_parquet", ".json": "read_json_auto", ".ndjson": "read_json_auto",
+}
+INTEGER_TYPES = {"TINYINT", "SMALLINT", "INTEGER", "BIGINT", "HUGEINT",
+                 "UTINYINT", "USMALLINT", "UINTEGER", "UBIGINT", "UHUGEINT"}
+FLOAT_TYPES = {"FLOAT", "REAL", "DOUBLE"}
+KINDS = ("missing", "extra", "changed")
+
+
+def relation(spec):
+    """FROM-clause text for a table name, a data file, a reader call or a query."""
+    text = spec.strip()
+    if QUERY_RE.match(text):
+        return text if text.startswith("(") else f"({text})"
+    if "(" in text:
+        return text  # read_csv(...), read_parquet(...)
+    ext = os.path.splitext(text.lower())[1]
+    if ext in FILE_READERS or "/" in text or "\\" in text:
+        reader = FILE_READERS.get(ext, "read_csv")
+        return f"{reader}('{text.replace(chr(39), chr(39) * 2)}')"
+    return ".".join(quote(part) for part in text.split("."))
+
+
+def _kind(sql_type):
+    t = sql_type.upper()
+    if t in INTEGER_TYPES:
+        return "integer"
+    if t in FLOAT_TYPES or t.startswith("DECIMAL"):
+        return "number"
+    if t.startswith(("DATE", "TIMESTAMP")):
+        return "temporal"
+    if t == "BOOLEAN":
+        return "boolean"
+    return "text"
+
+
+class ParityChecker:
+    """
+    compare(expected, actual, keys=[...]) -> report dict; "match" is True
+    when every shared column of every row is equal. Without keys the sides
+    are compared as multisets of rows (no "changed", only missing/extra).
+    """
+    def __init__(self, database=DUCKDB_PATH, bucket_bits=PARITY_BUCKET_BITS, drill_rows=PARITY_DRILL_ROWS,
+                 drill_buckets=PARITY_DRILL_BUCKETS, float_digits=PARITY_FLOAT_DIGITS,
+                 empty_is_null=PARITY_EMPTY_IS_NULL, sample=PARITY_SAMPLE,
+                 memory_limit=PARITY_MEMORY_LIMIT, threads=PARITY_THREADS):
+        # Read-only: parity never writes, and a worker may hold the warehouse.
+        read_only = database != ":memory:" and os.path.exists(database)
+        self.con = duckdb.connect(database=database if read_only else ":memory:", read_only=read_only)
+        self.con.execute("SET enable_progress_bar = false")
+        if memory_limit:
+            self.con.execute(f"SET memory_limit = '{memory_limit}'")
+        if threads:
+            self.con.execute(f"SET threads = {int(threads)}")
+        self.bucket_bits = max(1, min(int(bucket_bits), 32))
+        self.drill_rows = max(1, int(drill_rows))
+        self.drill_buckets = max(1, int(drill_buckets))
+        self.float_digits = int(float_digits)
+        self.empty_is_null = empty_is_null
+        self.sample = int(sample)
+
+    def close(self):
+        self.con.close()
+
+    # --- ENTRY POINT ---
+    def compare(self, expected, actual, keys=None, columns=None, exclude=()):
+        with RECORDER.stage("ParityChecker.compare"):
+            start = time.perf_counter()
+            report = self._compare(expected, actual, keys or [], columns, exclude)
+            report["seconds"] = round(time.perf_counter() - start, 3)
+            return report
+
+    def _compare(self, expected, actual, keys, columns, exclude):
+        sides = {"expected": relation(expected), "actual": relation(actual)}
+        schemas = {side: self._schema(rel) for side, rel in sides.items()}
+        excluded = {c.lower() for c in exclude}
+        shared = [c for c in schemas["expected"] if c in schemas["actual"] and c not in excluded]
+        if columns:
+            wanted = {c.lower() for c in columns}
+            shared = [c for c in shared if c in wanted]
+        missing_keys = [k for k in keys if k.lower() not in shared]
+        if missing_keys:
+            raise ValueError(f"Key columns not in both datasets: {', '.join(missing_keys)}")
+        if not shared:
+            raise ValueError("No columns in common to compare.")
+
+        names = {c: schemas["expected"][c][0] for c in shared}
+        normalized = {side: {c: self._normalize(schemas[side][c][0], schemas["expected"][c][1],
+                                                schemas["actual"][c][1]) for c in shared}
+                      for side in sides}
+        key_columns = [k.lower() for k in keys]
+
+        report = {
+            "expected": expected, "actual": actual, "keys": [names[k] for k in key_columns],
+            "columns": {
+                "compared": [names[c] for c in shared],
+                "only_expected": [v[0] for c, v in schemas["expected"].items() if c not in schemas["actual"]],
+                "only_actual": [v[0] for c, v in schemas["actual"].items() if c not in schemas["expected"]],
+            },
+        }
+
+        # Level 1: every row, one aggregate per key-hash range and side.
+        shift = 64 - self.bucket_bits
+        aggregates = {side: self._aggregate(self._hashed(sides[side], normalized[side], key_columns), shift)
+                      for side in sides}
+        report["rows"] = {side: sum(n for n, _, _ in aggregates[side].values()) for side in sides}
+        diff = self._mismatched(aggregates)
+        report["buckets"] = {"count": 1 << self.bucket_bits, "mismatched": len(diff), "levels": 1}
+        report["match"] = not diff
+        if not diff:
+            report["exact"] = True
+            report["differences"] = {kind: 0 for kind in KINDS}
+            report["samples"] = {kind: [] for kind in KINDS}
+            return report
+
+        # Drill down: split the mismatched ranges on the next bits until small enough.
+        exact = True
+        while sum(diff.values()) > self.drill_rows:
+            if len(diff) > self.drill_buckets:
+                diff = dict(sorted(diff.items())[:self.drill_buckets])
+                exact = False
+            if sum(diff.values()) <= self.drill_rows or shift - self.bucket_bits < 0:
+                break
+            parents, parent_shift = sorted(diff), shift
+            shift -= self.bucket_bits
+            ranges = (parent_shift, parents)
+            aggregates = {side: self._aggregate(self._hashed(sides[side], normalized[side], key_columns, ranges), shift)
+                          for side in sides}
+            diff = self._mismatched(aggregates)
+            report["buckets"]["levels"] += 1
+
+        report["exact"] = exact
+        report.update(self._classify(sides, normalized, key_columns, names, shared, (shift, sorted(diff))))
+        return report
+
+    # --- SQL ---
+    def _schema(self, rel):
+        """{lower name: (name, type)} in column order."""
+        rows = self.con.execute(f"DESCRIBE SELECT * FROM {rel} AS p").fetchall()
+        return {row[0].lower(): (row[0], row[1]) for row in rows}
+
+    def _normalize(self, name, expected_type, actual_type):
+        """Expression comparing equal on both sides for equal values."""
+        q = quote(name)
+        text = f"NULLIF(CAST({q} AS VARCHAR), '')" if self.empty_is_null else f"CAST({q} AS VARCHAR)"
+        kinds = {_kind(expected_type), _kind(actual_type)}
+        rounded = f"round(TRY_CAST({q} AS DOUBLE), {self.float_digits}) + 0.0"  # + 0.0: -0.0 -> 0.0
+        if expected_type == actual_type:
+            if kinds == {"number"}:
+                return rounded
+            return text if kinds == {"text"} else q
+        if kinds == {"integer"}:
+            return f"TRY_CAST({q} AS HUGEINT)"
+        if kinds & {"integer", "number"}:
+            return f"coalesce(CAST({rounded} AS VARCHAR), {text})"
+        if "temporal" in kinds:
+            return f"coalesce(CAST(TRY_CAST({q} AS TIMESTAMP) AS VARCHAR), {text})"
+        if "boolean" in kinds:
+            return f"coalesce(CAST(TRY_CAST({q} AS BOOLEAN) AS VARCHAR), {text})"
+        return text
+
+    @staticmethod
+    def _hashed(rel, normalized, key_columns, ranges=None, values=False):
+        """
+        _kh (key hash; the row hash when there are no keys) and _rh per row,
+        only for rows in ranges = (shift, [buckets]) when given. The range
+        filter is on the key hash alone, so skipped rows are never row-hashed.
+        """
+        row_hash = f"hash({', '.join(normalized.values())})"
+        key_hash = f"hash({', '.join(normalized[k] for k in key_columns)})" if key_columns else row_hash
+        select = [f"{key_hash} AS _kh", f"{row_hash} AS _rh"]
+        if values:
+            select.extend(f"{expr} AS _c{i}" for i, expr in enumerate(normalized.values()))
+        where = ""
+        if ranges:
+            shift, buckets = ranges
+            where = f" WHERE ({key_hash} >> {shift}) IN ({', '.join(str(b) for b in buckets)})"
+        return f"(SELECT {', '.join(select)} FROM {rel} AS p{where})"
+
+    def _aggregate(self, hashed, shift):
+        rows = self.con.execute(
+            f"SELECT _kh >> {shift} AS bucket, count(*), sum(_rh::HUGEINT), bit_xor(_rh) "
+            f"FROM {hashed} AS h GROUP BY bucket"
+        ).fetchall()
+        return {bucket: (n, s, x) for bucket, n, s, x in rows}
+
+    @staticmethod
+    def _mismatched(aggregates):
+        """{bucket: larger row count of the two sides} for ranges that differ."""
+        expected, actual = aggregates["expected"], aggregates["actual"]
+        empty = (0, 0, 0)
+        return {
+            b: max(expected.get(b, empty)[0], actual.get(b, empty)[0])
+            for b in set(expected) | set(actual) if expected.get(b, empty) != actual.get(b, empty)
+        }
+
+    def _classify(self, sides, normalized, key_columns, names, shared, ranges):
+        """
+        Rows of the drilled ranges, matched as multisets of (key, row): the
+        n-th copy of a row on one side pairs with its n-th copy on the other.
+        Unpaired rows sharing a key on both sides are "changed".
+        """
+        for side, rel in sides.items():
+            hashed = self._hashed(rel, normalized[side], key_columns, ranges, values=True)
+            self.con.execute(
+                f"CREATE OR REPLACE TEMP TABLE _parity_{side} AS "
+                f"SELECT *, row_number() OVER (PARTITION BY _kh, _rh) AS _n FROM {hashed} AS h"
+            )
+        try:
+            for side, other in (("expected", "actual"), ("actual", "expected")):
+                self.con.execute(
+                    f"CREATE OR REPLACE TEMP TABLE _parity_{side}_only AS "
+                    f"SELECT * FROM _parity_{side} ANTI JOIN _parity_{other} USING (_kh, _rh, _n)"
+                )
+            if key_columns:
+                counts = dict(self.con.execute("""
+                    SELECT kind, count(*) FROM (
+                        SELECT CASE WHEN e._kh IS NULL THEN 'extra' WHEN a._kh IS NULL THEN 'missing'
+                                    ELSE 'changed' END AS kind
+                        FROM (SELECT DISTINCT _kh FROM _parity_expected_only) e
+                        FULL OUTER JOIN (SELECT DISTINCT _kh FROM _parity_actual_only) a USING (_kh)
+                    ) GROUP BY kind
+                """).fetchall())
+            else:
+                # Row hash as key: a changed row is a missing one plus an extra one.
+                counts = {"missing": self._count("_parity_expected_only"), "extra": self._count("_parity_actual_only")}
+            return {
+                "differences": {kind: counts.get(kind, 0) for kind in KINDS},
+                "samples": self._samples(key_columns, names, shared),
+            }
+        finally:
+            for table in ("expected", "actual", "expected_only", "actual_only"):
+                self.con.execute(f"DROP TABLE IF EXISTS _parity_{table}")
+
+    def _count(self, table):
+        return self.con.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+
+    def _samples(self, key_columns, names, shared):
+        index = {c: i for i, c in enumerate(shared)}
+        show = key_columns or shared
+        key_select = ", ".join(f"_c{index[c]}" for c in show)
+
+        def _rows(table, condition):
+            rows = self.con.execute(
+                f"SELECT _kh, {key_select} FROM {table} t WHERE {condition} ORDER BY _kh LIMIT {self.sample}"
+            ).fetchall()
+            return [{names[c]: _plain(v) for c, v in zip(show, row[1:])} for row in rows]
+
+        samples = {
+            "missing": _rows("_parity_expected_only", "_kh NOT IN (SELECT _kh FROM _parity_actual_only)"),
+            "extra": _rows("_parity_actual_only", "_kh NOT IN (SELECT _kh FROM _parity_expected_only)"),
+            "changed": [],
+        }
+        if not key_columns:
+            return samples
+        all_columns = ", ".join(f"_c{i}" for i in range(len(shared)))
+        changed = self.con.execute(f"""
+            SELECT e._kh, {', '.join('e._c' + str(i) for i in range(len(shared)))},
+                   {', '.join('a._c' + str(i) for i in range(len(shared)))}
+            FROM (SELECT DISTINCT ON (_kh) _kh, {all_columns} FROM _parity_expected_only ORDER BY _kh, _n) e
+            JOIN (SELECT DISTINCT ON (_kh) _kh, {all_columns} FROM _parity_actual_only ORDER BY _kh, _n) a
+            USING (_kh) ORDER BY e._kh LIMIT {self.sample}
+        """).fetchall()
+        width = len(shared)
+        for row in changed:
+            e, a = row[1:1 + width], row[1 + width:]
+            samples["changed"].append({
+                "key": {names[c]: _plain(e[index[c]]) for c in key_columns},
+                "columns": {names[c]: [_plain(e[i]), _plain(a[i])] for i, c in enumerate(shared) if e[i] != a[i]},
+            })
+        return samples
+
+
+def _plain(value):
+    """JSON-friendly value for the report."""
+    return value if value is None or isinstance(value, (str, int, float, bool)) else str(value)
+
+
+def summarize(report):
+    """One line: 'match (1,000 rows)' or '3 missing, 1 extra, 2 changed (sampled)'."""
+    if report["match"]:
+        return f"match ({report['rows']['expected']:,} rows)"
+    diffs = report["differences"]
+    text = ", ".join(f"{diffs[kind]:,} {kind}" for kind in KINDS if diffs[kind])
+    text = text or "row counts differ"
+    rows = report["rows"]
+    text += f" ({rows['expected']:,} expected / {rows['actual']:,} actual rows"
+    return text + (", sampled)" if not report["exact"] else ")")
+
+
+def print_report(report):
+    print(f"[PARITY] {report['expected']} vs {report['actual']}: {summarize(report)} "
+          f"in {report['seconds']:.2f}s, {report['buckets']['mismatched']}/{report['buckets']['count']} "
+          f"ranges differ, {report['buckets']['levels']} level(s)")
+    for side in ("only_expected", "only_actual"):
+        if report["columns"][side]:
+            print(f"[WARN] Columns not compared ({side.replace('_', ' ')}): {', '.join(report['columns'][side])}")
+    for kind in KINDS:
+        for sample in report.get("samples", {}).get(kind, []):
+            print(f"   {kind:>7}: {json.dumps(sample, default=str)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two datasets (tables, files or queries) in DuckDB.")
+    parser.add_argument("expected", help="Talend result: table, data file, read_*() call or SELECT")
+    parser.add_argument("actual", help="migrated result, usually the model's table")
+    parser.add_argument("--key", nargs="+", default=[], help="key columns (omit to compare as row multisets)")
+    parser.add_argument("--exclude", nargs="+", default=[], help="columns to leave out (e.g. load timestamps)")
+    parser.add_argument("--db", default=DUCKDB_PATH, help="DuckDB database holding the tables")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    checker = ParityChecker(database=args.db)
+    try:
+        report = checker.compare(args.expected, args.actual, keys=args.key, exclude=args.exclude)
+    finally:
+        checker.close()
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=str)
+    return 0 if report["match"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,158 @@
+from src.knowledge_base import KnowledgeRetriever
+from src.talend_job import unquote, is_true
+from src.java_expr import JavaExpressionTranslator, UntranslatableExpression
+from src.sql_util import quote_ident
+
+
+# tFilterRow CONDITIONS operators (symbols and the names older exports use)
+FILTER_OPERATORS = {
+    "==": "=", "!=": "<>", "<": "<", "<=": "<=", ">": ">", ">=": ">=",
+    "EQ": "=", "NE": "<>", "LT": "<", "LE": "<=", "GT": ">", "GE": ">=",
+}
+
+
+class RuleTranspiler:
+    """
+    Deterministic DuckDB SQL for mechanical components.
+    Reads element parameters and FLOW metadata straight from the parsed
+    component; no LLM call. transpile() returns None whenever the component
+    is not covered (or its parameters are incomplete), and the caller then
+    falls back to the LLM.
+    """
+    def __init__(self, kb=None):
+        self.kb = kb or KnowledgeRetriever()
+        self.handlers = {
+            "tFilterColumns": self._filter_columns,
+            "tSortRow": self._sort_row,
+            "tExternalSortRow": self._sort_row,
+            "tUniqRow": self._uniq_row,
+            # No tSampleRow: which rows are lines 1..n depends on an input
+            # order DuckDB does not guarantee, so it goes to the LLM.
+            "tUnite": self._unite,
+            "tReplicate": self._replicate,
+            "tConvertType": self._convert_type,
+            "tFilterRow": self._filter_row,
+            "tMap": self._map,
+        }
+
+    def supports(self, comp_type):
+        return comp_type in self.handlers
+
+    def can_transpile(self, entry):
+        """True when transpile() will produce SQL for this component."""
+        return entry is not None and self.transpile(entry, ["__probe__"]) is not None
+
+    def transpile(self, entry, inputs):
+        handler = self.handlers.get(entry.comp_type)
+        if handler is None or not inputs:
+            return None
+        return handler(entry, inputs)
+
+    # --- HANDLERS ---
+    def _replicate(self, entry, inputs):
+        # Branching point: downstream CTEs read from this one.
+        return f"SELECT * FROM {inputs[0]}"
+
+    def _unite(self, entry, inputs):
+        # Talend tUnite is positional with identical schemas -> UNION ALL.
+        return "\nUNION ALL\n".join(f"SELECT * FROM {name}" for name in inputs)
+
+    def _filter_columns(self, entry, inputs):
+        if not entry.columns:
+            return None
+        cols = ", ".join(quote_ident(c["name"]) for c in entry.columns)
+        return f"SELECT {cols} FROM {inputs[0]}"
+
+    def _sort_row(self, entry, inputs):
+        criteria = entry.tables.get("CRITERIA") or []
+        keys = []
+        for row in criteria:
+            col = row.get("COLNAME")
+            if not col:
+                return None
+            direction = "DESC" if (row.get("ORDER") or "").lower() == "desc" else "ASC"
+            keys.append(f"{quote_ident(col)} {direction}")
+        if not keys:
+            return None
+        return f"SELECT * FROM {inputs[0]} ORDER BY {', '.join(keys)}"
+
+    def _uniq_row(self, entry, inputs):
+        # Talend keeps the first occurrence per key, but a CTE has no input
+        # order DuckDB guarantees (parallel scans), so only the cases where
+        # any occurrence is the same row are rules: no keys, or every column a
+        # case-sensitive key. The rest goes to the LLM.
+        keys = [
+            row for row in entry.tables.get("UNIQUE_KEY") or []
+            if is_true(row.get("KEY_ATTRIBUTE")) and row.get("SCHEMA_COLUMN")
+        ]
+        columns = {c["name"] for c in entry.columns}
+        if keys and ({row["SCHEMA_COLUMN"] for row in keys} != columns
+                     or not all(is_true(row.get("CASE_SENSITIVE")) for row in keys)):
+            return None
+        return f"SELECT DISTINCT * FROM {inputs[0]}"
+
+    def _convert_type(self, entry, inputs):
+        if not entry.columns:
+            return None
+        empty_to_null = is_true(entry.params.get("EMPTYTONULL"))
+        cast_fn = "CAST" if is_true(entry.params.get("DIEONERROR")) else "TRY_CAST"
+        select = []
+        for col in entry.columns:
+            name = quote_ident(col["name"])
+            sql_type = self.kb.sql_type(col)
+            value = f"NULLIF(CAST({name} AS VARCHAR), '')" if empty_to_null else name
+            expr = f"{cast_fn}({value} AS {sql_type})"
+            if col.get("type") == "id_Date" and unquote(col.get("pattern")) and cast_fn == "TRY_CAST":
+                # Text in the column's own pattern (e.g. MM/dd/yyyy) is not ISO: parse it.
+                fmt = self.kb.strftime_pattern(col["pattern"])
+                expr = f"COALESCE({expr}, CAST(try_strptime(CAST({value} AS VARCHAR), '{fmt}') AS {sql_type}))"
+            select.append(f"{expr} AS {name}")
+        return "SELECT\n  " + ",\n  ".join(select) + f"\nFROM {inputs[0]}"
+
+    def _filter_row(self, entry, inputs):
+        column_types = {c["name"]: c.get("type") for c in entry.columns}
+        translator = JavaExpressionTranslator(self.kb, row_aliases={"input_row": ""}, column_types=column_types)
+        conditions = []
+        try:
+            for row in entry.tables.get("CONDITIONS") or []:
+                column, function = row.get("INPUT_COLUMN"), (row.get("FUNCTION") or "").strip()
+                operator = FILTER_OPERATORS.get((row.get("OPERATOR") or "").strip())
+                if not column or function or operator is None:
+                    return None
+                rvalue = translator.translate(row.get("RVALUE"))
+                conditions.append(f"({quote_ident(column)} {operator} {rvalue})")
+            if is_true(entry.params.get("USE_ADVANCED")):
+                conditions.append(translator.translate(entry.params.get("ADVANCED_COND")))
+        except UntranslatableExpression:
+            return None
+        if not conditions:
+            return None
+        logical = " OR " if (entry.params.get("LOGICAL_OP") or "").strip() in ("||", "OR") else " AND "
+        return f"SELECT * FROM {inputs[0]}\nWHERE {logical.join(conditions)}"
+
+    def _map(self, entry, inputs):
+        # Single input (no lookups), single output: a projection + optional filters.
+        mapper = entry.mapper
+        if not mapper or len(mapper["inputs"]) != 1 or len(mapper["outputs"]) != 1 or len(inputs) != 1:
+            return None
+        main, output = mapper["inputs"][0], mapper["outputs"][0]
+        column_types = {e["name"]: e.get("type") for e in main["entries"]}
+        translator = JavaExpressionTranslator(self.kb, row_aliases={main["name"]: ""}, column_types=column_types)
+        try:
+            for var_table in mapper["vars"]:
+                for var in var_table["entries"]:
+                    translator.variables[var["name"]] = translator.translate_typed(var["expression"])
+            select = []
+            for e in output["entries"]:
+                expression = (e.get("expression") or "").strip()
+                sql = translator.translate(expression) if expression else "NULL"
+                select.append(f"{sql} AS {quote_ident(e['name'])}")
+            filters = [translator.translate(t["filter"]) for t in (main, output) if (t["filter"] or "").strip()]
+        except UntranslatableExpression:
+            return None
+        if not select:
+            return None
+        sql = "SELECT\n  " + ",\n  ".join(select) + f"\nFROM {inputs[0]}"
+        if filters:
+            sql += f"\nWHERE {' AND '.join(filters)}"
+        return sql
@@ -1,43 +1,188 @@
 import asyncio
 import sys
 import os
+import argparse
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from temporalio.client import Client
-from temporalio.worker import Worker
+from temporalio.worker import Worker, SharedStateManager
 
 # --- DYNAMIC IMPORT SETUP ---
 # We need to import the 'workflow.py' that was JUST generated by the tool.
 # It lives in ../output/temporal_workflows
 OUTPUT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../output/temporal_workflows"))
 sys.path.append(OUTPUT_PATH)
+# The generated workflow imports its activities from src.temporal_activities.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.config import (
+    TEMPORAL_ADDRESS, TEMPORAL_TASK_QUEUE, TEMPORAL_DB_TASK_QUEUE, WORKER_PROCESSES, WORKER_MAX_ACTIVITIES,
+    WORKER_MAX_WORKFLOW_TASKS, WORKER_EXECUTOR, DUCKDB_THREADS,
+    MIGRATION_TASK_QUEUE, MIGRATION_CONVERT_QUEUE, CONVERT_WORKER_JOBS,
+)
+
+# Roles:
+#   models     the generated workflows (needs workflow.py) and model builds
+#   migration  MigrationWorkflow and its coordinator activities (process 0; writes the output)
+#   convert    job conversions for MigrationWorkflow with this host's Ollama
+ROLES = ("models", "migration", "convert")
+
+
+def load_generated_workflow():
+    try:
+        # Import the generated class and activities
+        import workflow
+        return workflow
+    except ImportError:
+        print("[ERROR] Could not find 'workflow.py'. Did you run the migration engine first?")
+        print(f"        Checked path: {OUTPUT_PATH}")
+        sys.exit(1)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Temporal worker for the generated migration workflows")
+    parser.add_argument("--processes", type=int, default=WORKER_PROCESSES,
+                        help="worker processes polling the main task queue")
+    parser.add_argument("--max-activities", type=int, default=WORKER_MAX_ACTIVITIES,
+                        help="concurrent activities per process (and per queue)")
+    parser.add_argument("--max-workflow-tasks", type=int, default=WORKER_MAX_WORKFLOW_TASKS,
+                        help="concurrent workflow tasks per process")
+    parser.add_argument("--executor", choices=("thread", "process"), default=WORKER_EXECUTOR,
+                        help="pool for sync activities on the main queue (file scans)")
+    parser.add_argument("--duckdb-threads", type=int, default=DUCKDB_THREADS,
+                        help="DuckDB threads in the model-building process")
+    parser.add_argument("--roles", nargs="+", choices=ROLES, default=["models"],
+                        help="queues this worker serves (conversion hosts: --roles convert)")
+    parser.add_argument("--address", default=TEMPORAL_ADDRESS, help="Temporal server host:port")
+    parser.add_argument("--convert-jobs", type=int, default=CONVERT_WORKER_JOBS,
+                        help="jobs converted at once per process (convert role)")
+    parser.add_argument("--ollama-url", help="this host's Ollama (convert role; default from config)")
+    parser.add_argument("--input-dir", help="this host's copy of the Talend export (convert role)")
+    return parser.parse_args(argv)
+
+
+async def run_worker(index, args):
+    print(f"[INFO] Worker {index}: connecting to Temporal Server at {args.address}...")
+    client = await Client.connect(args.address)
+
+    if args.executor == "process":
+        # Sync activities in a process pool need a manager for heartbeats/cancellation.
+        activity_executor = ProcessPoolExecutor(max_workers=args.max_activities)
+        shared_state = SharedStateManager.create_from_multiprocessing(multiprocessing.Manager())
+    else:
+        activity_executor = ThreadPoolExecutor(max_workers=args.max_activities)
+        shared_state = None
+
+    workers, queues = [], []
+    if "models" in args.roles:
+        wf = load_generated_workflow()
+        workers.append(Worker(
+            client,
+            task_queue=TEMPORAL_TASK_QUEUE,
+            workflows=[wf.MasterWorkflow, wf.JobTreeWorkflow, wf.FileLoopWorkflow],
+            activities=[wf.file_scan],
+            activity_executor=activity_executor,
+            shared_state_manager=shared_state,
+            max_concurrent_activities=args.max_activities,
+            max_concurrent_workflow_tasks=args.max_workflow_tasks,
+        ))
+        queues.append(TEMPORAL_TASK_QUEUE)
+
+    if "models" in args.roles and index == 0:
+        # Model builds: one process owns the DuckDB file; concurrent cursors on
+        # a thread pool (DuckDB releases the GIL while executing).
+        workers.append(Worker(
+            client,
+            task_queue=TEMPORAL_DB_TASK_QUEUE,
+            activities=[wf.dbt_run, wf.dbt_run_batch, wf.dbt_run_model],
+            activity_executor=ThreadPoolExecutor(max_workers=args.max_activities),
+            max_concurrent_activities=args.max_activities,
+        ))
+        queues.append(TEMPORAL_DB_TASK_QUEUE)
+
+    if "migration" in args.roles and index == 0:
+        # Coordinator: plans the run and writes every converted job.
+        from src.migration_workflow import MigrationWorkflow
+        from src.migration_activities import plan_migration, write_job_output, finish_migration
+        workers.append(Worker(
+            client,
+            task_queue=MIGRATION_TASK_QUEUE,
+            workflows=[MigrationWorkflow],
+            activities=[plan_migration, write_job_output, finish_migration],
+            activity_executor=ThreadPoolExecutor(max_workers=args.max_activities),
+            max_concurrent_activities=args.max_activities,
+            max_concurrent_workflow_tasks=args.max_workflow_tasks,
+        ))
+        queues.append(MIGRATION_TASK_QUEUE)
+
+    if "convert" in args.roles:
+        # Async activity: the conversion runs on a thread, the event loop heartbeats.
+        from src.migration_activities import convert_job
+        workers.append(Worker(
+            client,
+            task_queue=MIGRATION_CONVERT_QUEUE,
+            activities=[convert_job],
+            max_concurrent_activities=args.convert_jobs,
+        ))
+        queues.append(MIGRATION_CONVERT_QUEUE)
+
+    if not workers:
+        print(f"[INFO] Worker {index}: nothing to serve for roles {', '.join(args.roles)}.")
+        return
+
+    print(f"[INFO] Worker {index} started. Listening on {', '.join(repr(q) for q in queues)} "
+          f"({args.max_activities} activities, {args.executor} executor).")
+
+    # Readiness handshake for run_migration.py: connected, both queues served.
+    ready_file = os.environ.get("WORKER_READY_FILE")
+    if index == 0 and ready_file:
+        with open(ready_file, "w", encoding='utf-8') as f:
+            f.write(str(os.getpid()))
 
-try:
-    # Import the generated class and activities
-    from workflow import MasterWorkflow, dbt_run, file_scan
-except ImportError:
-    print("[ERROR] Could not find 'workflow.py'. Did you run the migration engine first?")
-    print(f"        Checked path: {OUTPUT_PATH}")
-    sys.exit(1)
-
-async def main():
-    print(f"[INFO] Connecting to Temporal Server at localhost:7233...")
-    client = await Client.connect("localhost:7233")
-
-    # Create the Worker
-    worker = Worker(
-        client,
-        task_queue="talend-migration-queue",
-        workflows=[MasterWorkflow],
-        activities=[dbt_run, file_scan],
-    )
-
-    print(f"[INFO] Worker started. Listening on 'talend-migration-queue'.")
-    print(f"[INFO] Press Ctrl+C to stop.")
-    
     # Block and wait for work
-    await worker.run()
+    await asyncio.gather(*(worker.run() for worker in workers))
+
+
+def worker_process(index, args):
+    try:
+        asyncio.run(run_worker(index, args))
+    except KeyboardInterrupt:
+        pass
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.duckdb_threads:
+        # Read by src.temporal_activities when it opens the database.
+        os.environ["DUCKDB_THREADS"] = str(args.duckdb_threads)
+    # Read by src.migration_activities on conversion hosts.
+    if args.ollama_url:
+        os.environ["OLLAMA_BASE_URL"] = args.ollama_url
+    if args.input_dir:
+        os.environ["TALEND_INPUT_DIR"] = os.path.abspath(args.input_dir)
+    print(f"[INFO] Starting {args.processes} worker process(es), roles: {', '.join(args.roles)}.")
+    print("[INFO] Press Ctrl+C to stop.")
+
+    if args.processes <= 1:
+        worker_process(0, args)
+        return
+
+    ctx = multiprocessing.get_context("spawn")
+    processes = [ctx.Process(target=worker_process, args=(i, args), name=f"temporal-worker-{i}")
+                 for i in range(args.processes)]
+    for p in processes:
+        p.start()
+    try:
+        for p in processes:
+            p.join()
+    finally:
+        for p in processes:
+            if p.is_alive():
+                p.terminate()
+                p.join()
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        main()
     except KeyboardInterrupt:
-        print("\n[INFO] Worker shutting down.")
\ No newline at end of file
+        print("\n[INFO] Worker shutting down.")
@@ -0,0 +1,109 @@
+import heapq
+import itertools
+import threading
+import networkx as nx
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+
+
+class PriorityExecutor:
+    """
+    Fixed pool of worker threads fed from ONE priority queue.
+    Shared by every job in a run, so the total number of in-flight component
+    conversions never exceeds max_workers, and the most urgent work (lowest
+    priority value) is always picked next, whichever job it belongs to.
+    """
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._shutdown = False
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"component-{i}", daemon=True)
+            for i in range(max_workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, priority, fn, *args, **kwargs):
+        future = Future()
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("PriorityExecutor is shut down")
+            heapq.heappush(self._heap, (priority, next(self._seq), future, fn, args, kwargs))
+            self._cond.notify()
+        return future
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._heap and not self._shutdown:
+                    self._cond.wait()
+                if not self._heap:
+                    return
+                _, _, future, fn, args, kwargs = heapq.heappop(self._heap)
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def shutdown(self, wait=True):
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+        if wait:
+            for t in self._threads:
+                t.join()
+
+
+def critical_path_lengths(graph, weight=None):
+    """
+    Longest weighted path from each node to any sink (node weight included).
+    Nodes heading the longest remaining chains get scheduled first.
+    """
+    weight = weight or (lambda n: 1)
+    lengths = {}
+    for node in reversed(list(nx.topological_sort(graph))):
+        tail = max((lengths[s] for s in graph.successors(node)), default=0)
+        lengths[node] = weight(node) + tail
+    return lengths
+
+
+def run_dag(graph, task_fn, executor, weight=None, inline=None):
+    """
+    Executes task_fn(node, upstream_results) for every node of a DAG as soon
+    as all of its predecessors are done. Independent branches run
+    concurrently on the shared executor, longest critical path first.
+    `inline(node)` marks cheap nodes that run directly in the calling thread.
+    Returns {node: result}.
+    """
+    lengths = critical_path_lengths(graph, weight)
+    pending = {n: graph.in_degree(n) for n in graph.nodes}
+    results = {}
+    in_flight = {}
+    ready = [n for n, deg in pending.items() if deg == 0]
+
+    def complete(node, result):
+        results[node] = result
+        for succ in graph.successors(node):
+            pending[succ] -= 1
+            if pending[succ] == 0:
+                ready.append(succ)
+
+    while ready or in_flight:
+        while ready:
+            node = ready.pop()
+            upstream = {p: results[p] for p in graph.predecessors(node)}
+            if inline is not None and inline(node):
+                complete(node, task_fn(node, upstream))
+            else:
+                future = executor.submit(-lengths[node], task_fn, node, upstream)
+                in_flight[future] = node
+        if not in_flight:
+            continue
+        done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+        for future in done:
+            complete(in_flight.pop(future), future.result())
+    return results
@@ -0,0 +1,32 @@
+import re
+import functools
+import duckdb
+
+# DuckDB identifiers and literals, shared by the generators (models, rules,
+# CTE checks) and the runtime (activities, parity checks).
+
+SIMPLE_IDENT = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def sql_string(value):
+    return "'" + value.replace("'", "''") + "'"
+
+
+def quote(name):
+    """Any name (table, model, column) as a quoted DuckDB identifier."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+@functools.lru_cache(maxsize=None)
+def keywords():
+    """DuckDB keywords that cannot be used bare as a column name (order, group, end, ...)."""
+    with duckdb.connect() as con:
+        rows = con.execute("SELECT keyword_name FROM duckdb_keywords() WHERE keyword_category <> 'unreserved'")
+        return frozenset(row[0] for row in rows.fetchall())
+
+
+def quote_ident(name):
+    """Column name as a DuckDB identifier (quoted only when it needs to be)."""
+    if SIMPLE_IDENT.match(name) and name.lower() not in keywords():
+        return name
+    return quote(name)
@@ -0,0 +1,260 @@
+import os
+from lxml import etree
+
+
+def local_name(element):
+    """Namespace-agnostic tag name ('node', 'connection', 'elementParameter', ...)."""
+    tag = element.tag
+    if not isinstance(tag, str):  # comments / processing instructions
+        return None
+    return tag.rsplit("}", 1)[-1]
+
+
+class ComponentEntry:
+    """
+    One Talend component (<node>) with everything the conversion stages need.
+    The serialized XML is produced on first access and then reused. Compact
+    entries (node=None) carry the XML string only, so the DOM can be freed;
+    sources, sinks and control flow never reach the LLM and carry none.
+    """
+    __slots__ = ("unique_name", "comp_type", "node", "params", "tables", "columns", "mapper", "_xml")
+
+    def __init__(self, unique_name, comp_type, node, params, xml=None, tables=None, columns=None, mapper=None):
+        self.unique_name = unique_name
+        self.comp_type = comp_type
+        self.node = node
+        self.params = params
+        self.tables = tables or {}     # TABLE parameters: name -> [ {elementRef: value}, ... ]
+        self.columns = columns or []   # FLOW metadata schema: [ {name, type, key, ...}, ... ]
+        self.mapper = mapper           # tMap nodeData, see _mapper_data()
+        self._xml = xml
+
+    @property
+    def xml(self):
+        if self._xml is None and self.node is not None:
+            self._xml = etree.tostring(self.node).decode('utf-8')
+        return self._xml
+
+
+# Control-flow components: handled by the generated Temporal workflow, never
+# converted to SQL.
+ORCHESTRATION_COMPONENTS = {
+    "tFileList", "tLoop", "tFlowToIterate", "tForeach", "tInfiniteLoop",
+    "tRunJob", "tWaitForFile", "tPrejob", "tPostjob", "tDie", "tWarn", "tSleep",
+}
+
+COLUMN_ATTRS = ("name", "type", "key", "nullable", "length", "precision", "pattern", "default")
+
+
+def unquote(value):
+    """Strips the Java string quotes Talend wraps around most literal values."""
+    if value and len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1]
+    return value
+
+
+def is_true(value):
+    return (value or "").strip().lower() == "true"
+
+
+def dataset_param(entry):
+    """Raw TABLE / FILENAME value of an Input or Output component, if any."""
+    return next((v for k, v in entry.params.items() if k in ("TABLE", "FILENAME")), None)
+
+
+def dataset_name(entry):
+    """
+    Table (or file base name) an Input/Output component reads or writes:
+    '"C:/data/perpvic_race.csv"' -> 'perpvic_race'. None when the name is
+    only known at runtime (context variables, globalMap).
+    """
+    raw = dataset_param(entry)
+    if not raw or "context." in raw or "globalMap.get" in raw:
+        return None
+    clean = raw.replace('"', '').replace('\\', '/')
+    return os.path.splitext(os.path.basename(clean))[0] if '/' in clean else clean
+
+
+def needs_xml(comp_type):
+    """False for components that are never sent to the LLM (sources, sinks, control flow)."""
+    comp_type = comp_type or ""
+    return not ("Input" in comp_type or "Output" in comp_type or comp_type in ORCHESTRATION_COMPONENTS)
+
+
+def _table_rows(param):
+    # TABLE parameters are a flat run of elementValues; a row ends when an
+    # elementRef repeats (SCHEMA_COLUMN, KEY_ATTRIBUTE, SCHEMA_COLUMN, ...).
+    rows, row = [], {}
+    for value in param.iterchildren():
+        if local_name(value) != "elementValue":
+            continue
+        ref = value.get("elementRef")
+        if ref in row:
+            rows.append(row)
+            row = {}
+        row[ref] = value.get("value")
+    if row:
+        rows.append(row)
+    return rows
+
+
+def _mapper_data(node_data):
+    """
+    tMap <nodeData> as plain dicts:
+        {"inputs": [table], "outputs": [table], "vars": [table]}
+        table = {"name", "filter" (active expressionFilter or None), "inner_join",
+                 "entries": [{"name", "expression", "type"}]}
+    """
+    mapper = {"inputs": [], "outputs": [], "vars": []}
+    kinds = {"inputTables": "inputs", "outputTables": "outputs", "varTables": "vars"}
+    for table in node_data.iterchildren():
+        kind = kinds.get(local_name(table))
+        if kind is None:
+            continue
+        active = (table.get("activateExpressionFilter") or "").lower() == "true"
+        mapper[kind].append({
+            "name": table.get("name"),
+            "filter": table.get("expressionFilter") if active else None,
+            "inner_join": (table.get("innerJoin") or "").lower() == "true",
+            "entries": [
+                {"name": e.get("name"), "expression": e.get("expression"), "type": e.get("type")}
+                for e in table.iterchildren() if local_name(e) == "mapperTableEntries"
+            ],
+        })
+    return mapper
+
+
+def component_from_node(node, keep_node=False):
+    params, tables, columns, mapper = {}, {}, None, None
+    for child in node.iterchildren():
+        tag = local_name(child)
+        if tag == "elementParameter":
+            name = child.get("name")
+            params.setdefault(name, child.get("value"))
+            if child.get("field") == "TABLE":
+                tables[name] = _table_rows(child)
+        elif tag == "metadata" and columns is None and child.get("connector") == "FLOW":
+            columns = [
+                {attr: col.get(attr) for attr in COLUMN_ATTRS if col.get(attr) is not None}
+                for col in child.iterchildren() if local_name(col) == "column"
+            ]
+        elif tag == "nodeData":
+            mapper = _mapper_data(child)
+    entry = ComponentEntry(params.get("UNIQUE_NAME"), node.get("componentName"), node, params,
+                           tables=tables, columns=columns, mapper=mapper)
+    if not keep_node:
+        if needs_xml(entry.comp_type):
+            entry.xml  # serialize now, before the node goes away
+        entry.node = None
+    return entry
+
+
+class ComponentIndex:
+    """
+    UNIQUE_NAME -> ComponentEntry map for one .item file, built in a single walk
+    of the document. Replaces the per-component xpath scan over every <node>.
+    """
+    def __init__(self, tree=None):
+        self._entries = {}
+        if tree is not None:
+            for node in tree.iter():
+                if local_name(node) == "node":
+                    self.add(component_from_node(node, keep_node=True))
+
+    def add(self, entry):
+        if entry.unique_name and entry.unique_name not in self._entries:
+            self._entries[entry.unique_name] = entry
+
+    def get(self, unique_name):
+        return self._entries.get(unique_name)
+
+    def unique_names(self):
+        return list(self._entries)
+
+    def __contains__(self, unique_name):
+        return unique_name in self._entries
+
+    def __iter__(self):
+        return iter(self._entries.values())
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class TalendJob:
+    """
+    Compact, DOM-free model of one .item file: components, FLOW/trigger
+    connections, job-level parameters and tRunJob edges. Parsed once by
+    ProjectGraph and handed to MigrationEngine for conversion.
+    """
+    __slots__ = ("name", "filepath", "components", "connections", "parameters", "run_jobs")
+
+    def __init__(self, name, filepath):
+        self.name = name
+        self.filepath = filepath
+        self.components = ComponentIndex()
+        self.connections = []   # (source, target, connectorName)
+        self.parameters = {}    # job-level <parameters>/<elementParameter>
+        self.run_jobs = []      # PROCESS:PROCESS_TYPE_PROCESS of every tRunJob
+
+    def is_orchestration(self):
+        return any("Loop" in c.comp_type or "FileList" in c.comp_type for c in self.components if c.comp_type)
+
+
+def job_name_from_path(filepath):
+    return os.path.basename(filepath).replace("_0.1.item", "")
+
+
+def iter_job_elements(filepath):
+    """
+    Streams a .item file with iterparse and yields, in document order:
+        ("parameter", (name, value))              job-level elementParameter
+        ("node", ComponentEntry)                  compact component
+        ("connection", (source, target, connector))
+    Every top-level element is cleared and detached once handled, so peak
+    memory is bounded by the largest single component, not the file.
+    """
+    context = etree.iterparse(filepath, events=("end",), huge_tree=True, remove_comments=True)
+    for _, element in context:
+        parent = element.getparent()
+        if parent is None:
+            continue
+        grandparent = parent.getparent()
+
+        # Job-level <parameters>/<elementParameter>
+        if grandparent is not None and grandparent.getparent() is None:
+            if local_name(parent) == "parameters" and local_name(element) == "elementParameter":
+                yield "parameter", (element.get("name"), element.get("value"))
+            continue
+
+        # Only direct children of the root are handled; their subtrees are
+        # complete at this point.
+        if grandparent is not None:
+            continue
+
+        tag = local_name(element)
+        if tag == "node":
+            yield "node", component_from_node(element)
+        elif tag == "connection":
+            if element.get("source") and element.get("target"):
+                yield "connection", (element.get("source"), element.get("target"), element.get("connectorName"))
+
+        element.clear()
+        while element.getprevious() is not None:
+            del parent[0]
+    del context
+
+
+def load_job(filepath):
+    """Builds a TalendJob from the streaming reader (no full DOM is ever held)."""
+    job = TalendJob(job_name_from_path(filepath), filepath)
+    for kind, item in iter_job_elements(filepath):
+        if kind == "node":
+            job.components.add(item)
+            if item.comp_type == "tRunJob" and item.params.get("PROCESS:PROCESS_TYPE_PROCESS"):
+                job.run_jobs.append(item.params["PROCESS:PROCESS_TYPE_PROCESS"])
+        elif kind == "connection":
+            job.connections.append(item)
+        elif kind == "parameter":
+            job.parameters.setdefault(*item)
+    return job
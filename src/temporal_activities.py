@@ -0,0 +1,285 @@
+import os
+import re
+import glob
+import json
+import fnmatch
+import time
+import uuid
+import shutil
+import threading
+import subprocess
+import duckdb
+import jinja2
+from temporalio import activity
+from temporalio.exceptions import ApplicationError
+from src.file_sources import stage_file_sources
+from src.sql_util import quote
+from src.config import (
+    DBT_OUTPUT_DIR, DBT_EXECUTION_MODE, DBT_PROFILES_DIR, DUCKDB_PATH, DBT_VARS,
+)
+
+# Activities are plain (sync) functions: the worker runs them on its
+# activity_executor thread pool, so DuckDB and dbt never block the event loop.
+
+_db_lock = threading.Lock()
+_db = None
+# dbt-duckdb holds an exclusive lock on the database file for the whole
+# invocation, so dbt batches from this process run one at a time.
+_dbt_lock = threading.Lock()
+
+
+def execution_mode():
+    if DBT_EXECUTION_MODE != "auto":
+        return DBT_EXECUTION_MODE
+    has_project = os.path.exists(os.path.join(DBT_OUTPUT_DIR, "dbt_project.yml"))
+    return "dbt" if has_project and shutil.which("dbt") else "duckdb"
+
+
+def _database():
+    # One persistent connection per worker process; each activity call works
+    # on its own cursor.
+    global _db
+    with _db_lock:
+        if _db is None:
+            os.makedirs(os.path.dirname(DUCKDB_PATH), exist_ok=True)
+            _db = duckdb.connect(DUCKDB_PATH)
+            if os.environ.get("DUCKDB_THREADS"):
+                _db.execute(f"SET threads={int(os.environ['DUCKDB_THREADS'])}")
+            _db.execute("CREATE SCHEMA IF NOT EXISTS raw")
+        return _db
+
+
+# --- DIRECT MODE (compiled SQL on DuckDB) ---
+def render_model(sql, invocation_id, variables=None, this=None, config=None):
+    """
+    Minimal dbt Jinja context: source/ref/var/config/is_incremental/this.
+    config(...) arguments are collected into `config` (a dict) when given;
+    is_incremental() is true for incremental models whose table `this` exists.
+    """
+    variables = {**DBT_VARS, **(variables or {})}
+    config = {} if config is None else config
+
+    def var(name, default=None):
+        if name in variables:
+            return variables[name]
+        if default is None:
+            raise jinja2.UndefinedError(f"var('{name}') has no value (set DBT_VARS)")
+        return default
+
+    def _config(**kwargs):
+        config.update(kwargs)
+        return ""
+
+    context = {
+        "source": lambda source_name, table: f"{quote(source_name)}.{quote(table)}",
+        "ref": lambda model: quote(model),
+        "var": var,
+        "config": _config,
+        "is_incremental": lambda: this is not None and config.get("materialized") == "incremental",
+        "this": this or "",
+        "invocation_id": invocation_id,
+    }
+    return jinja2.Environment().from_string(sql).render(**context)
+
+
+def model_path(model):
+    return os.path.join(DBT_OUTPUT_DIR, "models", f"{model}.sql")
+
+
+def _existing_type(cursor, model):
+    """'BASE TABLE', 'VIEW' or None for the model's relation."""
+    row = cursor.execute(
+        "SELECT table_type FROM information_schema.tables WHERE table_schema = current_schema() AND table_name = ?",
+        [model],
+    ).fetchone()
+    return row[0] if row else None
+
+
+def _build_model(cursor, model, invocation_id, variables=None, append=False):
+    with open(model_path(model), "r", encoding='utf-8') as f:
+        text = f.read()
+    existing = _existing_type(cursor, model)
+    config = {}
+    this = quote(model) if existing == "BASE TABLE" else None
+    sql = render_model(text, invocation_id, variables, this=this, config=config).strip().rstrip(';')
+    if append:
+        # File-loop fan-out: later files are added to the table built by the first.
+        return cursor.execute(f"INSERT INTO {quote(model)} BY NAME {sql}").fetchone()[0]
+
+    materialized = config.get("materialized", "table")
+    if materialized == "incremental" and this:
+        # Same semantics as dbt-duckdb's append / delete+insert strategies.
+        keys = config.get("unique_key") or []
+        keys = [keys] if isinstance(keys, str) else keys
+        if config.get("incremental_strategy") == "delete+insert" and keys:
+            staged = quote(f"__incremental_{model}")
+            columns = ", ".join(quote(k) for k in keys)
+            cursor.execute(f"CREATE OR REPLACE TEMP TABLE {staged} AS {sql}")
+            try:
+                cursor.execute(f"DELETE FROM {this} WHERE ({columns}) IN (SELECT {columns} FROM {staged})")
+                return cursor.execute(f"INSERT INTO {this} BY NAME SELECT * FROM {staged}").fetchone()[0]
+            finally:
+                cursor.execute(f"DROP TABLE IF EXISTS {staged}")
+        return cursor.execute(f"INSERT INTO {this} BY NAME {sql}").fetchone()[0]
+
+    if existing and (existing == "VIEW") != (materialized == "view"):
+        cursor.execute(f"DROP {'VIEW' if existing == 'VIEW' else 'TABLE'} {quote(model)}")
+    if materialized == "view":
+        cursor.execute(f"CREATE OR REPLACE VIEW {quote(model)} AS {sql}")
+    else:
+        cursor.execute(f"CREATE OR REPLACE TABLE {quote(model)} AS {sql}")
+    return cursor.execute(f"SELECT count(*) FROM {quote(model)}").fetchone()[0]
+
+
+def run_models_duckdb(models, variables=None, append=False):
+    cursor = _database().cursor()
+    invocation_id = uuid.uuid4().hex
+    results = {}
+    try:
+        for model in models:
+            start = time.perf_counter()
+            if not os.path.exists(model_path(model)):
+                # Control-flow-only jobs (e.g. tLoop -> tRunJob) have no model.
+                results[model] = {"status": "skipped", "seconds": 0, "rows": None}
+                continue
+            try:
+                rows = _build_model(cursor, model, invocation_id, variables, append)
+                results[model] = {"status": "success", "seconds": round(time.perf_counter() - start, 3), "rows": rows}
+            except Exception as e:
+                results[model] = {"status": "error", "seconds": round(time.perf_counter() - start, 3),
+                                  "rows": None, "error": str(e).splitlines()[0]}
+    finally:
+        cursor.close()
+    return results
+
+
+def _config_error(e):
+    """Errors a retry cannot fix (missing var, bad source spec): fail the activity once."""
+    return ApplicationError(str(e).splitlines()[0], type=type(e).__name__, non_retryable=True)
+
+
+def stage_sources(models, variables=None):
+    """Parquet copies of the file sources these models read (FILE_SOURCE_STAGING)."""
+    render = lambda text: render_model(text, invocation_id="", variables=variables)
+    try:
+        staged = stage_file_sources(DBT_OUTPUT_DIR, models, render)
+    except (jinja2.UndefinedError, duckdb.Error) as e:
+        raise _config_error(e) from e
+    for key, status in staged.items():
+        if status != "fresh":
+            activity.logger.info(f"[ACTIVITY] Source {key}: {status}")
+
+
+# --- DBT MODE (one invocation per batch) ---
+def run_models_dbt(models, variables=None):
+    # Private target path per batch: concurrent batches must not overwrite
+    # each other's run_results.json.
+    target = os.path.join("target", f"batch_{uuid.uuid4().hex[:8]}")
+    cmd = [
+        "dbt", "run", "--project-dir", DBT_OUTPUT_DIR, "--profiles-dir", DBT_PROFILES_DIR,
+        "--target-path", target, "--select", *models,
+    ]
+    if variables:
+        cmd += ["--vars", json.dumps(variables)]
+    with _dbt_lock:
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+
+    results = {m: {"status": "skipped", "seconds": None, "rows": None} for m in models}
+    run_results = os.path.join(DBT_OUTPUT_DIR, target, "run_results.json")
+    if not os.path.exists(run_results):
+        error = (proc.stderr or proc.stdout or "dbt produced no run_results.json").strip().splitlines()[-1:]
+        for m in models:
+            results[m].update(status="error", error=error[0] if error else "dbt failed")
+        return results
+
+    with open(run_results, "r", encoding='utf-8') as f:
+        data = json.load(f)
+    for r in data.get("results", []):
+        model = r["unique_id"].split(".")[-1]
+        entry = {
+            "status": r.get("status"),
+            "seconds": round(r.get("execution_time") or 0, 3),
+            "rows": (r.get("adapter_response") or {}).get("rows_affected"),
+        }
+        if r.get("message") and r.get("status") not in ("success", "pass"):
+            entry["error"] = r["message"]
+        results[model] = entry
+    shutil.rmtree(os.path.join(DBT_OUTPUT_DIR, target), ignore_errors=True)
+    return results
+
+
+@activity.defn
+def dbt_run_batch(models: list[str]) -> dict:
+    """
+    Builds a batch of models with one dbt invocation (or directly on the
+    persistent DuckDB database) and reports per-model status, seconds and
+    row counts.
+    """
+    mode = execution_mode()
+    activity.logger.info(f"[ACTIVITY] Running {len(models)} models via {mode}: {', '.join(models)}")
+    start = time.perf_counter()
+    stage_sources(models)
+    results = run_models_dbt(models) if mode == "dbt" else run_models_duckdb(models)
+    return {"mode": mode, "seconds": round(time.perf_counter() - start, 3), "models": results}
+
+
+@activity.defn
+def dbt_run_model(request: dict) -> dict:
+    """
+    One model with explicit dbt vars: {"model", "vars", "append"}.
+    Used by FileLoopWorkflow to hand the scanned files to the model.
+    append=True inserts into the existing table (duckdb mode only).
+    """
+    model, variables = request["model"], request.get("vars") or {}
+    if not os.path.exists(model_path(model)):
+        return {"mode": None, "seconds": 0, "models": {model: {"status": "skipped", "seconds": 0, "rows": None,
+                                                                "error": "job has no data flow model"}}}
+    mode = execution_mode()
+    start = time.perf_counter()
+    stage_sources([model], variables)
+    if mode == "dbt":
+        if request.get("append"):
+            raise ApplicationError("file-loop fan-out appends need DBT_EXECUTION_MODE='duckdb'",
+                                   type="ValueError", non_retryable=True)
+        results = run_models_dbt([model], variables)
+    else:
+        results = run_models_duckdb([model], variables, append=bool(request.get("append")))
+    return {"mode": mode, "seconds": round(time.perf_counter() - start, 3), "models": results}
+
+
+@activity.defn
+def file_scan(spec: dict) -> list[str]:
+    """
+    Real tFileList: files under spec["directory"] matching any of spec["masks"]
+    (glob or regex, optionally recursive and case-insensitive), sorted.
+    """
+    try:
+        directory = render_model(spec["directory"], invocation_id="")
+    except jinja2.UndefinedError as e:
+        raise _config_error(e) from e
+    if not os.path.isdir(directory):
+        activity.logger.info(f"[ACTIVITY] {spec['component']}: {directory} does not exist")
+        return []
+    flags = 0 if spec.get("case_sensitive", True) else re.IGNORECASE
+    if spec.get("glob", True):
+        patterns = [re.compile(fnmatch.translate(m), flags) for m in spec["masks"]]
+    else:
+        patterns = [re.compile(m, flags) for m in spec["masks"]]
+
+    if spec.get("recursive"):
+        candidates = glob.iglob(os.path.join(directory, "**", "*"), recursive=True)
+    else:
+        candidates = (os.path.join(directory, name) for name in os.listdir(directory))
+    files = sorted(
+        path.replace("\\", "/") for path in candidates
+        if os.path.isfile(path) and any(p.fullmatch(os.path.basename(path)) for p in patterns)
+    )
+    activity.logger.info(f"[ACTIVITY] {spec['component']}: {len(files)} files in {directory}")
+    return files
+
+
+@activity.defn
+def dbt_run(model: str) -> str:
+    """Single-model variant, kept for workflows generated before batching."""
+    result = dbt_run_batch([model])["models"].get(model, {})
+    return result.get("status", "error")
@@ -1,43 +1,256 @@
 import os
 import networkx as nx
+from src.config import (
+    TEMPORAL_MAX_PARALLEL, TEMPORAL_MAX_CHILDREN, TEMPORAL_JOBS_PER_CHILD,
+    TEMPORAL_CONTINUE_AFTER, DBT_BATCH_SIZE, FILE_LOOP_MODE, FILE_LOOP_MAX_PARALLEL,
+    TEMPORAL_DB_TASK_QUEUE, TEMPORAL_ACTIVITY_MAX_ATTEMPTS, DBT_EXECUTION_MODE,
+)
 
 class TemporalGenerator:
-    def __init__(self, graph, output_dir):
+    def __init__(self, graph, output_dir, max_parallel=TEMPORAL_MAX_PARALLEL, batch_size=DBT_BATCH_SIZE,
+                 max_children=TEMPORAL_MAX_CHILDREN, jobs_per_child=TEMPORAL_JOBS_PER_CHILD,
+                 continue_after=TEMPORAL_CONTINUE_AFTER):
         self.graph = graph
         self.out_dir = output_dir
+        self.max_parallel = max(1, int(max_parallel))
+        self.batch_size = max(1, int(batch_size))
+        self.max_children = max(1, int(max_children))
+        self.jobs_per_child = max(1, int(jobs_per_child))
+        self.continue_after = max(1, int(continue_after))
         os.makedirs(output_dir, exist_ok=True)
 
+    def execution_levels(self, graph=None):
+        """
+        Groups jobs into levels that can run concurrently. A tRunJob edge
+        (caller -> callee) means the callee has to finish first, so levels
+        are the topological generations of the reversed graph. A cyclic
+        graph degrades to one job per level, in node order.
+        """
+        graph = self.graph if graph is None else graph
+        try:
+            levels = nx.topological_generations(graph.reverse(copy=False))
+            return [sorted(level) for level in levels]
+        except nx.NetworkXUnfeasible:
+            print("[WARN] tRunJob cycle detected: generating a sequential subtree.")
+            return [[node] for node in sorted(graph.nodes)]
+
+    def execution_units(self):
+        """
+        One unit per child workflow (tRunJob rule: subjob -> ChildWorkflow).
+        A unit is a connected tRunJob subtree, so shared callees never cross
+        workflows. Subtrees smaller than jobs_per_child are packed together,
+        merging their levels index by index.
+        """
+        components = sorted(nx.weakly_connected_components(self.graph), key=lambda c: min(c))
+        units, packed, packed_size = [], [], 0
+        for component in components:
+            levels = self.execution_levels(self.graph.subgraph(component))
+            if len(component) >= self.jobs_per_child:
+                units.append(levels)
+                continue
+            for i, level in enumerate(levels):
+                if i == len(packed):
+                    packed.append([])
+                packed[i].extend(level)
+            packed_size += len(component)
+            if packed_size >= self.jobs_per_child:
+                units.append([sorted(level) for level in packed])
+                packed, packed_size = [], 0
+        if packed:
+            units.append([sorted(level) for level in packed])
+        return units
+
+    def file_loops(self):
+        """tFileList specs of orchestration jobs (set by ProjectGraph)."""
+        return {
+            job: self.graph.nodes[job]["file_loops"]
+            for job in sorted(self.graph.nodes) if self.graph.nodes[job].get("file_loops")
+        }
+
     def generate(self):
         print("[INFO] Generating Temporal Workflow...")
+        units = self.execution_units()
+        file_loops = self.file_loops()
+        if file_loops and FILE_LOOP_MODE == "fanout" and DBT_EXECUTION_MODE == "dbt":
+            # Fan-out appends each file to the table built by the first one,
+            # which only the direct DuckDB runner can do.
+            raise ValueError("FILE_LOOP_MODE='fanout' needs DBT_EXECUTION_MODE 'duckdb' or 'auto'")
         content = """
 import asyncio
 from datetime import timedelta
-from temporalio import workflow, activity
+from temporalio import workflow
+from temporalio.common import RetryPolicy
+
+with workflow.unsafe.imports_passed_through():
+    from src.temporal_activities import dbt_run_batch, dbt_run_model, file_scan
+
+OK_STATUSES = ("success", "pass")
+# Not built, but not an error either: no model (control-flow job, failed
+# conversion, no matching files) or dbt skipped it after an upstream error.
+SKIPPED_STATUSES = ("skipped",)
+"""
+        content += f"""
+MAX_PARALLEL = {self.max_parallel}
+MAX_CHILDREN = {self.max_children}
+BATCH_SIZE = {self.batch_size}
+CONTINUE_AFTER = {self.continue_after}
+FILE_LOOP_MODE = {FILE_LOOP_MODE!r}
+FILE_LOOP_MAX_PARALLEL = {FILE_LOOP_MAX_PARALLEL}
+# Bounded retries: a broken model or source fails its job instead of
+# retrying forever (configuration errors are raised as non-retryable).
+RETRY = RetryPolicy(maximum_attempts={TEMPORAL_ACTIVITY_MAX_ATTEMPTS})
+# Model builds run on the worker process that owns the DuckDB file.
+DB_TASK_QUEUE = {TEMPORAL_DB_TASK_QUEUE!r}
+
+# tFileList jobs: run by FileLoopWorkflow instead of a plain model batch.
+FILE_LOOPS = {{
+"""
+        for job, specs in file_loops.items():
+            content += f"    {job!r}: {specs!r},\n"
+        content += """}
+
+# One entry per JobTreeWorkflow: the dependency levels of a tRunJob subtree
+# (callees before callers). Small independent subtrees share an entry.
+UNITS = [
+"""
+        for levels in units:
+            content += "    [\n"
+            for level in levels:
+                content += f"        {level!r},\n"
+            content += "    ],\n"
+        content += """]
+
+@workflow.defn
+class FileLoopWorkflow:
+    \"\"\"
+    tFileList job: scans its directories (file_scan), then runs the job's
+    model over the matched files - in one query (batch), or one file per
+    activity with bounded fan-out, continuing as new every CONTINUE_AFTER files.
+    \"\"\"
+    @workflow.run
+    async def run(self, job: str, pending: list = None, rows: int = 0, errors: list = None) -> dict:
+        specs = FILE_LOOPS[job]
+        errors = list(errors or [])
+
+        async def run_model(variables, append=False):
+            return await workflow.execute_activity(
+                dbt_run_model, {"model": job, "vars": variables, "append": append},
+                task_queue=DB_TASK_QUEUE, start_to_close_timeout=timedelta(minutes=60), retry_policy=RETRY,
+            )
 
-@activity.defn
-async def dbt_run(model: str) -> str:
-    print(f"[ACTIVITY] Running dbt: {model}")
-    return "OK"
+        if pending is None:
+            scans = await asyncio.gather(*(
+                workflow.execute_activity(
+                    file_scan, spec, start_to_close_timeout=timedelta(minutes=10), retry_policy=RETRY,
+                )
+                for spec in specs
+            ))
+            files = {spec["var"]: found for spec, found in zip(specs, scans)}
+            if not all(files.values()):
+                return {"models": {job: {"status": "skipped", "seconds": 0, "rows": 0, "error": "no matching files"}}}
+            if FILE_LOOP_MODE != "fanout" or len(specs) != 1:
+                return await run_model(files)
+            # Fan-out: the first file creates the table, the rest append to it.
+            pending = files[specs[0]["var"]]
+            first = (await run_model({specs[0]["var"]: pending[:1]}))["models"][job]
+            if first["status"] != "success":
+                return {"models": {job: first}}
+            rows, pending = first["rows"] or 0, pending[1:]
 
-@activity.defn
-async def file_scan(path: str) -> list[str]:
-    print(f"[ACTIVITY] Scanning path: {path}")
-    return ["file1", "file2"]
+        gate = asyncio.Semaphore(FILE_LOOP_MAX_PARALLEL)
+
+        async def load(path):
+            async with gate:
+                return (await run_model({specs[0]["var"]: [path]}, append=True))["models"][job]
+
+        window, pending = pending[:CONTINUE_AFTER], pending[CONTINUE_AFTER:]
+        for result in await asyncio.gather(*(load(path) for path in window)):
+            if result["status"] == "success":
+                rows += result["rows"] or 0
+            else:
+                errors.append(result.get("error") or result["status"])
+        if pending:
+            workflow.continue_as_new(args=[job, pending, rows, errors])
+
+        status = "error" if errors else "success"
+        return {"models": {job: {"status": status, "rows": rows, "error": errors[0] if errors else None}}}
+
+@workflow.defn
+class JobTreeWorkflow:
+    \"\"\"Builds one unit level by level; continues as new every CONTINUE_AFTER batches.\"\"\"
+    @workflow.run
+    async def run(self, unit: int, level: int = 0, offset: int = 0, built: int = 0, failed: list = None,
+                  skipped: list = None) -> dict:
+        failed = list(failed or [])
+        skipped = list(skipped or [])
+        levels = UNITS[unit]
+        gate = asyncio.Semaphore(MAX_PARALLEL)
+        executed = 0
+
+        async def run_item(item):
+            async with gate:
+                if isinstance(item, str):
+                    return await workflow.execute_child_workflow(
+                        FileLoopWorkflow.run, item, id=f"{workflow.info().workflow_id}-loop-{item}"
+                    )
+                # One activity (= one dbt invocation) per batch of ready models.
+                return await workflow.execute_activity(
+                    dbt_run_batch, item, task_queue=DB_TASK_QUEUE, start_to_close_timeout=timedelta(minutes=30),
+                    retry_policy=RETRY,
+                )
+
+        while level < len(levels):
+            models = levels[level]
+            plain = [m for m in models if m not in FILE_LOOPS]
+            items = [plain[i:i + BATCH_SIZE] for i in range(0, len(plain), BATCH_SIZE)]
+            items += [m for m in models if m in FILE_LOOPS]
+            window = items[offset:offset + max(1, CONTINUE_AFTER - executed)]
+            for result in await asyncio.gather(*(run_item(item) for item in window)):
+                for model, r in result["models"].items():
+                    if r.get("status") in OK_STATUSES:
+                        built += 1
+                    elif r.get("status") in SKIPPED_STATUSES:
+                        skipped.append(model)
+                    else:
+                        failed.append(model)
+            executed += len(window)
+            offset += len(window)
+            if offset >= len(items):
+                level, offset = level + 1, 0
+            if executed >= CONTINUE_AFTER and level < len(levels):
+                workflow.continue_as_new(args=[unit, level, offset, built, failed, skipped])
+
+        return {"built": built, "failed": failed, "skipped": skipped}
 
 @workflow.defn
 class MasterWorkflow:
     @workflow.run
-    async def run(self) -> str:
+    async def run(self, start: int = 0, built: int = 0, failed: list = None, skipped: list = None) -> dict:
         print("[WORKFLOW] Start Migration")
-"""
-        # Add Logic
-        for node in self.graph.nodes:
-            content += f"""
-        await workflow.execute_activity(dbt_run, "{node}", start_to_close_timeout=timedelta(minutes=5))
-"""
-        content += """
-        return "Done"
+        failed = list(failed or [])
+        skipped = list(skipped or [])
+        gate = asyncio.Semaphore(MAX_CHILDREN)
+        parent_id = workflow.info().workflow_id
+
+        async def run_unit(unit):
+            async with gate:
+                return await workflow.execute_child_workflow(
+                    JobTreeWorkflow.run, unit, id=f"{parent_id}-unit-{unit}"
+                )
+
+        end = min(len(UNITS), start + CONTINUE_AFTER)
+        for result in await asyncio.gather(*(run_unit(unit) for unit in range(start, end))):
+            built += result["built"]
+            failed.extend(result["failed"])
+            skipped.extend(result["skipped"])
+        if end < len(UNITS):
+            workflow.continue_as_new(args=[end, built, failed, skipped])
+
+        print(f"[WORKFLOW] Done: {built} models built, {len(skipped)} skipped, {len(failed)} failed")
+        return {"built": built, "failed": sorted(failed), "skipped": sorted(skipped)}
 """
         # UTF-8 ENFORCED
         with open(os.path.join(self.out_dir, "workflow.py"), "w", encoding='utf-8') as f:
-            f.write(content)
\ No newline at end of file
+            f.write(content)
+        print(f"[INFO] Workflow: {len(units)} child workflows, batches of {self.batch_size}, "
+              f"up to {self.max_children} children x {self.max_parallel} activities in flight.")
@@ -1,32 +1,74 @@
+import os
+import sys
 import asyncio
+import argparse
 import uuid
 from temporalio.client import Client
+from temporalio.common import WorkflowIDConflictPolicy
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.config import TEMPORAL_ADDRESS, TEMPORAL_TASK_QUEUE, MIGRATION_TASK_QUEUE, MIGRATION_WORKFLOW_ID
+
+
+async def convert(client, args):
+    """Starts (or attaches to) the distributed conversion: MigrationWorkflow."""
+    handle = await client.start_workflow(
+        "MigrationWorkflow",
+        {"incremental": args.incremental},
+        id=MIGRATION_WORKFLOW_ID,
+        task_queue=MIGRATION_TASK_QUEUE,
+        # A migration already in progress is resumed, not started over.
+        id_conflict_policy=WorkflowIDConflictPolicy.USE_EXISTING,
+    )
+    print(f"[INFO] Conversion workflow: {MIGRATION_WORKFLOW_ID} (run {handle.result_run_id})")
+    print(f"[INFO] View Progress: http://localhost:8233/namespaces/default/workflows/{MIGRATION_WORKFLOW_ID}")
+    if not args.wait:
+        return 0
+    result = await handle.result()
+    print(f"[RESULT] {result['converted']} converted, {result['skipped']} skipped, {result['failed']} failed")
+    for job in result["failed_jobs"]:
+        print(f"   [x] {job}")
+    return 1 if result["failed_jobs"] else 0
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="Start a migration workflow on Temporal")
+    parser.add_argument("--convert", action="store_true",
+                        help="run the conversion itself (MigrationWorkflow) instead of the migrated jobs")
+    parser.add_argument("--incremental", action="store_true", help="with --convert: only changed jobs")
+    parser.add_argument("--wait", action="store_true", help="with --convert: block until it finishes")
+    args = parser.parse_args(argv)
 
-async def main():
     # Connect
-    client = await Client.connect("localhost:7233")
+    client = await Client.connect(TEMPORAL_ADDRESS)
+
+    if args.convert:
+        try:
+            return await convert(client, args)
+        except Exception as e:
+            print(f"[ERROR] Conversion workflow failed: {e}")
+            return 1
 
     # Generate a unique ID for this run
     run_id = f"migration-run-{uuid.uuid4().hex[:6]}"
 
     print(f"[INFO] Triggering Workflow ID: {run_id}")
-    
+
     try:
-        handle = await client.start_workflow(
+        await client.start_workflow(
             "MasterWorkflow",
             id=run_id,
-            task_queue="talend-migration-queue",
+            task_queue=TEMPORAL_TASK_QUEUE,
         )
 
         print(f"[SUCCESS] Workflow Started!")
         print(f"[INFO] View Progress: http://localhost:8233/namespaces/default/workflows/{run_id}")
-        
-        # Optional: Wait for result (blocking)
-        # result = await handle.result()
-        # print(f"[RESULT] {result}")
 
     except Exception as e:
         print(f"[ERROR] Failed to trigger workflow: {e}")
+        return 1
+    return 0
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    sys.exit(asyncio.run(main()))
\ No newline at end of file
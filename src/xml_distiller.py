@@ -0,0 +1,137 @@
+"""
+Compact prompt text for one Talend component.
+
+The raw <node> XML carries Studio layout, labels, connection credentials,
+runtime tuning flags and repository bookkeeping next to the few settings
+that decide the SQL. distill() keeps the parameters that matter for the
+component type, the FLOW schema and tMap mappings, one line each:
+
+    tSortRow tSortRow_1
+    CRITERIA:
+      COLNAME="amount" SORT=num ORDER=desc
+    SCHEMA: id Integer key not null, amount BigDecimal(12,2)
+"""
+from src.talend_job import is_true
+
+# Never affect the generated SQL.
+NOISE_PARAMS = {
+    "UNIQUE_NAME", "LABEL", "HINT", "NOTE", "COMMENT", "INFORMATION", "CONNECTION_FORMAT",
+    "HOST", "PORT", "USER", "PASS", "DBNAME", "DB_VERSION", "TYPE", "PROPERTIES", "CONNECTION",
+    "USE_EXISTING_CONNECTION", "SPECIFY_DATASOURCE_ALIAS", "DATASOURCE_ALIAS", "ENCODING",
+    "COMMIT_EVERY", "BATCH_SIZE", "USE_BATCH_SIZE", "ROWS_BUFFER_SIZE", "BUFFER_SIZE",
+    "TEMP_DIR", "TEMP_DIRECTORY", "TEMPORARY_DATA_DIRECTORY", "LKUP_PARALLELIZE", "LINK_STYLE",
+    "PREVIEW", "ENABLE_DEBUG_MODE", "CHANGE_HASH_AND_EQUALS_FOR_BIGDECIMAL", "IS_VIRTUAL_COMPONENT",
+    "TSTATCATCHER_STATS", "LEVENSHTEIN", "JACCARD", "QUERYSTORE", "GUESS_SCHEMA", "DIE_ON_ERROR",
+    "FAMILY", "ACTIVATE", "STARTABLE", "START", "PROCESS_TYPE_VERSION", "FILENAMETEXT", "MAPPING",
+    "PARALLELIZE", "PARALLELIZE_NUMBER", "EXTENDINSERT", "NB_ROWS_PER_INSERT", "NB_RANDOM",
+}
+NOISE_SUFFIXES = (
+    ":PROPERTY_TYPE", ":REPOSITORY_PROPERTY_TYPE", ":SCHEMA_TYPE", ":REPOSITORY_SCHEMA_TYPE",
+    ":ENCODING_TYPE", ":QUERYSTORE_TYPE", ":REPOSITORY_QUERYSTORE_TYPE",
+)
+
+# The parameters that carry the logic, per component type. Types not listed
+# (or whose listed parameters are all absent) keep every non-noise parameter
+# that is set.
+RELEVANT_PARAMS = {
+    "tSortRow": ("CRITERIA",),
+    "tExternalSortRow": ("CRITERIA",),
+    "tUniqRow": ("UNIQUE_KEY", "ONLY_ONCE_EACH_DUPLICATED_KEY"),
+    "tFilterRow": ("CONDITIONS", "LOGICAL_OP", "USE_ADVANCED", "ADVANCED_COND"),
+    "tAggregateRow": ("GROUPBYS", "OPERATIONS"),
+    "tAggregateSortedRow": ("GROUPBYS", "OPERATIONS"),
+    "tConvertType": ("MANUALTABLE", "AUTOCAST", "EMPTYTONULL", "DIEONERROR"),
+    "tJoin": ("JOIN_KEY", "USE_INNER_JOIN", "LOOKUP_COLS"),
+    "tNormalize": ("NORMALIZE_COLUMN", "ITEMSEPARATOR", "DEDUPLICATE", "TRIM", "DISCARD_TRAILING_EMPTY_STR"),
+    "tDenormalize": ("DENORMALIZE_COLUMNS",),
+    "tDenormalizeSortedRow": ("DENORMALIZE_COLUMNS",),
+    "tReplace": ("SUBSTITUTIONS", "ADVANCED_MODE", "ADVANCED_SUBST"),
+    "tSampleRow": ("RANGE",),
+    "tExtractDelimitedFields": ("FIELD", "FIELDSEPARATOR", "ADVANCED_SEPARATOR", "THOUSANDS_SEPARATOR", "DECIMAL_SEPARATOR"),
+    "tExtractJSONFields": ("JSONFIELD", "READ_BY", "LOOP_QUERY", "JSON_LOOP_QUERY", "MAPPING_4_JSONPATH", "MAPPINGXPATH"),
+    "tExtractXMLField": ("XMLFIELD", "LOOP_QUERY", "MAPPING"),
+    "tMap": (),
+}
+
+
+def estimate_tokens(text):
+    """Rough prompt size: ~4 characters per token for code and XML."""
+    return (len(text or "") + 3) // 4
+
+
+def _is_noise(name, value):
+    if name in NOISE_PARAMS or name.endswith(NOISE_SUFFIXES):
+        return True
+    # Unset values and switched-off flags: Talend writes every option.
+    return value is None or value.strip() in ("", '""', "false")
+
+
+def _params(entry):
+    relevant = RELEVANT_PARAMS.get(entry.comp_type)
+    names = [n for n in relevant or () if n in entry.params]
+    generic = relevant is None or (relevant and not names)
+    if generic:
+        names = [
+            n for n, v in entry.params.items()
+            if (n in entry.tables and n not in NOISE_PARAMS) or not _is_noise(n, v)
+        ]
+    lines = []
+    for name in names:
+        if name in entry.tables:
+            rows = []
+            for row in entry.tables[name]:
+                # Generic tables (per-column option grids): only switched-on options.
+                fields = [f"{k}={v}" for k, v in row.items() if v not in (None, "") and not (generic and v == "false")]
+                if len(fields) > (1 if generic else 0):
+                    rows.append("  " + " ".join(fields))
+            if rows:
+                lines.append(f"{name}:")
+                lines.extend(rows)
+        elif entry.params[name] not in (None, ""):
+            lines.append(f"{name}: {entry.params[name]}")
+    return lines
+
+
+def _column(col):
+    col_type = (col.get("type") or "").replace("id_", "")
+    if col.get("length") and col.get("length") not in ("-1", "0"):
+        size = col["length"]
+        if col.get("precision") and col.get("precision") not in ("-1", "0"):
+            size += "," + col["precision"]
+        col_type += f"({size})"
+    text = f"{col.get('name')} {col_type}".strip()
+    if is_true(col.get("key")):
+        text += " key"
+    if col.get("nullable") == "false":
+        text += " not null"
+    if col.get("pattern") and col["pattern"] not in ('""', ""):
+        text += f" pattern={col['pattern']}"
+    return text
+
+
+def _mapper(mapper):
+    lines = []
+    for kind, label in (("inputs", "INPUT"), ("vars", "VAR"), ("outputs", "OUTPUT")):
+        for table in mapper[kind]:
+            head = f"MAP {label} {table['name']}"
+            if kind == "inputs" and table["inner_join"]:
+                head += " (inner join)"
+            if table["filter"]:
+                head += f" WHERE {table['filter']}"
+            lines.append(head)
+            for e in table["entries"]:
+                if kind == "inputs" and not e.get("expression"):
+                    continue  # plain lookup column, no join key
+                lines.append(f"  {e['name']} = {e['expression']}" if e.get("expression") else f"  {e['name']}")
+    return lines
+
+
+def distill(entry):
+    """Compact text of a ComponentEntry (see module docstring)."""
+    lines = [f"{entry.comp_type} {entry.unique_name}"]
+    lines.extend(_params(entry))
+    if entry.mapper:
+        lines.extend(_mapper(entry.mapper))
+    if entry.columns:
+        lines.append("SCHEMA: " + ", ".join(_column(c) for c in entry.columns))
+    return "\n".join(lines)
@@ -0,0 +1,29 @@
+import duckdb
+from src.cte_optimizer import CteOptimizer
+
+DATA = "src AS (SELECT range AS id FROM range(10))"
+
+
+def rows(sql):
+    return duckdb.sql(sql).fetchall()
+
+
+def test_order_by_kept_when_a_reader_limits():
+    sql = (f"WITH {DATA}, s AS (SELECT * FROM src ORDER BY id DESC), "
+           "l AS (SELECT * FROM s LIMIT 3) SELECT * FROM l")
+    optimized, actions = CteOptimizer().optimize(sql)
+    assert not any(a.startswith("drop ORDER BY") for a in actions)
+    assert rows(optimized) == rows(sql) == [(9,), (8,), (7,)]
+
+
+def test_order_by_dropped_without_limit():
+    sql = (f"WITH {DATA}, s AS (SELECT * FROM src ORDER BY id DESC), "
+           "f AS (SELECT * FROM s WHERE id > 5) SELECT * FROM f")
+    optimized, actions = CteOptimizer().optimize(sql)
+    assert "drop ORDER BY s" in actions
+    assert sorted(rows(optimized)) == sorted(rows(sql))
+
+
+def test_unparseable_sql_is_kept():
+    sql = f"WITH {DATA}, s AS (SELECT 'unterminated FROM src) SELECT * FROM s"
+    assert CteOptimizer().optimize(sql) == (sql, [])
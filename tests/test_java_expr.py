@@ -0,0 +1,47 @@
+import duckdb
+import jinja2
+import pytest
+from src.knowledge_base import KnowledgeRetriever
+from src.java_expr import JavaExpressionTranslator, UntranslatableExpression
+
+COLUMNS = {"a": "id_Integer", "b": "id_Long", "d": "id_Double", "s": "id_String"}
+ROW = "SELECT -7::INTEGER AS a, 2::BIGINT AS b, 7.0::DOUBLE AS d, 'x' AS s"
+
+
+def evaluate(expression):
+    translator = JavaExpressionTranslator(KnowledgeRetriever(), row_aliases={"row1": ""}, column_types=COLUMNS)
+    return duckdb.sql(f"SELECT {translator.translate(expression)} FROM ({ROW})").fetchone()[0]
+
+
+def test_integer_division_truncates_like_java():
+    assert evaluate("row1.a / row1.b") == -3
+    assert evaluate("7 / 2") == 3
+
+
+def test_floating_division_stays_float():
+    assert evaluate("row1.d / row1.b") == 3.5
+    assert evaluate("row1.a / 2.0") == -3.5
+
+
+def test_receiver_text_is_not_substituted():
+    assert evaluate('"{arg1}".equals(row1.s)') is False
+    assert evaluate('"{arg1}".equals("{arg1}")') is True
+
+
+def test_mathematical_int_truncates():
+    assert evaluate("Mathematical.INT(row1.d / -2.0)") == -3
+    assert evaluate("Mathematical.INT(2.9)") == 2
+
+
+def test_sequence_is_left_to_the_llm():
+    translator = JavaExpressionTranslator(KnowledgeRetriever(), column_types=COLUMNS)
+    with pytest.raises(UntranslatableExpression):
+        translator.translate('Numeric.sequence("s1", 100, 1)')
+
+
+def test_context_variable_is_a_string_literal():
+    translator = JavaExpressionTranslator(KnowledgeRetriever(), row_aliases={"row1": ""}, column_types=COLUMNS)
+    sql = jinja2.Template(translator.translate('context.dir + "/x"')).render(var=lambda name: "C:/it's")
+    assert duckdb.sql(f"SELECT {sql}").fetchone()[0] == "C:/it's/x"
+    number = jinja2.Template(translator.translate("row1.a * context.n")).render(var=lambda name: 3)
+    assert duckdb.sql(f"SELECT {number} FROM ({ROW})").fetchone()[0] == -21
@@ -0,0 +1,31 @@
+import duckdb
+from src.rule_transpiler import RuleTranspiler
+from src.talend_job import ComponentEntry
+
+DATA = "SELECT * FROM (VALUES (2, 'b'), (1, 'a'), (2, 'c')) AS t(\"order\", \"end\")"
+
+
+def entry(comp_type, columns=(), tables=None):
+    return ComponentEntry(f"{comp_type}_1", comp_type, None, {}, tables=tables or {},
+                          columns=[{"name": c, "type": "id_String"} for c in columns])
+
+
+def run(sql):
+    return duckdb.sql(f"WITH src AS ({DATA}) {sql}").fetchall()
+
+
+def test_reserved_word_columns_are_quoted():
+    rules = RuleTranspiler()
+    sort = rules.transpile(entry("tSortRow", tables={"CRITERIA": [{"COLNAME": "order", "ORDER": "desc"}]}), ["src"])
+    assert run(sort)[0][0] == 2
+    columns = rules.transpile(entry("tFilterColumns", columns=["end", "order"]), ["src"])
+    assert sorted(run(columns)) == [("a", 1), ("b", 2), ("c", 2)]
+
+
+def test_uniq_row_needs_no_input_order():
+    rules = RuleTranspiler()
+    key = lambda name: {"SCHEMA_COLUMN": name, "KEY_ATTRIBUTE": "true", "CASE_SENSITIVE": "true"}
+    partial = entry("tUniqRow", columns=["order", "end"], tables={"UNIQUE_KEY": [key("order")]})
+    assert rules.transpile(partial, ["src"]) is None  # first occurrence: left to the LLM
+    full = entry("tUniqRow", columns=["order", "end"], tables={"UNIQUE_KEY": [key("order"), key("end")]})
+    assert sorted(run(rules.transpile(full, ["src"]))) == [(1, "a"), (2, "b"), (2, "c")]